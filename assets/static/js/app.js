@@ -130,6 +130,21 @@ const app = createApp({
                                     marginRight: '4px'
                                 }
                             }),
+                        // 头像使用浏览器原生懒加载, 只请求可见行
+                        account.steam_id
+                            ? h('img', {
+                                class: 'avatar',
+                                src: `/api/avatars/${account.steam_id}`,
+                                loading: 'lazy',
+                                decoding: 'async',
+                                width: 20,
+                                height: 20,
+                                title: account.persona_name || '',
+                                onError: (e) => {
+                                    e.target.style.display = 'none'
+                                }
+                            })
+                            : null,
                         h('span', {}, account.username)
                     ])
                 }
@@ -331,17 +346,72 @@ const app = createApp({
             throw lastError;
         }
 
+        // 已同步到的账号数据版本, 用于增量获取
+        let accountsRevision = null
+
+        /**
+         * 按用户名将增量变更合并到现有账号列表, 避免整表替换
+         * @param {Array} upserts 新增或修改的账号
+         * @param {Array} deletes 已删除的用户名
+         */
+        function applyAccountPatches(upserts, deletes) {
+            const list = accounts.value
+            if (deletes.length) {
+                const deleted = new Set(deletes)
+                for (let i = list.length - 1; i >= 0; i--) {
+                    if (deleted.has(list[i].username)) {
+                        list.splice(i, 1)
+                    }
+                }
+            }
+            if (!upserts.length) {
+                return
+            }
+
+            let needSort = false
+            const indexByName = new Map(list.map((acc, index) => [acc.username, index]))
+            for (const upsert of upserts) {
+                const index = indexByName.get(upsert.username)
+                if (index === undefined) {
+                    list.push(upsert)
+                    needSort = true
+                } else {
+                    const row = list[index]
+                    if (row.last_login !== upsert.last_login) {
+                        needSort = true
+                    }
+                    Object.assign(row, upsert)
+                }
+            }
+            // 与后端一致: 按最近登录时间排序，未登录的排在最后
+            if (needSort) {
+                list.sort((a, b) => (b.last_login || '1970-01-01').localeCompare(a.last_login || '1970-01-01'))
+            }
+        }
+
         // 修改加载账号列表的函数
         async function loadAccounts() {
             try {
+                const url = accountsRevision === null
+                    ? '/api/accounts'
+                    : `/api/accounts?since=${accountsRevision}`
                 const response = await retryRequest(async () => {
-                    const res = await fetch('/api/accounts');
+                    const res = await fetch(url);
                     if (!res.ok) throw new Error('加载失败');
                     return res.json();
                 });
 
                 if (response.status === 'success') {
-                    accounts.value = response.accounts;
+                    if (response.full) {
+                        accounts.value = response.accounts;
+                    } else {
+                        applyAccountPatches(response.upserts, response.deletes);
+                    }
+                    reapplyPendingEdits();
+                    if (searchQuery.value.trim() && (response.full || response.upserts.length || response.deletes.length)) {
+                        runSearch(searchQuery.value);
+                    }
+                    accountsRevision = response.revision;
                     if (response.unbanned && response.unbanned.length > 0) {
                         message.success(`${response.unbanned.length}个账号已解封`);
                     }
@@ -354,44 +424,175 @@ const app = createApp({
             }
         }
 
-        // 修改更新游戏ID的函数
-        async function updateGameId(username, gameId) {
+        // 搜索: 结果只保存用户名, 表格行仍使用 accounts 中的对象, 编辑和增量更新对搜索结果同样生效
+        const searchQuery = ref('')
+        const searchResults = ref(null)
+        const SEARCH_DEBOUNCE = 200
+        let searchSeq = 0
+
+        const displayedAccounts = computed(() => {
+            if (searchResults.value === null) {
+                return accounts.value
+            }
+            const byName = new Map(accounts.value.map(acc => [acc.username, acc]))
+            return searchResults.value.map(name => byName.get(name)).filter(Boolean)
+        })
+
+        /**
+         * 向后端查询匹配的账号, 只采用最后一次输入对应的结果
+         * @param {string} query 搜索内容
+         */
+        async function runSearch(query) {
+            const seq = ++searchSeq
+            if (!query.trim()) {
+                searchResults.value = null
+                return
+            }
             try {
-                const response = await retryRequest(async () => {
-                    const res = await fetch(`/api/accounts/${username}/game_id`, {
-                        method: 'PUT',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({ game_id: gameId }),
-                    });
-                    if (!res.ok) throw new Error('设置失败');
-                    return res.json();
-                });
+                const response = await API.searchAccounts(query.trim())
+                if (seq !== searchSeq) {
+                    return
+                }
+                if (response.status !== 'success') {
+                    throw new Error(response.message || '搜索失败')
+                }
+                searchResults.value = response.accounts.map(acc => acc.username)
+            } catch (error) {
+                if (seq === searchSeq) {
+                    console.error('搜索账号失败:', error)
+                    message.error(error.message || '搜索失败')
+                }
+            }
+        }
 
-                if (response.status === 'success') {
-                    message.success('设置成功');
-                    await loadAccounts();  // 刷新账号列表
+        // 防抖结束时读取最新的输入, 期间清空过搜索框也不会再执行旧的查询
+        const debouncedSearch = utils.debounce(() => runSearch(searchQuery.value), SEARCH_DEBOUNCE)
+
+        function handleSearchInput(value) {
+            // 清空时立即恢复完整列表
+            if (!value || !value.trim()) {
+                runSearch('')
+                return
+            }
+            debouncedSearch()
+        }
+
+        // 每行尚未提交的字段修改: username -> { row, fields, base, timer, inFlight }
+        const pendingEdits = new Map()
+        const EDIT_DEBOUNCE = 500
+
+        /**
+         * 乐观修改账号字段: 立即更新界面, 同一行短时间内的修改合并为一次 PATCH
+         * @param {Object} row 账号行
+         * @param {string} field 字段名
+         * @param {*} value 新值
+         */
+        function queueAccountEdit(row, field, value) {
+            let edit = pendingEdits.get(row.username)
+            if (!edit) {
+                edit = { row, fields: {}, base: {}, timer: null, inFlight: false }
+                pendingEdits.set(row.username, edit)
+            }
+            if (!(field in edit.base)) {
+                edit.base[field] = row[field]
+            }
+            edit.fields[field] = value
+            row[field] = value
+            clearTimeout(edit.timer)
+            edit.timer = setTimeout(() => flushAccountEdit(row.username), EDIT_DEBOUNCE)
+        }
+
+        /**
+         * 用服务端数据更新行, 保留还未提交的本地修改
+         */
+        function mergeServerAccount(row, account, pendingFields) {
+            for (const [key, value] of Object.entries(account)) {
+                if (!(key in pendingFields)) {
+                    row[key] = value
+                }
+            }
+        }
+
+        /**
+         * 列表重新加载后把未提交的修改应用到新的行对象上
+         */
+        function reapplyPendingEdits() {
+            if (!pendingEdits.size) {
+                return
+            }
+            const rowsByName = new Map(accounts.value.map(acc => [acc.username, acc]))
+            for (const [username, edit] of pendingEdits) {
+                const row = rowsByName.get(username)
+                if (row) {
+                    Object.assign(row, edit.fields)
+                    edit.row = row
+                }
+            }
+        }
+
+        async function flushAccountEdit(username) {
+            const edit = pendingEdits.get(username)
+            if (!edit || !Object.keys(edit.fields).length) {
+                return
+            }
+            if (edit.inFlight) {
+                // 同一行同时只有一个请求, 上一个请求完成后再提交
+                edit.timer = setTimeout(() => flushAccountEdit(username), EDIT_DEBOUNCE)
+                return
+            }
+
+            const { fields, base } = edit
+            edit.fields = {}
+            edit.base = {}
+            edit.inFlight = true
+            try {
+                const res = await fetch(`/api/accounts/${encodeURIComponent(username)}`, {
+                    method: 'PATCH',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ fields, base, revision: edit.row._version })
+                })
+                const data = await res.json()
+                if (res.ok && data.status === 'success') {
+                    mergeServerAccount(edit.row, data.account, edit.fields)
+                } else if (res.status === 409) {
+                    // 冲突时以服务端数据为准, 只回滚冲突的这一行
+                    mergeServerAccount(edit.row, data.details.account, edit.fields)
+                    message.warning(`账号 ${username} 已在其他地方被修改, 已恢复为最新数据`)
                 } else {
-                    throw new Error(response.message || '设置失败');
+                    throw new Error(data.message || '保存失败')
                 }
             } catch (error) {
-                console.error('设置游戏ID失败:', error);
-                message.error(error.message || '设置失败，请稍后重试');
+                console.error('保存账号修改失败:', error)
+                for (const [key, value] of Object.entries(base)) {
+                    if (!(key in edit.fields)) {
+                        edit.row[key] = value
+                    }
+                }
+                message.error(error.message || '保存失败，请稍后重试')
+            } finally {
+                edit.inFlight = false
+                if (!Object.keys(edit.fields).length) {
+                    pendingEdits.delete(username)
+                }
             }
         }
 
         // 修改登录函数
         async function login(username, password) {
+            // 同一次登录的重试使用相同的幂等键, 后端会复用结果而不是再次重启 Steam
+            const idempotencyKey = `${username}-${Date.now()}-${Math.random().toString(36).slice(2)}`
             try {
                 const response = await retryRequest(async () => {
                     const res = await fetch('/api/login', {
                         method: 'POST',
                         headers: {
                             'Content-Type': 'application/json',
+                            'Idempotency-Key': idempotencyKey,
                         },
                         body: JSON.stringify({ username, password }),
                     });
+                    // 业务错误不重试
+                    if (res.status >= 400 && res.status < 500) return res.json();
                     if (!res.ok) throw new Error('登录失败');
                     return res.json();
                 });
@@ -401,6 +602,11 @@ const app = createApp({
                     if (response.refresh) {
                         await loadAccounts();  // 刷新账号列表
                     }
+                    return response
+                } else if (response.code === 1106) {
+                    // 已被新的切换请求取代
+                    message.info(response.message)
+                    return response
                 } else {
                     throw new Error(response.message || '登录失败');
                 }
@@ -489,9 +695,12 @@ const app = createApp({
                 message.loading(isEdit ? '正在更新账号...' : '正在添加账号...', 1);
 
                 if (isEdit) {
-                    // 更新现有账号
-                    const index = accounts.value.findIndex(acc => acc.username === newAccount.value.username);
-                    accounts.value[index] = { ...accounts.value[index], ...newAccount.value };
+                    // 更新现有账号的密码, 密码只保存在后端凭证库中
+                    await fetch(`/api/accounts/${newAccount.value.username}`, {
+                        method: 'PUT',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ password: newAccount.value.password })
+                    });
                 } else {
                     // 添加新账号
                     await fetch('/api/accounts', {
@@ -546,20 +755,8 @@ const app = createApp({
             })
         }
 
-        const handleGameIdChange = async (account, newValue) => {
-            try {
-                const response = await updateGameId(account.username, newValue)
-                
-                if (response.status === 'error') {
-                    throw new Error(response.message || '保存失败');
-                }
-                
-                account.game_id = newValue;
-                message.success('游戏ID已更新');
-            } catch (error) {
-                message.error('保存失败，请重试');
-                await loadAccounts();  // 出错时重新加载数据
-            }
+        const handleGameIdChange = (account, newValue) => {
+            queueAccountEdit(account, 'game_id', newValue)
         }
 
         // 修改右键菜单选项
@@ -603,9 +800,10 @@ const app = createApp({
                     break
                 case 'edit':
                     if (contextMenu.row) {
+                        // 列表中不包含密码, 编辑时需要重新输入
                         newAccount.value = { 
                             username: contextMenu.row.username,
-                            password: contextMenu.row.password
+                            password: ''
                         }
                         addDialogVisible.value = true  // 复用添加账号的对话框
                     }
@@ -784,11 +982,8 @@ const app = createApp({
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ days })
             }).then(r => r.json()),
-            updateGameId: (username, gameId) => fetch(`/api/accounts/${username}/game_id`, {
-                method: 'PUT',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ game_id: gameId })
-            }).then(r => r.json()),
+            searchAccounts: (query, limit = 200) => fetch(`/api/accounts/search?q=${encodeURIComponent(query)}&limit=${limit}`)
+                .then(r => r.json()),
             login: (username, password) => fetch('/api/login', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
@@ -798,6 +993,9 @@ const app = createApp({
 
         return {
             accounts,
+            displayedAccounts,
+            searchQuery,
+            handleSearchInput,
             columns,
             addDialogVisible,
             newAccount,
@@ -0,0 +1,11 @@
+"""热点路径基准测试
+
+在临时工作目录中使用模拟的 Windows 模块和 Steam 客户端运行, 不会触碰真实的
+注册表、进程或 Steam 数据。结果保存为 JSON, 可与基线对比并在性能回退时返回非零退出码。
+
+用法::
+
+    python -m benchmarks run [-k 关键字] [--sizes 10,1000,100000] [--output 结果.json]
+    python -m benchmarks run --compare benchmarks/baselines/baseline.json
+    python -m benchmarks compare <基线.json> <结果.json> [--threshold 0.2]
+"""
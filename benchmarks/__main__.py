@@ -0,0 +1,82 @@
+import os
+import sys
+import argparse
+
+# 运行时会切换到临时目录, 先固定项目根目录
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import runner  # noqa: E402
+
+
+def _overrides(items):
+    overrides = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        overrides[name] = float(value)
+    return overrides
+
+
+def cmd_run(args):
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = runner.load(os.path.abspath(args.compare)) if args.compare else None
+    sizes = tuple(int(s) for s in args.sizes.split(','))
+
+    from benchmarks.fixtures import Workspace
+    with Workspace():
+        from benchmarks import scenarios  # noqa: F401  注册所有场景
+        data = runner.run_all(sizes=sizes, keyword=args.keyword, min_time=args.min_time)
+
+    if output:
+        runner.save(data, output)
+        print(f"结果已保存: {output}")
+    failed = list(data['errors'])
+    if baseline:
+        print()
+        failed = runner.compare(baseline, data, args.threshold, _overrides(args.threshold_for), args.metric)
+    return 1 if failed else 0
+
+
+def cmd_compare(args):
+    regressions = runner.compare(
+        runner.load(args.baseline), runner.load(args.current),
+        args.threshold, _overrides(args.threshold_for), args.metric
+    )
+    if regressions:
+        print(f"\n性能回退: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+def _add_compare_options(parser):
+    parser.add_argument('--threshold', type=float, default=0.2, help='允许的相对变慢比例, 默认 0.2')
+    parser.add_argument('--threshold-for', action='append', metavar='NAME=VALUE',
+                        help='按名称前缀单独设置阈值, 可重复')
+    parser.add_argument('--metric', choices=('median', 'min', 'mean'), default='median')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='热点路径基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help='运行基准测试')
+    p.add_argument('-k', dest='keyword', help='只运行名称包含该关键字的测试')
+    p.add_argument('--sizes', default=','.join(map(str, runner.DEFAULT_SIZES)), help='数据规模, 逗号分隔')
+    p.add_argument('--min-time', type=float, default=0.5, help='每个测试的最短累计计时(秒)')
+    p.add_argument('--output', help='保存结果的 JSON 文件, 可作为基线')
+    p.add_argument('--compare', metavar='BASELINE', help='与基线对比, 回退时返回非零退出码')
+    _add_compare_options(p)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('compare', help='对比两次结果')
+    p.add_argument('baseline')
+    p.add_argument('current')
+    _add_compare_options(p)
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
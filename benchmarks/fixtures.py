@@ -0,0 +1,136 @@
+"""基准测试工作目录和测试数据生成"""
+import os
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from benchmarks import stubs
+
+STEAM_ID_BASE = 76561198000000000
+
+CONFIG_TEMPLATE = """[General]
+log_level = WARNING
+accounts_file = accounts.json
+
+[Steam]
+path = {steam_exe}
+kill_timeout = 1
+"""
+
+
+# 正在使用的工作目录
+_current = None
+
+
+def username(i):
+    return f"bench_user_{i}"
+
+
+def current_workspace():
+    return _current
+
+
+class Workspace:
+    """临时工作目录: config/config.ini、模拟的 Steam 安装目录和 accounts.json
+
+    进入时切换当前目录并注册模拟模块, 退出时恢复目录并删除临时文件。
+    """
+
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix='steam-switcher-bench-')
+        self.steam_dir = os.path.join(self.root, 'steam')
+        self.steam_exe = os.path.join(self.steam_dir, 'steam.exe')
+        self.steam_config_dir = os.path.join(self.steam_dir, 'config')
+        self._old_cwd = None
+
+    def __enter__(self):
+        os.makedirs(self.steam_config_dir)
+        os.makedirs(os.path.join(self.root, 'config'))
+        open(self.steam_exe, 'wb').close()
+        with open(os.path.join(self.root, 'config', 'config.ini'), 'w', encoding='utf-8') as f:
+            f.write(CONFIG_TEMPLATE.format(steam_exe=self.steam_exe))
+        self.write_loginusers(10)
+        self.write_config_vdf(10)
+        self._old_cwd = os.getcwd()
+        os.chdir(self.root)
+        stubs.install(self.steam_exe)
+        global _current
+        _current = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _current
+        _current = None
+        os.chdir(self._old_cwd)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    @property
+    def loginusers_path(self):
+        return os.path.join(self.steam_config_dir, 'loginusers.vdf')
+
+    @property
+    def config_vdf_path(self):
+        return os.path.join(self.steam_config_dir, 'config.vdf')
+
+    def write_loginusers(self, count):
+        lines = ['"users"', '{']
+        for i in range(count):
+            lines += [
+                f'\t"{STEAM_ID_BASE + i}"',
+                '\t{',
+                f'\t\t"AccountName"\t\t"{username(i)}"',
+                f'\t\t"PersonaName"\t\t"Bench Player {i}"',
+                '\t\t"RememberPassword"\t\t"1"',
+                '\t\t"WantsOfflineMode"\t\t"0"',
+                '\t\t"SkipOfflineModeWarning"\t\t"0"',
+                '\t\t"AllowAutoLogin"\t\t"1"',
+                f'\t\t"MostRecent"\t\t"{1 if i == 0 else 0}"',
+                f'\t\t"Timestamp"\t\t"{1700000000 + i}"',
+                '\t}',
+            ]
+        lines.append('}')
+        with open(self.loginusers_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def write_config_vdf(self, count):
+        from src.utils.vdf_scanner import connect_cache_key
+        accounts = ''.join(
+            f'\t\t\t\t\t"{username(i)}"\n\t\t\t\t\t{{\n\t\t\t\t\t\t"SteamID"\t\t"{STEAM_ID_BASE + i}"\n\t\t\t\t\t}}\n'
+            for i in range(count)
+        )
+        cache = ''.join(
+            f'\t\t\t\t\t"{connect_cache_key(username(i))}"\t\t"{"ab" * 64}"\n'
+            for i in range(count)
+        )
+        text = (
+            '"InstallConfigStore"\n{\n\t"Software"\n\t{\n\t\t"Valve"\n\t\t{\n\t\t\t"Steam"\n\t\t\t{\n'
+            f'\t\t\t\t"Accounts"\n\t\t\t\t{{\n{accounts}\t\t\t\t}}\n'
+            f'\t\t\t\t"ConnectCache"\n\t\t\t\t{{\n{cache}\t\t\t\t}}\n'
+            '\t\t\t}\n\t\t}\n\t}\n}\n'
+        )
+        with open(self.config_vdf_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def write_accounts(self, count, path='accounts.json', banned_every=10):
+        """生成 accounts.json; 每 banned_every 个账号有一个尚未到期的封禁"""
+        ban_time = (datetime.now() + timedelta(days=30)).strftime("%m-%d %H:%M")
+        accounts = []
+        for i in range(count):
+            account = {
+                'username': username(i),
+                'password_enc': 'v1:' + 'A' * 60,
+                'game_id': f'note {i}',
+                'status': '正常',
+                'steam_id': str(STEAM_ID_BASE + i),
+                'persona_name': f'Bench Player {i}',
+                'last_login': f'2024-01-01 00:{i % 60:02d}:00',
+                'can_quick_switch': True,
+                '_version': 1,
+            }
+            if banned_every and i % banned_every == banned_every - 1:
+                account['ban_time'] = ban_time
+                account['status'] = ban_time
+            accounts.append(account)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(accounts, f, ensure_ascii=False, indent=2)
+        return accounts
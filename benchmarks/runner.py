@@ -0,0 +1,157 @@
+"""基准测试注册、计时、结果保存和基线对比"""
+import gc
+import json
+import time
+import platform
+import statistics
+from datetime import datetime
+
+# 已注册的基准测试, 按注册顺序执行
+BENCHMARKS = []
+
+# 默认的数据规模
+DEFAULT_SIZES = (10, 1000, 100000)
+
+
+class Benchmark:
+    """一个基准测试
+
+    func(size) 完成准备工作并返回被计时的无参函数, 或 (函数, 清理函数);
+    sized 为 False 时 func 不接收参数, 只执行一次。
+    """
+
+    def __init__(self, name, func, sized=False, max_rounds=50, max_size=None):
+        self.name = name
+        self.func = func
+        self.sized = sized
+        self.max_rounds = max_rounds
+        self.max_size = max_size
+
+    def cases(self, sizes):
+        if not self.sized:
+            return [(self.name, ())]
+        return [
+            (f"{self.name}[{size}]", (size,))
+            for size in sizes
+            if self.max_size is None or size <= self.max_size
+        ]
+
+
+def benchmark(name, sized=False, max_rounds=50, max_size=None):
+    """注册基准测试的装饰器"""
+    def decorator(func):
+        BENCHMARKS.append(Benchmark(name, func, sized, max_rounds, max_size))
+        return func
+    return decorator
+
+
+def measure(run, min_time=0.5, min_rounds=3, max_rounds=50):
+    """预热一次后重复执行, 直到累计耗时超过 min_time 或达到 max_rounds"""
+    run()
+    timings = []
+    total = 0.0
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(timings) < min_rounds or (total < min_time and len(timings) < max_rounds):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            timings.append(elapsed)
+            total += elapsed
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        'rounds': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def run_all(sizes=DEFAULT_SIZES, keyword=None, min_time=0.5, log=print):
+    """执行所有匹配的基准测试
+
+    Returns:
+        dict: {'meta': ..., 'results': {名称: 统计}, 'errors': {名称: 错误信息}}
+    """
+    results = {}
+    errors = {}
+    for bench in BENCHMARKS:
+        for case_name, args in bench.cases(sizes):
+            if keyword and keyword not in case_name:
+                continue
+            teardown = None
+            try:
+                prepared = bench.func(*args)
+                run, teardown = prepared if isinstance(prepared, tuple) else (prepared, None)
+                stats = measure(run, min_time=min_time, max_rounds=bench.max_rounds)
+                results[case_name] = stats
+                log(f"{case_name:<45} {stats['median'] * 1000:>12.3f} ms  (min {stats['min'] * 1000:.3f}, n={stats['rounds']})")
+            except Exception as e:
+                errors[case_name] = f"{type(e).__name__}: {e}"
+                log(f"{case_name:<45} 失败: {errors[case_name]}")
+            finally:
+                if teardown:
+                    teardown()
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'sizes': list(sizes),
+        },
+        'results': results,
+        'errors': errors,
+    }
+
+
+def save(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.2, overrides=None, metric='median', log=print):
+    """对比两次结果
+
+    Args:
+        threshold: 允许的相对变慢比例, 0.2 表示比基线慢 20% 以内不算回退
+        overrides: {名称前缀: 阈值}, 为波动较大的测试单独设置阈值
+        metric: 用于比较的统计量(median / min / mean)
+
+    Returns:
+        list: 发生回退的测试名称
+    """
+    overrides = overrides or {}
+    regressions = []
+    base_results = baseline.get('results', {})
+    for name, stats in current.get('results', {}).items():
+        base = base_results.get(name)
+        if not base:
+            log(f"{name:<45} {'新增':>10}")
+            continue
+        limit = threshold
+        for prefix, value in overrides.items():
+            if name.startswith(prefix):
+                limit = value
+        ratio = stats[metric] / base[metric] if base[metric] else float('inf')
+        if ratio > 1 + limit:
+            verdict = '回退'
+            regressions.append(name)
+        elif ratio < 1 - limit:
+            verdict = '提升'
+        else:
+            verdict = ''
+        log(f"{name:<45} {base[metric] * 1000:>12.3f} -> {stats[metric] * 1000:>12.3f} ms  {ratio:>6.2f}x  {verdict}")
+    for name in current.get('errors', {}):
+        log(f"{name:<45} 失败: {current['errors'][name]}")
+        regressions.append(name)
+    return regressions
@@ -0,0 +1,453 @@
+"""基准测试场景
+
+导入前必须已进入 fixtures.Workspace, 以便使用模拟模块和临时目录。
+"""
+import os
+import json
+import logging
+import random
+import itertools
+import threading
+import multiprocessing
+from benchmarks import stubs, workers
+from benchmarks.fixtures import current_workspace, username
+from benchmarks.runner import benchmark
+from src.account_manager import AccountManager
+from src.utils.vdf_scanner import scan_config_vdf
+from src.utils.logger import setup_logger
+
+
+# ---- VDF 解析 ----
+
+@benchmark('vdf.read_loginusers', sized=True)
+def bench_read_loginusers(size):
+    from src.steam_manager import SteamManager
+    ws = current_workspace()
+    ws.write_loginusers(size)
+    manager = SteamManager()
+
+    def run():
+        users = manager.read_loginusers_vdf(force_refresh=True)
+        assert len(users) == size
+
+    return run, lambda: ws.write_loginusers(10)
+
+
+@benchmark('vdf.scan_config', sized=True)
+def bench_scan_config(size):
+    ws = current_workspace()
+    ws.write_config_vdf(size)
+
+    def run():
+        assert len(scan_config_vdf(ws.config_vdf_path).session_names) == size
+
+    return run, lambda: ws.write_config_vdf(10)
+
+
+# ---- 账号数据 ----
+
+@benchmark('accounts.load', sized=True)
+def bench_accounts_load(size):
+    path = 'bench_accounts.json'
+    current_workspace().write_accounts(size, path)
+    manager = AccountManager(path)
+    return lambda: manager.load_accounts(force=True)
+
+
+@benchmark('accounts.update_field', sized=True)
+def bench_accounts_update(size):
+    path = 'bench_accounts.json'
+    current_workspace().write_accounts(size, path)
+    manager = AccountManager(path)
+    counter = itertools.count()
+    return lambda: manager.update_fields(username(0), game_id=f'note {next(counter)}')
+
+
+@benchmark('accounts.check_ban_status', sized=True)
+def bench_check_ban_status(size):
+    path = 'bench_accounts.json'
+    current_workspace().write_accounts(size, path)
+    manager = AccountManager(path)
+    return manager.check_ban_status
+
+
+@benchmark('bans.refresh_5000', max_rounds=5)
+def bench_bans_refresh():
+    """对本地模拟的 Steam Web API 强制刷新 5000 个账号, 其中一个请求被限流"""
+    from src.ban_checker import BanChecker
+    from src.utils.config import get_config
+
+    count = 5000
+    api = stubs.MockSteamWebApi()
+    get_config().update({
+        ('BanCheck', 'api_key'): 'bench',
+        ('BanCheck', 'base_url'): api.url,
+        ('BanCheck', 'backoff_initial'): 0.01,
+    })
+    path = 'bans_accounts.json'
+    current_workspace().write_accounts(count, path, banned_every=0)
+    checker = BanChecker(AccountManager(path))
+
+    def run():
+        api.throttle_next = True
+        stats = checker.refresh(force=True)
+        # 每 100 个账号两个请求, 加上一次 429 重试
+        assert stats['requests'] == count // 100 * 2 + 1, stats
+        assert stats['failed'] == 0, stats
+
+    return run, api.close
+
+
+@benchmark('accounts.search', sized=True)
+def bench_accounts_search(size):
+    """按部分账号名、昵称和备注查询"""
+    path = 'bench_accounts.json'
+    current_workspace().write_accounts(size, path)
+    manager = AccountManager(path)
+    manager.build_search_index()
+    target = size // 2
+    queries = [f'user_{target}', f'player {target}', f'note {target}']
+
+    def run():
+        for query in queries:
+            results = manager.search_accounts(query, 20)
+            assert any(a['username'] == username(target) for a, _ in results), f"没有找到: {query}"
+
+    return run
+
+
+@benchmark('accounts.concurrent_writes', max_rounds=3)
+def bench_concurrent_writes():
+    """多进程同时修改同一个账号, 验证没有丢失更新"""
+    path = os.path.abspath('shared_accounts.json')
+    processes, updates = 4, 25
+
+    def run():
+        current_workspace().write_accounts(1, path)
+        procs = [
+            multiprocessing.Process(target=workers.update_worker, args=(path, w, updates, username(0)))
+            for w in range(processes)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            assert proc.exitcode == 0, f"子进程异常退出: {proc.exitcode}"
+        with open(path, 'r', encoding='utf-8') as f:
+            account = json.load(f)[0]
+        lost = [w for w in range(processes) if account.get(f'worker_{w}') != updates - 1]
+        assert not lost, f"丢失更新: {lost}"
+        assert account['_version'] == 1 + processes * updates, f"版本号不正确: {account['_version']}"
+
+    return run
+
+
+@benchmark('accounts.threaded_read_write', sized=True, max_rounds=3, max_size=1000)
+def bench_threaded_read_write(size):
+    """多个线程同时读取和修改账号, 验证读取方不会出错也不会看到不一致的快照"""
+    from src.account_manager import public_view
+    path = 'threaded_accounts.json'
+    readers, writers, writes = 4, 2, 25
+
+    def run():
+        current_workspace().write_accounts(size + writers * writes, path)
+        manager = AccountManager(path)
+        done = threading.Event()
+        errors = []
+        reads = [0] * readers
+
+        def reader(index):
+            try:
+                revision = manager.revision
+                # 等待间隔模拟请求之间的空闲, 避免读取线程一直占用 GIL 把写入方饿死
+                while not done.wait(0.001):
+                    snapshot = manager._snapshot
+                    assert len(snapshot.accounts) == len(snapshot.by_name), "快照不一致"
+                    ordered = sorted(manager.accounts, key=lambda a: a.get('last_login', '') or '1970-01-01')
+                    [public_view(a) for a in ordered[:100]]
+                    manager.get_account(username(0))
+                    manager.changes_since(revision)
+                    reads[index] += 1
+            except Exception as e:
+                errors.append(e)
+
+        def writer(index):
+            try:
+                for i in range(writes):
+                    manager.update_fields(username(index), game_id=f'writer {index} #{i}')
+                    manager.delete_account(username(size + index * writes + i))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads[readers:]:
+            thread.join()
+        done.set()
+        for thread in threads[:readers]:
+            thread.join()
+
+        assert not errors, f"并发读写出错: {errors[0]!r}"
+        assert len(manager.accounts) == size
+        for index in range(writers):
+            assert manager.get_account(username(index))['game_id'] == f'writer {index} #{writes - 1}'
+        assert all(reads), "读取线程没有执行"
+
+    return run
+
+
+# ---- 特征码扫描 ----
+
+@benchmark('scanner.find_field_offset')
+def bench_find_field_offset():
+    """在合成的 16MB 模块镜像中定位用户名字段
+
+    镜像中有一处只差最后一个固定字节的相似片段, 真正的特征码位于已知偏移, 通配符位置为随机字节;
+    第一个特征码在镜像中出现两次, 应被跳过并改用第二个特征码。
+    """
+    from src.utils.signature_scanner import parse_signatures, scan_module_dump
+
+    rng = random.Random(26)
+    image = bytearray(rng.randbytes(16 * 2 ** 20))
+    target, decoy, ambiguous = 0xCC0E00, 0x400000, (0x100000, 0x900000)
+    image[decoy:decoy + 11] = bytes.fromhex('5374 6561 6D 1234 00 416378')
+    image[target:target + 11] = bytes.fromhex('5374 6561 6D') + rng.randbytes(2) + bytes.fromhex('00 416363')
+    for pos in ambiguous:
+        image[pos:pos + 6] = bytes.fromhex('DEAD BEEF 0101')
+    path = os.path.abspath('steamui.dump')
+    with open(path, 'wb') as f:
+        f.write(image)
+    patterns = 'DE AD BE EF 01 01 | 53 74 65 61 6D ?? ?? 00 41 63 63 @ +0x14'
+    assert [s.find(image) for s in parse_signatures(patterns)] == [ambiguous[0], target]
+
+    def run():
+        assert scan_module_dump(path, patterns) == target + 0x14
+
+    return run, lambda: os.remove(path)
+
+
+# ---- API ----
+
+_app = None
+
+
+def _client():
+    global _app
+    if _app is None:
+        from flask import Flask
+        from src.api import api
+        _app = Flask(__name__)
+        _app.register_blueprint(api, url_prefix='/api')
+    return _app.test_client()
+
+
+@benchmark('api.get_accounts', sized=True)
+def bench_api_get_accounts(size):
+    from src import api
+    client = _client()
+    current_workspace().write_accounts(size, api.account_manager.accounts_file)
+    api.account_manager.load_accounts(force=True)
+
+    def run():
+        response = client.get('/api/accounts')
+        assert response.status_code == 200
+        assert len(response.get_json()['accounts']) == size
+
+    return run
+
+
+@benchmark('api.get_accounts_delta', sized=True)
+def bench_api_get_accounts_delta(size):
+    from src import api
+    client = _client()
+    current_workspace().write_accounts(size, api.account_manager.accounts_file)
+    api.account_manager.load_accounts(force=True)
+
+    def run():
+        api.account_manager.update_login_time(username(0))
+        response = client.get(f'/api/accounts?since={api.account_manager.revision - 1}')
+        assert response.status_code == 200
+        assert not response.get_json()['full']
+
+    return run
+
+
+# ---- 日志 ----
+
+def _file_logger(name):
+    """只保留文件处理器的日志记录器, 避免控制台输出影响计时"""
+    logger = setup_logger(name)
+    for handler in list(logger.handlers):
+        if not isinstance(handler, logging.FileHandler):
+            logger.removeHandler(handler)
+        else:
+            handler.setLevel(logging.INFO)
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+@benchmark('logger.info_x1000')
+def bench_logger_info():
+    logger = _file_logger('bench.info')
+
+    def run():
+        for i in range(1000):
+            logger.info(f"切换账号: {username(i)}, 耗时={i * 0.01:.2f}秒")
+
+    return run
+
+
+@benchmark('logger.debug_filtered_x1000')
+def bench_logger_debug_filtered():
+    logger = _file_logger('bench.debug')
+
+    def run():
+        for i in range(1000):
+            logger.debug(f"读取内存数据: 长度={i} 字节")
+
+    return run
+
+
+# ---- 切换流程 ----
+
+def _switch_coordinator():
+    """使用模拟 Steam 的切换协调器, 包含两个可快速切换的账号"""
+    stubs.patch_steam_manager()
+    from src.steam_manager import SteamManager
+    from src.switch_coordinator import SwitchCoordinator
+    from src.launch_profiles import LaunchProfiles
+    from src.login_timeouts import LoginTimeouts
+
+    path = 'switch_accounts.json'
+    current_workspace().write_accounts(2, path, banned_every=0)
+    steam_manager = SteamManager()
+    account_manager = AccountManager(path, steam_manager=steam_manager)
+    account_manager.check_vdf_accounts()
+    return SwitchCoordinator(
+        steam_manager, account_manager,
+        LaunchProfiles(stats_path=os.path.join('config', 'bench_launch_stats.json')),
+        login_timeouts=LoginTimeouts(stats_path=os.path.join('config', 'bench_login_timeouts.json'))
+    )
+
+
+@benchmark('switch.quick_switch', max_rounds=5)
+def bench_quick_switch():
+    """模拟进程、注册表和内存下的完整快速切换流程"""
+    coordinator = _switch_coordinator()
+    counter = itertools.count()
+
+    def run():
+        i = next(counter)
+        coordinator.switch(username(i % 2))
+        assert stubs.fake_steam.current_user == username(i % 2)
+
+    return run
+
+
+# ---- 集群 ----
+
+@benchmark('fleet.poll_and_view', sized=True, max_rounds=3, max_size=1000)
+def bench_fleet_poll_and_view(size):
+    """两个本地模拟节点持续增量变化, 轮询线程合并的同时读取合并视图并转发切换"""
+    from src.fleet import FleetController
+
+    half = size // 2
+    nodes = [
+        stubs.MockFleetNode([username(i) for i in range(size - half)]),
+        stubs.MockFleetNode([username(i) for i in range(half, size)]),
+    ]
+    controller = FleetController(nodes_file=os.path.join('config', 'bench_fleet.json'))
+    for index, node in enumerate(nodes):
+        controller.add_node(f'node{index}', node.url)
+    controller.start(poll=False)
+    controller.refresh()
+    polls, views = 20, 200
+
+    def run():
+        done = threading.Event()
+        errors = []
+
+        def poller():
+            try:
+                for _ in range(polls):
+                    for node in nodes:
+                        node.churn()
+                    controller.refresh()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        thread = threading.Thread(target=poller)
+        thread.start()
+        try:
+            count = 0
+            while not done.is_set() or count < views:
+                view = controller.view()
+                assert all(n['status'] == 'up' for n in view['nodes']), view['nodes']
+                if count % 50 == 0:
+                    target = username(count % size)
+                    assert controller.switch(target)['account']['username'] == target
+                count += 1
+        finally:
+            thread.join()
+
+        assert not errors, f"轮询出错: {errors[0]!r}"
+        controller.refresh()
+        merged = {a['username'] for a in controller.view()['accounts']}
+        assert merged == nodes[0].usernames | nodes[1].usernames, "合并视图与节点不一致"
+        # 首次同步之后只应使用增量结果
+        assert all(node.full_responses == 1 for node in nodes), [n.full_responses for n in nodes]
+
+    def teardown():
+        controller.stop()
+        for node in nodes:
+            node.close()
+
+    return run, teardown
+
+
+@benchmark('switch.idempotent_retry', max_rounds=5)
+def bench_idempotent_retry():
+    """操作完成的同时用相同幂等键重试, 应复用结果而不是出错; 幂等键相同但账号不同时重新切换"""
+    coordinator = _switch_coordinator()
+    finish = coordinator._finish
+    counter = itertools.count()
+
+    def run():
+        key = f'retry-{next(counter)}'
+        target = username(0)
+        retries = []
+
+        def retry():
+            try:
+                retries.append(coordinator.submit(target, idempotency_key=key))
+            except Exception as e:
+                retries.append(e)
+
+        def finish_with_retry(op, result=None, error=None):
+            # 在操作即将记录结果时发起重试; 重试需要等待协调器的锁, 最多等待 50 毫秒
+            if op.key is not None and not retries:
+                thread = threading.Thread(target=retry)
+                thread.start()
+                thread.join(0.05)
+            finish(op, result, error)
+
+        coordinator._finish = finish_with_retry
+        try:
+            op = coordinator.submit(target, idempotency_key=key)
+            op.wait()
+            while not retries:
+                threading.Event().wait(0.001)
+        finally:
+            coordinator._finish = finish
+        assert retries[0] is op, f"重试没有复用结果: {retries[0]!r}"
+
+        other = coordinator.submit(username(1), idempotency_key=key)
+        assert other is not op, "幂等键相同但账号不同时返回了其他账号的结果"
+        other.wait()
+        assert stubs.fake_steam.current_user == username(1)
+
+    return run
@@ -0,0 +1,379 @@
+"""Windows 专用模块和 Steam 客户端的模拟实现
+
+install() 需要在导入 src 之前调用。psutil、winreg、pymem 等模块全部替换为
+操作内存中 FakeSteam 状态的实现, 即使在 Windows 上运行也不会结束真实的 Steam 进程。
+"""
+import io
+import sys
+import json
+import time
+import types
+import builtins
+import itertools
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STEAM_REG_PATH = r"Software\Valve\Steam"
+ACTIVE_PROCESS_PATH = STEAM_REG_PATH + r"\ActiveProcess"
+
+# 模拟的 steamui.dll 模块信息
+MODULE_BASE = 0x10000000
+MODULE_SIZE = 0x100000
+
+
+class FakeProcess:
+    """psutil.Process 的最小实现"""
+
+    _pids = itertools.count(1000)
+
+    def __init__(self, name, steam):
+        self.pid = next(self._pids)
+        self.exited = threading.Event()
+        self._steam = steam
+        self.info = {
+            'name': name,
+            'pid': self.pid,
+            'exe': steam.exe_path,
+            'memory_info': types.SimpleNamespace(rss=64 * 2 ** 20),
+        }
+
+    def kill(self):
+        if self in self._steam.processes:
+            self._steam.processes.remove(self)
+        self.exited.set()
+
+    def is_running(self):
+        return self in self._steam.processes
+
+
+class FakeSteam:
+    """模拟的 Steam 客户端: 注册表、进程表和 steamui.dll 中的用户名字段"""
+
+    def __init__(self):
+        self.exe_path = 'steam.exe'
+        self.registry = {}
+        self.processes = []
+        self.current_user = None
+        self.login_delay = 0.0
+        self.launches = 0
+        self._login_at = 0.0
+
+    def launch(self, cmd):
+        self.launches += 1
+        for proc in self.processes:
+            proc.exited.set()
+        self.processes = [FakeProcess(name, self) for name in ('steam.exe', 'steamwebhelper.exe')]
+        # 与真实 Steam 一样在注册表中登记进程, 作为启动就绪信号
+        self.registry[(ACTIVE_PROCESS_PATH, 'pid')] = self.processes[0].pid
+        if '-login' in cmd:
+            self.current_user = cmd[cmd.index('-login') + 1]
+        else:
+            self.current_user = self.registry.get((STEAM_REG_PATH, 'AutoLoginUser'))
+        self._login_at = time.monotonic() + self.login_delay
+
+    def read_memory(self, size):
+        """用户名字段位于读取窗口的第 20 个字节, 与 monitor_steam_memory 的读取方式一致"""
+        logged_in = self.current_user and time.monotonic() >= self._login_at
+        text = '\0' * 20 + (self.current_user if logged_in else '')
+        return text.ljust(size, '\0')[:size].encode('ascii')
+
+
+fake_steam = FakeSteam()
+
+
+class FakePopen:
+    """模拟的 Steam 进程: 没有输出, 被结束前 wait 一直阻塞"""
+
+    def __init__(self, cmd, stdout=None, **kwargs):
+        fake_steam.launch(cmd)
+        self.args = cmd
+        self._process = fake_steam.processes[0]
+        self.pid = self._process.pid
+        self.stdout = io.BytesIO() if stdout == fake_subprocess.PIPE else None
+        self.returncode = None
+
+    def poll(self):
+        if self._process.exited.is_set():
+            self.returncode = 1
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self._process.exited.wait(timeout):
+            raise TimeoutError(f"process {self.pid} still running")
+        return self.poll()
+
+    def communicate(self, timeout=None):
+        self.wait(timeout)
+        return b'', b''
+
+
+# 替换 src.steam_manager 中的 subprocess, 不能替换全局的 subprocess 模块
+fake_subprocess = types.SimpleNamespace(
+    Popen=FakePopen,
+    PIPE=-1,
+    STDOUT=-2,
+    DEVNULL=-3,
+    CREATE_NO_WINDOW=0x08000000,
+    DETACHED_PROCESS=0x00000008,
+)
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def _winreg():
+    def open_key(hive, path, reserved=0, access=0):
+        return path
+
+    def query_value(key, name):
+        if (key, name) not in fake_steam.registry:
+            raise FileNotFoundError(name)
+        return fake_steam.registry[(key, name)], 1
+
+    def set_value(key, name, reserved, value_type, value):
+        fake_steam.registry[(key, name)] = value
+
+    return _module(
+        'winreg',
+        HKEY_CURRENT_USER='HKCU', HKEY_LOCAL_MACHINE='HKLM',
+        KEY_READ=0x20019, KEY_WRITE=0x20006, KEY_SET_VALUE=0x2, KEY_ALL_ACCESS=0xF003F,
+        REG_SZ=1, REG_DWORD=4,
+        OpenKey=open_key, CreateKeyEx=open_key, CreateKey=lambda hive, path: path,
+        QueryValueEx=query_value, SetValueEx=set_value, CloseKey=lambda key: None,
+    )
+
+
+def _psutil():
+    class NoSuchProcess(Exception):
+        pass
+
+    class AccessDenied(Exception):
+        pass
+
+    def process_iter(attrs=None, ad_value=None):
+        return iter(list(fake_steam.processes))
+
+    def wait_procs(procs, timeout=None, callback=None):
+        return list(procs), []
+
+    def pid_exists(pid):
+        return any(p.pid == pid for p in fake_steam.processes)
+
+    return _module(
+        'psutil',
+        NoSuchProcess=NoSuchProcess, AccessDenied=AccessDenied, TimeoutExpired=TimeoutError,
+        process_iter=process_iter, wait_procs=wait_procs, pid_exists=pid_exists,
+    )
+
+
+def _pymem():
+    class Pymem:
+        def __init__(self, name):
+            for proc in fake_steam.processes:
+                if proc.info['name'] == name:
+                    self.process_id = proc.pid
+                    self.process_handle = proc.pid
+                    return
+            raise RuntimeError(f"process not found: {name}")
+
+        def read_bytes(self, address, size):
+            return fake_steam.read_memory(size)
+
+    def module_from_name(handle, name):
+        return types.SimpleNamespace(lpBaseOfDll=MODULE_BASE, SizeOfImage=MODULE_SIZE)
+
+    process = _module('pymem.process', module_from_name=module_from_name)
+    return _module('pymem', Pymem=Pymem, process=process), process
+
+
+def install(exe_path):
+    """注册模拟模块, exe_path 为模拟的 Steam.exe 路径"""
+    fake_steam.exe_path = exe_path
+    pymem, pymem_process = _pymem()
+    sys.modules.update({
+        'winreg': _winreg(),
+        'psutil': _psutil(),
+        'pymem': pymem,
+        'pymem.process': pymem_process,
+        'win32api': _module('win32api'),
+        'win32con': _module('win32con'),
+        'win32event': _module('win32event'),
+        'win32file': _module('win32file'),
+        'win32process': _module('win32process'),
+        'win32security': _module('win32security'),
+    })
+    if not hasattr(builtins, 'WindowsError'):
+        builtins.WindowsError = OSError
+
+
+def patch_steam_manager():
+    """在 src.steam_manager 导入后替换其中的 subprocess"""
+    import src.steam_manager
+    src.steam_manager.subprocess = fake_subprocess
+
+
+class MockSteamWebApi:
+    """本地模拟的 Steam Web API: GetPlayerBans / GetPlayerSummaries
+
+    SteamID 能被 vac_every 整除的账号返回 VAC 封禁; 设置 throttle_next 后下一个请求返回 429。
+    """
+
+    def __init__(self, vac_every=50):
+        self.vac_every = vac_every
+        self.requests = 0
+        self.throttle_next = False
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                steam_ids = parse_qs(url.query).get('steamids', [''])[0].split(',')
+                with api._lock:
+                    api.requests += 1
+                    throttled, api.throttle_next = api.throttle_next, False
+                if throttled:
+                    self._send(429, {}, {'Retry-After': '0'})
+                elif url.path == '/ISteamUser/GetPlayerBans/v1/':
+                    self._send(200, {'players': [api.ban(i) for i in steam_ids]})
+                elif url.path == '/ISteamUser/GetPlayerSummaries/v2/':
+                    players = [{'steamid': i, 'personaname': f'Api Player {i[-4:]}'} for i in steam_ids]
+                    self._send(200, {'response': {'players': players}})
+                else:
+                    self._send(404, {})
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='mock-steam-api', daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def ban(self, steam_id):
+        vac = int(steam_id) % self.vac_every == 0
+        return {
+            'SteamId': steam_id, 'CommunityBanned': False, 'VACBanned': vac,
+            'NumberOfVACBans': int(vac), 'DaysSinceLastBan': 0, 'NumberOfGameBans': 0, 'EconomyBan': 'none',
+        }
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MockFleetNode:
+    """本地模拟的集群节点: GET /api/accounts(支持 since 增量)和 POST /api/login
+
+    churn() 每次新增一个账号并删除最早新增的账号, 使轮询收到增量的 upserts 和 deletes。
+    """
+
+    def __init__(self, usernames):
+        self.revision = 1
+        self.full_responses = 0
+        self.logins = 0
+        self._accounts = {name: {'username': name, 'status': '正常', '_version': 1} for name in usernames}
+        # 变更日志: (版本, 账号名, 账号或 None 表示删除)
+        self._changes = []
+        self._extra = itertools.count()
+        self._lock = threading.Lock()
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != '/api/accounts':
+                    return self._send(404, {'status': 'error'})
+                since = parse_qs(url.query).get('since', [None])[0]
+                self._send(200, node.accounts_response(int(since) if since else None))
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if self.path != '/api/login':
+                    return self._send(404, {'status': 'error'})
+                self._send(200, node.login(body.get('username', '')))
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='mock-fleet-node', daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    @property
+    def usernames(self):
+        with self._lock:
+            return set(self._accounts)
+
+    def accounts_response(self, since):
+        with self._lock:
+            if since is not None and since <= self.revision:
+                changes = {name: account for version, name, account in self._changes if version > since}
+                return {
+                    'status': 'success', 'full': False, 'revision': self.revision,
+                    'upserts': [a for a in changes.values() if a is not None],
+                    'deletes': [name for name, a in changes.items() if a is None],
+                }
+            self.full_responses += 1
+            return {
+                'status': 'success', 'full': True, 'revision': self.revision,
+                'accounts': list(self._accounts.values()),
+            }
+
+    def churn(self):
+        with self._lock:
+            self.revision += 1
+            name = f'extra_{next(self._extra)}'
+            account = {'username': name, 'status': '正常', '_version': 1}
+            self._accounts[name] = account
+            self._changes.append((self.revision, name, account))
+            extras = [n for n in self._accounts if n.startswith('extra_')]
+            if len(extras) > 1:
+                del self._accounts[extras[0]]
+                self._changes.append((self.revision, extras[0], None))
+
+    def login(self, username):
+        with self._lock:
+            account = self._accounts.get(username)
+            if account is None:
+                return {'status': 'error', 'code': 1200, 'message': f'账号 {username} 不存在'}
+            self.logins += 1
+            self.revision += 1
+            account = {**account, 'most_recent': True, '_version': account['_version'] + 1}
+            self._accounts[username] = account
+            self._changes.append((self.revision, username, account))
+            return {'status': 'success', 'refresh': True, 'account': account}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,12 @@
+"""在子进程中执行的任务
+
+单独成模块, 以 spawn 方式启动子进程时只导入这里用到的模块。
+"""
+
+
+def update_worker(path, worker, updates, target):
+    """反复修改同一个账号的本进程专属字段"""
+    from src.account_manager import AccountManager
+    manager = AccountManager(path)
+    for i in range(updates):
+        manager.update_fields(target, **{f'worker_{worker}': i})
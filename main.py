@@ -1,16 +1,47 @@
-﻿import webview
+﻿import sys
+import argparse
+from src.utils.ipc import IPC_HOST, IPC_PORT, IpcServer, acquire_instance_lock, create_token, forward_command
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='Steam Account Switcher')
+    parser.add_argument('--switch', metavar='USER', help='启动后切换到指定账号')
+    parser.add_argument('--reload-config', action='store_true', help='让运行中的实例重新加载配置')
+    return parser.parse_args(argv)
+
+def check_single_instance():
+    """确保只运行一个实例"""
+    # 绑定特定端口, 该端口同时用作实例间命令通道; 返回的 socket 需要保持打开
+    return acquire_instance_lock()
+
+def forward_to_running_instance(args):
+    """把命令转发给已运行的实例, 返回是否成功"""
+    if args.switch:
+        response = forward_command('switch', username=args.switch)
+    elif args.reload_config:
+        response = forward_command('reload_config')
+    else:
+        response = forward_command('focus')
+    return bool(response and response.get('status') == 'success')
+
+if __name__ == '__main__':
+    # 在导入 Flask/WebView 之前检查单实例, 第二个实例转发命令后立即退出
+    ARGS = parse_args()
+    INSTANCE_LOCK = check_single_instance()
+    if INSTANCE_LOCK is None:
+        sys.exit(0 if forward_to_running_instance(ARGS) else 1)
+
+import webview
 from flask import Flask, send_from_directory
-from src.account_manager import AccountManager
-from src.api import api
+from src.account_manager import AccountManager, public_view
+from src.api import api, account_manager, game_library, ban_checker
 import os
-import sys
-import socket
 import logging
 import threading
 import time
 from src.utils.logger import setup_logger
 import traceback
-import configparser
+from src.utils.config import get_config
 
 # 禁用 Flask 默认的日志输出
 logging.getLogger('werkzeug').disabled = True
@@ -70,17 +101,6 @@ def setup_logging():
     werkzeug_logger.setLevel(logging.DEBUG)
     werkzeug_logger.addHandler(console_handler)
 
-def check_single_instance():
-    """确保只运行一个实例"""
-    try:
-        # 创建 socket 并尝试绑定到特定端口
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.bind(('localhost', 12345))  # 使用一个不常用的端口
-        # 保持 socket 打开
-        return sock
-    except socket.error:
-        return None
-
 def get_base_path():
     """获取基础路径，兼容打包后的路径"""
     if getattr(sys, 'frozen', False):
@@ -258,9 +278,7 @@ class WebViewManager:
         try:
             logger.info("准备启动WebView...")
             # 从配置文件读取debug选项
-            config = configparser.ConfigParser()
-            config.read('config/config.ini', encoding='utf-8')
-            enable_debug = config.getboolean('General', 'enable_webview_debug', fallback=False)
+            enable_debug = get_config().get('General', 'enable_webview_debug')
             
             logger.info(f"WebView debug模式: {'启用' if enable_debug else '禁用'}")
             webview.start(debug=enable_debug)
@@ -277,7 +295,37 @@ class WebViewManager:
             except Exception as e:
                 logger.error(f"关闭窗口失败: {str(e)}", exc_info=True)
 
-def main():
+def start_ipc_server(sock, webview_manager):
+    """在单实例锁 socket 上处理其他实例转发的命令"""
+    from src.api import switch_coordinator
+    
+    def switch(username, password=None, wait=False):
+        if wait:
+            # 命令行切换等待结果, 与界面发起的切换共用同一个协调器串行执行
+            return public_view(switch_coordinator.switch(username, password))
+        # 异步执行, 转发方无需等待登录完成
+        switch_coordinator.submit(username)
+        return {"accepted": username}
+    
+    def focus():
+        if webview_manager.window:
+            webview_manager.window.restore()
+            webview_manager.window.show()
+        return {"focused": bool(webview_manager.window)}
+    
+    def reload_config():
+        return {"reloaded": get_config().check_reload(force=True)}
+    
+    server = IpcServer(sock, {
+        'switch': switch,
+        'focus': focus,
+        'reload_config': reload_config,
+    }, create_token())
+    server.start()
+    logger.info(f"实例命令通道已启动: {IPC_HOST}:{IPC_PORT}")
+    return server
+
+def main(args=None, instance_lock=None):
     """主程序入口"""
     webview_manager = None
     try:
@@ -286,6 +334,14 @@ def main():
         logger.info("=== Steam Account Switcher 启动 ===")
         logger.info("正在初始化系统...")
         
+        # 监听配置文件变化, 支持运行时调整配置
+        get_config().start_watching()
+        
+        # 尽早启动实例命令通道, 窗口创建前收到的聚焦命令会被忽略
+        webview_manager = WebViewManager()
+        if instance_lock:
+            start_ipc_server(instance_lock, webview_manager)
+        
         # 确保静态文件
         logger.info("检查静态文件...")
         if not ensure_static_files():
@@ -298,7 +354,7 @@ def main():
         flask_app = FlaskApp()
         server_thread = threading.Thread(
             target=flask_app.run,
-            kwargs={'host': '127.0.0.1', 'port': 5000}
+            kwargs={'host': get_config().get('Fleet', 'listen_host'), 'port': 5000}
         )
         server_thread.daemon = True
         server_thread.start()
@@ -310,13 +366,21 @@ def main():
             raise RuntimeError("Flask服务器启动失败")
         logger.info("Flask服务已就绪")
         
+        # 后台建立游戏库索引和账号搜索索引, 按配置定时刷新封禁状态
+        game_library.start()
+        ban_checker.start()
+        threading.Thread(target=account_manager.build_search_index, name='search-index', daemon=True).start()
+        
         # 创建并启动 WebView
         logger.info("正在创建主窗口...")
-        webview_manager = WebViewManager()
         webview_manager.create_window(
             'Steam Account Switcher',
             'http://127.0.0.1:5000'
         )
+        
+        if args and args.switch:
+            from src.api import switch_coordinator
+            switch_coordinator.submit(args.switch)
         logger.info("正在启动WebView...")
         webview_manager.start()
         
@@ -328,4 +392,4 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main(ARGS, INSTANCE_LOCK) 
\ No newline at end of file
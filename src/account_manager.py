@@ -0,0 +1,727 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from src.utils.logger import setup_logger
+from src.utils.error_codes import ErrorCode
+from src.utils.exceptions import AccountError
+from src.utils.config import get_config
+from src.utils.file_lock import FileLock, LockTimeout
+from src.utils.trigram_index import TrigramIndex
+
+logger = setup_logger('account_manager')
+
+# 变更日志最多保留的条目数, 更早的变更需要客户端重新获取全量数据
+CHANGELOG_SIZE = 2000
+
+# 从 VDF 同步到账号上的字段
+VDF_FIELDS = (
+    'steam_id', 'persona_name', 'session_cached', 'can_quick_switch',
+    'remember_password', 'allow_auto_login', 'most_recent'
+)
+
+# 不允许通过列表接口返回的字段
+SECRET_FIELDS = ('password', 'password_enc')
+
+# 每台机器各自从本地 VDF 计算的字段, 不参与多机合并
+MACHINE_FIELDS = frozenset(VDF_FIELDS) | {'_version'}
+
+# 等待 accounts.json 写锁的最长时间(秒)
+LOCK_TIMEOUT = 10
+
+# 参与搜索的字段, 靠前的字段匹配时排序靠前
+SEARCH_FIELDS = ('username', 'persona_name', 'game_id')
+MATCH_TYPES = ('exact', 'prefix', 'substring', 'fuzzy')
+
+
+def public_view(account):
+    """去掉密码等敏感字段后的账号信息"""
+    return {k: v for k, v in account.items() if k not in SECRET_FIELDS}
+
+
+class LoginUsersIndex:
+    """loginusers.vdf 用户索引
+
+    按小写 AccountName 和 SteamID64 维护 VDF 用户信息,
+    每次更新只对比发生变化的用户, 返回受影响的账号名。
+    """
+
+    def __init__(self):
+        self._raw = {}
+        self.by_name = {}
+        self.by_steam_id = {}
+        self._source = None
+
+    @staticmethod
+    def _build_entry(steam_id, user):
+        return {
+            'steam_id': steam_id,
+            'account_name': user.get('AccountName', ''),
+            'persona_name': user.get('PersonaName', ''),
+            'remember_password': user.get('RememberPassword') == '1',
+            'allow_auto_login': user.get('AllowAutoLogin') == '1',
+            'most_recent': user.get('MostRecent') == '1',
+            'timestamp': user.get('Timestamp', '')
+        }
+
+    def update(self, users):
+        """用最新的 VDF 用户数据更新索引
+
+        Args:
+            users: read_loginusers_vdf 返回的 {steam_id: user} 字典
+
+        Returns:
+            set: 发生变化的小写账号名
+        """
+        # 同一份缓存对象无需再次对比
+        if users is self._source:
+            return set()
+        self._source = users
+
+        changed = set()
+        for steam_id in list(self._raw):
+            if steam_id not in users:
+                old = self.by_steam_id.pop(steam_id)
+                self._raw.pop(steam_id)
+                name = old['account_name'].lower()
+                if self.by_name.get(name) is old:
+                    self.by_name.pop(name)
+                changed.add(name)
+
+        for steam_id, user in users.items():
+            if self._raw.get(steam_id) == user:
+                continue
+            old = self.by_steam_id.get(steam_id)
+            if old:
+                old_name = old['account_name'].lower()
+                if self.by_name.get(old_name) is old:
+                    self.by_name.pop(old_name)
+                changed.add(old_name)
+            entry = self._build_entry(steam_id, user)
+            self._raw[steam_id] = dict(user)
+            self.by_steam_id[steam_id] = entry
+            name = entry['account_name'].lower()
+            self.by_name[name] = entry
+            changed.add(name)
+        return changed
+
+    def get(self, username):
+        """按账号名获取 VDF 用户信息"""
+        return self.by_name.get(username.lower())
+
+
+class AccountSnapshot:
+    """某一时刻的账号列表, 发布后不再修改"""
+
+    __slots__ = ('accounts', 'by_name')
+
+    def __init__(self, accounts):
+        self.accounts = tuple(accounts)
+        self.by_name = {a['username'].lower(): a for a in self.accounts}
+
+
+class AccountManager:
+    """账号管理类, 负责 accounts.json 的读写和账号状态维护
+
+    读取方通过 accounts / get_account 使用当前发布的快照, 不需要加锁;
+    所有修改在写锁内复制受影响的账号后发布新快照, 已发布的账号字典不会被原地修改。
+
+    accounts.json 可以放在多台机器共用的网络共享上: 每条记录带 _version,
+    保存时只提交本机修改过的字段, 文件已被其他机器改写时重新读取并合并。
+    """
+
+    def __init__(self, accounts_file=None, steam_manager=None, vault=None):
+        self.accounts_file = accounts_file or get_config().get('General', 'accounts_file')
+        self.steam_manager = steam_manager
+        self._vault = vault
+        self._vault_lock = threading.Lock()
+        # 改为共享凭证库之前用本机凭证库加密的密码, 解密后用共享凭证库重新加密
+        self._local_vault = None
+        self.vdf_index = LoginUsersIndex()
+        self._sessions = None
+        self._snapshot = AccountSnapshot(())
+        self._write_lock = threading.RLock()
+        # 搜索索引在第一次搜索时建立, 之后随快照发布增量更新
+        self._search_index = None
+        self._file_stat = None
+        # 上次读取或写入的文件内容哈希, 共享目录上同一修改时间刻度内的等长改写只能靠它发现
+        self._file_hash = None
+        # 尚未写入文件的本地修改: 小写账号名 -> 修改过的字段, None 表示已删除
+        self._dirty = {}
+        self._created = set()
+        # 以启动时间作为初始版本号, 重启后旧客户端的版本号必然早于日志起点
+        self.revision = int(time.time() * 1000)
+        self._changelog = deque(maxlen=CHANGELOG_SIZE)
+        self._changelog_floor = self.revision
+        self.load_accounts()
+
+    @property
+    def accounts(self):
+        """当前账号列表快照(只读)"""
+        return self._snapshot.accounts
+
+    @property
+    def _by_name(self):
+        return self._snapshot.by_name
+
+    def _publish(self, accounts):
+        old = self._snapshot.by_name
+        self._snapshot = AccountSnapshot(accounts)
+        if self._search_index is not None:
+            self._reindex(old, self._snapshot.by_name)
+
+    def _reindex(self, old, new):
+        """按新旧快照的差异更新搜索索引, 未修改的账号仍是同一个字典对象"""
+        for key, account in new.items():
+            if old.get(key) is not account:
+                self._search_index.update(key, [account.get(f) for f in SEARCH_FIELDS])
+        for key in old.keys() - new.keys():
+            self._search_index.remove(key)
+
+    def _replace(self, updated):
+        """用修改后的账号副本替换同名账号并发布新快照
+
+        Args:
+            updated: {小写账号名: 新的账号字典}
+        """
+        self._publish(updated.get(a['username'].lower(), a) for a in self.accounts)
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.accounts_file)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def load_accounts(self, force=False):
+        """加载账号数据, 文件未变化时直接使用内存中的数据"""
+        signature = self._file_signature()
+        if not force and signature is not None and signature == self._file_stat:
+            return self.accounts
+
+        with self._write_lock:
+            signature = self._file_signature()
+            if not force and signature is not None and signature == self._file_stat:
+                return self.accounts
+            try:
+                accounts, self._file_hash = self._read_file() if signature is not None else ([], None)
+                self._file_stat = signature
+            except Exception as e:
+                logger.error(f"加载账号数据失败: {str(e)}", exc_info=True)
+                raise AccountError(
+                    ErrorCode.ACCOUNT_DATA_ERROR,
+                    f"加载账号数据失败: {str(e)}"
+                ).with_cause(e)
+
+            plaintext = 0
+            for account in accounts:
+                self._apply_vdf_entry(account)
+                # 把旧版明文密码迁移到凭证库
+                if 'password' in account:
+                    account['password_enc'] = self.vault.encrypt(account['username'], account.pop('password'))
+                    self._mark_dirty(account['username'], ('password', 'password_enc'))
+                    plaintext += 1
+            self._publish(accounts)
+            if plaintext:
+                logger.info(f"已加密 {plaintext} 个账号的明文密码")
+                self.save_accounts()
+            # 文件被外部修改时无法得知具体变更, 丢弃日志让客户端获取全量数据;
+            # 先推进日志起点再清空日志, 最后更新版本号, 读取方不会看到空日志搭配新版本号
+            self._changelog_floor = self.revision + 1
+            self._changelog.clear()
+            self.revision = self._changelog_floor
+            return self.accounts
+
+    def _mark_dirty(self, username, fields, created=False):
+        """记录本地修改的字段, 保存时只把这些字段合并到文件中的最新数据上"""
+        key = username.lower()
+        dirty = self._dirty.get(key)
+        if dirty is None:
+            dirty = self._dirty[key] = set()
+        dirty.update(f for f in fields if f not in MACHINE_FIELDS)
+        if created:
+            self._created.add(key)
+
+    def _mark_deleted(self, username):
+        key = username.lower()
+        self._dirty[key] = None
+        self._created.discard(key)
+
+    def _read_file(self):
+        """返回 (账号列表, 文件内容哈希), 文件不存在时为 ([], None)"""
+        try:
+            with open(self.accounts_file, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return [], None
+        return json.loads(data.decode('utf-8')), hashlib.sha256(data).hexdigest()
+
+    def _file_digest(self):
+        try:
+            with open(self.accounts_file, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def _merge_from_disk(self):
+        """以文件中的最新数据为基础, 重新应用本机修改过的字段
+
+        其他机器删除的账号上的修改会被丢弃, 本机新增的账号追加到末尾。
+        """
+        merged = []
+        seen = set()
+        for record in self._read_file()[0]:
+            key = record['username'].lower()
+            seen.add(key)
+            if key in self._dirty and self._dirty[key] is None:
+                continue
+            local = self._by_name.get(key)
+            fields = self._dirty.get(key)
+            if fields and local is not None:
+                for field in fields:
+                    if field in local:
+                        record[field] = local[field]
+                    else:
+                        record.pop(field, None)
+                record['_version'] = record.get('_version', 0) + 1
+            merged.append(record)
+        for key in self._created - seen:
+            if key in self._by_name:
+                merged.append(dict(self._by_name[key]))
+        return merged
+
+    def _adopt(self, merged):
+        """使用合并后的数据, 其他机器带来的变化记入变更日志"""
+        old = self._by_name
+        for account in merged:
+            self._apply_vdf_entry(account)
+        self._publish(merged)
+        new = self._by_name
+        for key in old.keys() | new.keys():
+            account = new.get(key)
+            if account != old.get(key):
+                self._record_change((account or old[key])['username'], deleted=account is None)
+
+    def save_accounts(self):
+        """提交本地修改
+
+        在文件锁外序列化数据, 持锁后比较文件状态: 文件自上次读取后未被修改时直接替换,
+        否则重新读取并合并后再写入, 尽量缩短持有文件锁的时间。
+        """
+        with self._write_lock:
+            try:
+                if self._dirty:
+                    self._publish(self._bump_versions())
+                payload = json.dumps(list(self.accounts), ensure_ascii=False, indent=2)
+
+                merged = None
+                with FileLock(f"{self.accounts_file}.lock", timeout=LOCK_TIMEOUT):
+                    # 修改时间精度有限, 状态相同时再比较内容哈希
+                    if self._file_signature() != self._file_stat or self._file_digest() != self._file_hash:
+                        logger.info("账号文件已被其他进程修改, 合并后保存")
+                        merged = self._merge_from_disk()
+                        payload = json.dumps(merged, ensure_ascii=False, indent=2)
+                    data = payload.encode('utf-8')
+                    tmp_path = f"{self.accounts_file}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, self.accounts_file)
+                    self._file_stat = self._file_signature()
+                    self._file_hash = hashlib.sha256(data).hexdigest()
+
+                if merged is not None:
+                    self._adopt(merged)
+                self._dirty.clear()
+                self._created.clear()
+            except LockTimeout as e:
+                logger.error(f"保存账号数据失败: {str(e)}")
+                raise AccountError(
+                    ErrorCode.ACCOUNT_DATA_ERROR,
+                    "账号文件被其他程序占用, 请稍后重试"
+                ).with_cause(e)
+            except Exception as e:
+                logger.error(f"保存账号数据失败: {str(e)}", exc_info=True)
+                raise AccountError(
+                    ErrorCode.ACCOUNT_DATA_ERROR,
+                    f"保存账号数据失败: {str(e)}"
+                ).with_cause(e)
+
+    def _bump_versions(self):
+        """为本地修改过的账号生成 _version 加一的副本"""
+        accounts = []
+        for account in self.accounts:
+            if self._dirty.get(account['username'].lower()) is not None:
+                account = dict(account, _version=account.get('_version', 0) + 1)
+            accounts.append(account)
+        return accounts
+
+    @property
+    def vault(self):
+        """密码凭证库, 首次加解密密码时才创建, 不使用密码的命令不需要导入 cryptography"""
+        if self._vault is None:
+            with self._vault_lock:
+                if self._vault is None:
+                    from src.credential_vault import CredentialVault, vault_for
+                    vault = vault_for(self.accounts_file)
+                    if vault.require_passphrase:
+                        # 本机凭证库原来用口令时没有 vault.key, 否则口令现在用于共享凭证库, 本机凭证库只能用 vault.key
+                        local_vault = CredentialVault()
+                        if os.path.exists(local_vault.secret_path):
+                            local_vault = CredentialVault(use_passphrase=False)
+                        if os.path.exists(local_vault.meta_path):
+                            self._local_vault = local_vault
+                    self._vault = vault
+        return self._vault
+
+    def get_password(self, username):
+        """解密单个账号的密码, 只在密码登录时调用"""
+        account = self.get_account(username)
+        if not account or not account.get('password_enc'):
+            return None
+        try:
+            return self.vault.decrypt(account['username'], account['password_enc'])
+        except AccountError:
+            if self._local_vault is None:
+                raise
+        password = self._local_vault.decrypt(account['username'], account['password_enc'])
+        self.update_fields(account['username'], password=password)
+        logger.info(f"密码已迁移到共享凭证库: {account['username']}")
+        return password
+
+    def _record_change(self, username, deleted=False):
+        """记录账号变更, 日志满时推进日志起点
+
+        先写入日志再更新版本号, 读取方读到的版本号对应的变更一定已经在日志中。
+        """
+        if len(self._changelog) == self._changelog.maxlen:
+            self._changelog_floor = self._changelog[0][0]
+        revision = self.revision + 1
+        self._changelog.append((revision, username, deleted))
+        self.revision = revision
+
+    def changes_since(self, revision):
+        """获取指定版本之后的账号变更
+
+        Args:
+            revision: 客户端已同步到的版本号
+
+        Returns:
+            dict: {'upserts': [...], 'deletes': [...], 'revision': 本次结果对应的版本号},
+                版本已被日志淘汰时返回 None
+        """
+        # 依次读取版本号、日志、快照: 写入方先发布快照再记录变更, 再更新版本号,
+        # 因此日志包含版本号之前的所有变更, 快照中的数据不会比日志旧
+        current = self.revision
+        changelog = tuple(self._changelog)
+        if revision < self._changelog_floor or revision > current:
+            return None
+        by_name = self._by_name
+        latest = {}
+        for rev, username, deleted in changelog:
+            if revision < rev <= current:
+                latest[username.lower()] = (username, deleted)
+        upserts = []
+        deletes = []
+        for key, (username, deleted) in latest.items():
+            account = by_name.get(key)
+            if deleted or account is None:
+                deletes.append(username)
+            else:
+                upserts.append(account)
+        return {'upserts': upserts, 'deletes': deletes, 'revision': current}
+
+    def get_account(self, username):
+        """按用户名获取账号"""
+        return self._by_name.get(username.lower())
+
+    def build_search_index(self):
+        """建立搜索索引, 账号很多时可以在后台线程提前调用"""
+        if self._search_index is not None:
+            return
+        with self._write_lock:
+            if self._search_index is None:
+                self._search_index = TrigramIndex(
+                    (key, [account.get(f) for f in SEARCH_FIELDS])
+                    for key, account in self._by_name.items()
+                )
+
+    def search_accounts(self, query, limit=20):
+        """按账号名、昵称和游戏ID备注搜索
+
+        完全匹配优先, 其次是前缀匹配和包含匹配, 都没有时返回相近的结果(容忍拼写错误)。
+
+        Returns:
+            list: [(账号, 匹配类型)], 匹配类型为 exact / prefix / substring / fuzzy
+        """
+        self.build_search_index()
+        by_name = self._by_name
+        return [
+            (by_name[key], MATCH_TYPES[match])
+            for key, match in self._search_index.search(query, limit)
+            if key in by_name
+        ]
+
+    def add_account(self, username, password):
+        """添加账号并关联 VDF 用户信息"""
+        with self._write_lock:
+            if self.get_account(username):
+                raise AccountError(
+                    ErrorCode.ACCOUNT_ALREADY_EXISTS,
+                    f"账号已存在: {username}"
+                )
+            account = {
+                'username': username,
+                'password_enc': self.vault.encrypt(username, password),
+                'game_id': '',
+                'status': '正常',
+                'steam_id': '',
+                'persona_name': '',
+                'last_login': '',
+                'can_quick_switch': False
+            }
+            self._apply_vdf_entry(account)
+            self._publish(self.accounts + (account,))
+            self._mark_dirty(username, account, created=True)
+            self.save_accounts()
+            self._record_change(username)
+            return self.get_account(username)
+
+    def delete_account(self, username):
+        """删除账号"""
+        with self._write_lock:
+            self._publish(a for a in self.accounts if a['username'] != username)
+            self._mark_deleted(username)
+            self.save_accounts()
+            self._record_change(username, deleted=True)
+
+    def update_fields(self, username, **fields):
+        """更新账号字段并记录变更
+
+        Returns:
+            dict: 更新后的账号, 账号不存在时返回 None
+        """
+        with self._write_lock:
+            account = self.get_account(username)
+            if not account:
+                return None
+            if 'password' in fields:
+                fields['password_enc'] = self.vault.encrypt(account['username'], fields.pop('password'))
+            account = dict(account, **fields)
+            self._replace({account['username'].lower(): account})
+            self._mark_dirty(account['username'], fields)
+            self.save_accounts()
+            self._record_change(account['username'])
+            return self.get_account(username)
+
+    def patch_account(self, username, fields, revision=None, base=None):
+        """按字段修改账号, 用于客户端的乐观更新
+
+        Args:
+            fields: 要修改的字段
+            revision: 客户端修改前看到的 _version, 为 None 时不检查
+            base: 客户端修改前各字段的值; 版本不一致但这些字段未被改动时仍然接受修改
+
+        Returns:
+            dict: 更新后的账号, 账号不存在时返回 None
+
+        Raises:
+            AccountError: ACCOUNT_CONFLICT, details 中带有服务端当前的账号数据
+        """
+        with self._write_lock:
+            self.load_accounts()
+            account = self.get_account(username)
+            if not account:
+                return None
+            if revision is not None and account.get('_version', 0) != revision:
+                base = base or {}
+                stale = [f for f in fields if f not in base or account.get(f) != base[f]]
+                if stale:
+                    raise AccountError(
+                        ErrorCode.ACCOUNT_CONFLICT,
+                        f"账号 {username} 已被其他操作修改: {', '.join(stale)}",
+                        details={'fields': stale, 'account': public_view(account)}
+                    )
+            return self.update_fields(username, **fields)
+
+    def replace_accounts(self, accounts):
+        """用新的账号列表整体替换"""
+        with self._write_lock:
+            old_names = {a['username'] for a in self.accounts}
+            for account in accounts:
+                old = self.get_account(account['username'])
+                password = account.pop('password', None)
+                if password is not None:
+                    account['password_enc'] = self.vault.encrypt(account['username'], password)
+                elif 'password_enc' not in account:
+                    # 客户端拿到的列表不含密码, 保留原有的加密密码
+                    if old and old.get('password_enc'):
+                        account['password_enc'] = old['password_enc']
+                if old is None:
+                    self._mark_dirty(account['username'], account, created=True)
+                else:
+                    # 只提交与原数据不同的字段, 避免覆盖其他机器对其余字段的修改
+                    self._mark_dirty(account['username'], [
+                        k for k in account.keys() | old.keys() if account.get(k) != old.get(k)
+                    ])
+                self._apply_vdf_entry(account)
+            for username in old_names - {a['username'] for a in accounts}:
+                self._mark_deleted(username)
+            self._publish(accounts)
+            self.save_accounts()
+            for account in accounts:
+                self._record_change(account['username'])
+            for username in old_names - {a['username'] for a in accounts}:
+                self._record_change(username, deleted=True)
+
+    def update_game_id(self, username, game_id):
+        """更新游戏ID备注"""
+        return self.update_fields(username, game_id=game_id) is not None
+
+    def update_login_time(self, username):
+        """更新最近登录时间"""
+        return self.update_fields(username, last_login=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    def set_ban_days(self, username, days):
+        """设置封禁天数, status 中显示封禁结束时间
+
+        Returns:
+            dict: 更新后的账号, 账号不存在时返回 None
+        """
+        ban_time = (datetime.now() + timedelta(days=days)).strftime("%m-%d %H:%M")
+        return self.update_fields(username, ban_time=ban_time, status=ban_time)
+
+    @staticmethod
+    def _ban_expired(account, now):
+        ban_time = account.get('ban_time')
+        if not ban_time:
+            return False
+        try:
+            ban_end = datetime.strptime(f"{now.year}-{ban_time}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            logger.warning(f"封禁时间格式不正确: {account['username']} {ban_time}")
+            return False
+        # 封禁时间不带年份, 取离当前时间最近的年份以处理跨年
+        if ban_end - now > timedelta(days=183):
+            ban_end = ban_end.replace(year=now.year - 1)
+        elif now - ban_end > timedelta(days=183):
+            ban_end = ban_end.replace(year=now.year + 1)
+        return now >= ban_end
+
+    def check_ban_status(self):
+        """检查封禁是否到期
+
+        Returns:
+            list: 本次解封的账号名
+        """
+        now = datetime.now()
+        expired = [a['username'] for a in self.accounts if self._ban_expired(a, now)]
+        if not expired:
+            return []
+
+        unbanned = {}
+        with self._write_lock:
+            # 持锁后按最新快照重新确认, 其他线程可能已经处理过
+            for username in expired:
+                account = self.get_account(username)
+                if not account or not self._ban_expired(account, now):
+                    continue
+                account = dict(account, status='已解封')
+                account.pop('ban_time', None)
+                unbanned[username.lower()] = account
+                self._mark_dirty(username, ('ban_time', 'status'))
+            if unbanned:
+                logger.info(f"账号已解封: {', '.join(a['username'] for a in unbanned.values())}")
+                self._replace(unbanned)
+                self.save_accounts()
+                for account in unbanned.values():
+                    self._record_change(account['username'])
+        return [a['username'] for a in unbanned.values()]
+
+    def update_many(self, updates):
+        """批量更新多个账号的字段, 只保存一次
+
+        Args:
+            updates: {账号名: {字段: 新值}}
+
+        Returns:
+            list: 字段实际发生变化的账号名
+        """
+        changed = {}
+        with self._write_lock:
+            for username, fields in updates.items():
+                account = self.get_account(username)
+                if not account:
+                    continue
+                fields = {k: v for k, v in fields.items() if account.get(k) != v}
+                if not fields:
+                    continue
+                changed[username.lower()] = dict(account, **fields)
+                self._mark_dirty(username, fields)
+            if changed:
+                self._replace(changed)
+                self.save_accounts()
+                for account in changed.values():
+                    self._record_change(account['username'])
+        return [a['username'] for a in changed.values()]
+
+    def _apply_vdf_entry(self, account):
+        """把 VDF 索引和 config.vdf 会话信息写入账号字段, 只用于尚未发布的账号字典
+
+        Returns:
+            bool: 账号字段是否发生变化
+        """
+        before = tuple(account.get(key) for key in VDF_FIELDS)
+        entry = self.vdf_index.get(account['username'])
+        if entry:
+            account['steam_id'] = entry['steam_id']
+            account['persona_name'] = entry['persona_name']
+        # config.vdf 读取失败时不阻止快速切换
+        session_cached = self._sessions is None or self._sessions.has_session(account['username'])
+        account['session_cached'] = session_cached
+        account['can_quick_switch'] = bool(entry and entry['remember_password'] and session_cached)
+        account['remember_password'] = bool(entry and entry['remember_password'])
+        account['allow_auto_login'] = bool(entry and entry['allow_auto_login'])
+        account['most_recent'] = bool(entry and entry['most_recent'])
+        return before != tuple(account.get(key) for key in VDF_FIELDS)
+
+    def check_vdf_accounts(self):
+        """同步 loginusers.vdf 和 config.vdf 中的快速切换信息
+
+        只有 VDF 用户或会话状态发生变化的账号会被更新。
+        """
+        if not self.steam_manager:
+            return
+        try:
+            users = self.steam_manager.read_loginusers_vdf()
+        except Exception as e:
+            logger.warning(f"读取VDF用户失败: {str(e)}")
+            return
+
+        with self._write_lock:
+            changed = self.vdf_index.update(users)
+            sessions = self.steam_manager.read_config_vdf_sessions()
+            if sessions is not self._sessions:
+                old_names = self._sessions.session_names if self._sessions else set()
+                new_names = sessions.session_names if sessions else set()
+                if (self._sessions is None) != (sessions is None):
+                    # 会话信息从不可用变为可用(或相反)时所有账号都会受影响
+                    changed.update(self._by_name)
+                else:
+                    changed.update(old_names ^ new_names)
+                self._sessions = sessions
+
+            updated = {}
+            for name in changed:
+                account = self._by_name.get(name)
+                if not account:
+                    continue
+                account = dict(account)
+                if self._apply_vdf_entry(account):
+                    updated[name] = account
+            if updated:
+                self._replace(updated)
+                for account in updated.values():
+                    self._record_change(account['username'])
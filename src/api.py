@@ -1,24 +1,62 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response
 from datetime import datetime, timedelta
 import subprocess
 import os
-from .account_manager import AccountManager
+from .account_manager import AccountManager, public_view
 import winreg
 import psutil
 import json
 import time
+import hmac
 import vdf  # 需要先 pip install vdf
-import configparser
 from src.utils.logger import setup_logger
 from src.utils.error_codes import ErrorCode
 from src.utils.exceptions import SteamError, AccountError, FileError, ConfigError
 from functools import wraps
 from src.steam_manager import SteamManager
+from src.avatar_cache import AvatarCache
+from src.ban_checker import BanChecker
+from src.game_library import GameLibrary
+from src.session_store import SessionStore
+from src.session_watchdog import SessionWatchdog
+from src.switch_coordinator import SwitchCoordinator
+from src.utils.config import get_config
+from src.utils.metrics import metrics
+from src.utils import profiler
+from src.fleet import get_fleet
 
 api = Blueprint('api', __name__)
-account_manager = AccountManager()
 logger = setup_logger('api')
 steam_manager = SteamManager()
+account_manager = AccountManager(steam_manager=steam_manager)
+avatar_cache = AvatarCache(steam_manager)
+game_library = GameLibrary(steam_manager)
+ban_checker = BanChecker(account_manager)
+session_watchdog = SessionWatchdog(steam_manager)
+switch_coordinator = SwitchCoordinator(
+    steam_manager, account_manager,
+    session_store=SessionStore(steam_manager),
+    watchdog=session_watchdog
+)
+metrics.install(api)
+
+# 本机地址, 不需要集群令牌
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+@api.before_request
+def check_remote_access():
+    """作为集群节点对外监听时, 非本机请求必须携带 Fleet.token"""
+    if request.remote_addr in LOCAL_ADDRS:
+        return None
+    token = get_config().get('Fleet', 'token')
+    if token and hmac.compare_digest(request.headers.get('X-Fleet-Token', ''), token):
+        return None
+    logger.warning(f"拒绝非本机请求: {request.remote_addr} {request.path}")
+    return jsonify({
+        "status": "error",
+        "code": ErrorCode.PERMISSION_DENIED.value,
+        "message": ErrorCode.PERMISSION_DENIED.message
+    }), 403
 
 # 添加装饰器定义
 def handle_errors(f):
@@ -45,19 +83,25 @@ def handle_errors(f):
             }), 500
     return wrapper
 
-def with_retry(max_retries=3, retry_delay=1):
-    """API 重试装饰器"""
+def with_retry(max_retries=None, retry_delay=1):
+    """API 重试装饰器
+    
+    Args:
+        max_retries: 最大尝试次数, 为 None 时每次调用读取配置 General.max_retries
+        retry_delay: 重试间隔(秒)
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             last_error = None
-            for attempt in range(max_retries):
+            attempts = max_retries or get_config().get('General', 'max_retries')
+            for attempt in range(attempts):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
                     last_error = e
                     logger.warning(f"API调用失败 (第{attempt + 1}次): {str(e)}")
-                    if attempt < max_retries - 1:
+                    if attempt < attempts - 1:
                         time.sleep(retry_delay)
                     continue
             # 所有重试都失败后，抛出最后一个错误
@@ -67,10 +111,16 @@ def with_retry(max_retries=3, retry_delay=1):
 
 @api.route('/accounts', methods=['GET'])
 @handle_errors
-@with_retry(max_retries=3)
+@with_retry()
 def get_accounts():
-    """获取所有账户信息"""
+    """获取所有账户信息
+    
+    带 since 参数时只返回该版本之后的变更(upserts/deletes),
+    版本已被变更日志淘汰时返回全量数据(full=True)。
+    """
     try:
+        since = request.args.get('since', type=int)
+        
         # 先加载账号
         account_manager.load_accounts()
         
@@ -80,6 +130,20 @@ def get_accounts():
         # 检查VDF状态
         account_manager.check_vdf_accounts()
         
+        if since is not None:
+            changes = account_manager.changes_since(since)
+            if changes is not None:
+                return jsonify({
+                    "status": "success",
+                    "full": False,
+                    "revision": changes['revision'],
+                    "upserts": [public_view(a) for a in changes['upserts']],
+                    "deletes": changes['deletes'],
+                    "unbanned": unbanned_accounts
+                })
+        
+        # 先取版本号再取快照, 之后的写入会在下一次增量同步中返回
+        revision = account_manager.revision
         # 按最近登录时间排序，未登录的排在最后
         sorted_accounts = sorted(
             account_manager.accounts,
@@ -89,7 +153,9 @@ def get_accounts():
         
         response_data = {
             "status": "success",
-            "accounts": sorted_accounts,
+            "full": True,
+            "revision": revision,
+            "accounts": [public_view(a) for a in sorted_accounts],
             "unbanned": unbanned_accounts
         }
         return jsonify(response_data)
@@ -100,29 +166,30 @@ def get_accounts():
             "获取账号信息失败，请检查网络连接"
         ).with_cause(e)
 
+@api.route('/accounts/search', methods=['GET'])
+def search_accounts():
+    """按账号名、昵称和游戏ID备注搜索, 结果按匹配程度排序"""
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    results = account_manager.search_accounts(query, limit)
+    return jsonify({
+        "status": "success",
+        "query": query,
+        "accounts": [dict(public_view(a), match=match) for a, match in results]
+    })
+
 @api.route('/accounts', methods=['POST'])
+@handle_errors
 def add_account():
     """添加新账户"""
     data = request.json
-    account = {
-        'username': data['username'],
-        'password': data['password'],
-        'game_id': '',
-        'status': '正常',
-        'steam_id': '',
-        'persona_name': '',
-        'last_login': '',
-        'can_quick_switch': False
-    }
-    account_manager.accounts.append(account)
-    account_manager.save_accounts()
+    account_manager.add_account(data['username'], data['password'])
     return jsonify({"status": "success"})
 
 @api.route('/accounts/<username>', methods=['DELETE'])
 def delete_account(username):
     """删除账户"""
-    account_manager.accounts = [a for a in account_manager.accounts if a['username'] != username]
-    account_manager.save_accounts()
+    account_manager.delete_account(username)
     return jsonify({"status": "success"})
 
 @api.route('/accounts/<username>/ban', methods=['POST'])
@@ -132,18 +199,9 @@ def set_ban_time(username):
         data = request.json
         days = int(data['days'])
         
-        # 计算封禁结束时间
-        ban_end = datetime.now() + timedelta(days=days)
-        ban_time = ban_end.strftime("%m-%d %H:%M")
-        
-        for account in account_manager.accounts:
-            if account['username'] == username:
-                account['ban_time'] = ban_time  # 存储封禁时间
-                account['status'] = ban_time    # 显示封禁时间
-                print(f"设置账号 {username} 的封禁时间为: {ban_time}")
-                break
-                
-        account_manager.save_accounts()
+        account = account_manager.set_ban_days(username, days)
+        if account:
+            print(f"设置账号 {username} 的封禁时间为: {account['ban_time']}")
         return jsonify({"status": "success"})
         
     except Exception as e:
@@ -155,9 +213,12 @@ def set_ban_time(username):
 
 @api.route('/accounts/<username>/game_id', methods=['PUT'])
 @handle_errors
-@with_retry(max_retries=3)
+@with_retry()
 def update_game_id(username):
-    """更新账户的游戏ID"""
+    """更新账户的游戏ID
+
+    界面已改用 PATCH /accounts/<username> 按字段修改, 保留此接口供外部脚本使用。
+    """
     try:
         data = request.json
         game_id = data.get('game_id', '')
@@ -183,21 +244,122 @@ def update_game_id(username):
 def update_account(username):
     """更新账户信息"""
     data = request.json
+    account_manager.update_fields(username, password=data['password'])
+    return jsonify({"status": "success"})
+
+# 允许通过 PATCH 修改的字段
+PATCHABLE_FIELDS = ('game_id', 'launch_profile')
+
+@api.route('/accounts/<username>', methods=['PATCH'])
+@handle_errors
+def patch_account(username):
+    """按字段修改账号
     
-    for account in account_manager.accounts:
-        if account['username'] == username:
-            account['password'] = data['password']
-            break
-            
-    account_manager.save_accounts()
+    请求体: {"fields": {...}, "revision": 修改前的 _version, "base": {字段: 修改前的值}}
+    与服务端数据冲突时返回 409 和服务端当前的账号数据。
+    """
+    data = request.get_json(silent=True) or {}
+    fields = data.get('fields') or {}
+    invalid = [f for f in fields if f not in PATCHABLE_FIELDS]
+    if not fields or invalid:
+        raise SteamError(ErrorCode.INVALID_PARAMETER, f"不支持修改的字段: {', '.join(invalid)}")
+    profile = fields.get('launch_profile')
+    if profile and profile not in switch_coordinator.launch_profiles.profiles():
+        raise SteamError(ErrorCode.INVALID_PARAMETER, f"启动配置不存在: {profile}")
+    
+    try:
+        account = account_manager.patch_account(username, fields, data.get('revision'), data.get('base'))
+    except AccountError as e:
+        if e.code != ErrorCode.ACCOUNT_CONFLICT:
+            raise
+        logger.info(f"账号修改冲突: {e.message}")
+        return jsonify({
+            "status": "error",
+            "code": e.code.value,
+            "message": e.message,
+            "details": e.details
+        }), 409
+    if not account:
+        raise AccountError(ErrorCode.ACCOUNT_NOT_FOUND, f"未找到账号: {username}")
+    return jsonify({"status": "success", "account": public_view(account)})
+
+@api.route('/accounts/<username>/launch_profile', methods=['PUT'])
+@handle_errors
+def update_launch_profile(username):
+    """设置账号的启动配置, 传空值时使用全局默认配置"""
+    name = (request.json or {}).get('launch_profile') or ''
+    if name and name not in switch_coordinator.launch_profiles.profiles():
+        raise SteamError(ErrorCode.INVALID_PARAMETER, f"启动配置不存在: {name}")
+    if not account_manager.update_fields(username, launch_profile=name):
+        raise AccountError(ErrorCode.ACCOUNT_NOT_FOUND, f"未找到账号: {username}")
     return jsonify({"status": "success"})
 
+@api.route('/launch_profiles', methods=['GET'])
+def get_launch_profiles():
+    """获取启动配置列表和各配置的登录耗时/内存统计"""
+    config = get_config()
+    launch_profiles = switch_coordinator.launch_profiles
+    return jsonify({
+        "status": "success",
+        "profiles": launch_profiles.profiles(),
+        "default": config.get('Steam', 'launch_profile'),
+        "ab_test": config.get('Steam', 'launch_ab_test'),
+        "stats": launch_profiles.summary()
+    })
+
+@api.route('/library/apps/<int:appid>/accounts', methods=['GET'])
+def get_app_accounts(appid):
+    """获取有该游戏记录的账号, 按游戏时长降序"""
+    return jsonify({"status": "success", "appid": appid, "accounts": game_library.accounts_with_app(appid)})
+
+@api.route('/accounts/<username>/apps', methods=['GET'])
+@handle_errors
+def get_account_apps(username):
+    """获取账号的游戏记录"""
+    apps = game_library.apps_for(username)
+    if apps is None:
+        if not account_manager.get_account(username):
+            raise AccountError(ErrorCode.ACCOUNT_NOT_FOUND, f"未找到账号: {username}")
+        apps = []
+    return jsonify({"status": "success", "apps": apps})
+
+@api.route('/library/refresh', methods=['POST'])
+@handle_errors
+def refresh_library():
+    """立即增量扫描游戏库"""
+    return jsonify({"status": "success", **game_library.refresh()})
+
+@api.route('/bans/refresh', methods=['POST'])
+@handle_errors
+def refresh_bans():
+    """通过 Steam Web API 刷新封禁状态和昵称, force 为真时忽略缓存"""
+    force = bool((request.get_json(silent=True) or {}).get('force'))
+    return jsonify({"status": "success", **ban_checker.refresh(force=force)})
+
+@api.route('/avatars/<steam_id>', methods=['GET'])
+def get_avatar(steam_id):
+    """获取账号头像缩略图(支持 ETag 协商缓存)"""
+    try:
+        avatar = avatar_cache.get(steam_id)
+    except Exception as e:
+        logger.warning(f"读取头像失败: {steam_id} {str(e)}")
+        avatar = None
+    if avatar is None:
+        return Response(status=404)
+    
+    data, etag = avatar
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(data, mimetype='image/png')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 def get_steam_path():
     """获取Steam路径"""
     # 1. 从配置文件获取
-    config = configparser.ConfigParser()
-    config.read('config/config.ini', encoding='utf-8')
-    steam_path = config.get('Steam', 'path', fallback='')
+    steam_path = get_config().get('Steam', 'path')
     if steam_path and os.path.exists(steam_path):
         return steam_path
 
@@ -223,13 +385,7 @@ def get_steam_path():
 def save_steam_path(path):
     """保存Steam路径到配置文件"""
     try:
-        config = configparser.ConfigParser()
-        config.read('config/config.ini', encoding='utf-8')
-        if not config.has_section('Steam'):
-            config.add_section('Steam')
-        config.set('Steam', 'path', path)
-        with open('config/config.ini', 'w', encoding='utf-8') as f:
-            config.write(f)
+        get_config().set('Steam', 'path', path)
         return True
     except Exception as e:
         print(f"保存Steam路径失败: {str(e)}")
@@ -311,69 +467,54 @@ def get_registry_value(key_path, name):
     except WindowsError:
         return None
 
-def check_login_status(username, max_wait=30):
-    """检查登录状态"""
-    try:
-        # 使用VDF检查方式
-        return steam_manager.check_login_success(username, max_wait)
-    except Exception as e:
-        logger.error(f"检查登录状态失败: {str(e)}")
-        return False
-
 @api.route('/login', methods=['POST'])
 @handle_errors
-@with_retry(max_retries=3)
 def login_account():
-    """处理账号登录请求"""
+    """处理账号登录请求
+    
+    登录由切换协调器串行执行, 不使用 with_retry: 重试会再次重启 Steam。
+    相同账号的重复请求会合并, 请求头 Idempotency-Key 用于识别客户端重试。
+    """
     try:
         data = request.get_json()
         username = data.get('username')
         password = data.get('password')
         remember_password = data.get('remember_password', True)
         
-        # 参数验证
-        if not username or not password:
+        # 参数验证, 未提供密码时使用凭证库中保存的密码
+        if not username:
             raise SteamError(
                 ErrorCode.INVALID_PARAMETER,
-                "账号和密码不能为空"
+                "账号不能为空"
             )
         
         # 账号验证
-        account = next(
-            (acc for acc in account_manager.accounts 
-             if acc['username'] == username),
-            None
-        )
-        if not account:
+        if not account_manager.get_account(username):
             raise AccountError(
                 ErrorCode.ACCOUNT_NOT_FOUND,
                 f"账号 {username} 不存在"
             )
         
-        # 尝试快速切换
-        if account.get('can_quick_switch'):
-            if quick_switch_login(username):
-                update_login_time(account)
-                return jsonify({
-                    "status": "success", 
-                    "refresh": True,
-                    "account": account
-                })
-        
-        # 使用密码登录
-        if password_login(username, password, remember_password):
-            update_login_time(account)
-            return jsonify({
-                "status": "success", 
-                "refresh": True,
-                "account": account
-            })
-            
-        raise AccountError(
-            ErrorCode.INVALID_CREDENTIALS,
-            "登录失败，请检查密码或网络连接"
+        account = switch_coordinator.switch(
+            username,
+            password,
+            remember_password,
+            idempotency_key=request.headers.get('Idempotency-Key')
         )
+        return jsonify({
+            "status": "success", 
+            "refresh": True,
+            "account": public_view(account)
+        })
         
+    except SteamError as e:
+        if e.code in (ErrorCode.SWITCH_SUPERSEDED, ErrorCode.SWITCH_TIMEOUT, ErrorCode.VAULT_LOCKED, ErrorCode.INVALID_PARAMETER, ErrorCode.ACCOUNT_NOT_FOUND):
+            raise
+        logger.error(f"登录失败: {str(e)}", exc_info=True)
+        raise SteamError(
+            ErrorCode.STEAM_LOGIN_FAILED,
+            "登录失败，请检查网络连接或重试"
+        ).with_cause(e)
     except Exception as e:
         logger.error(f"登录失败: {str(e)}", exc_info=True)
         raise SteamError(
@@ -381,70 +522,82 @@ def login_account():
             "登录失败，请检查网络连接或重试"
         ).with_cause(e)
 
-def quick_switch_login(username):
-    """快速切换登录
-    
-    Args:
-        username: 要登录的用户名
-    
-    Returns:
-        bool: 是否登录成功
-    """
-    logger.info(f"尝试快速切换: {username}")
-    
-    # 检查配置
-    steam_manager.check_steam_config()
-    
-    # 设置自动登录用户
-    steam_manager.set_auto_login_user(username)
-    
-    # 结束Steam进程
-    steam_manager.kill_steam_processes()
-    
-    # 启动Steam
-    steam_manager.launch_steam()
-    
-    # 检查登录状态
-    return check_login_status(username)
+@api.route('/session', methods=['GET'])
+def get_session():
+    """当前监控的会话和会话事件, since 为上次收到的最大事件序号"""
+    since = request.args.get('since', 0, type=int)
+    return jsonify({
+        "status": "success",
+        "session": session_watchdog.session,
+        "events": session_watchdog.events(since)
+    })
 
-def password_login(username, password, remember_password=True):
-    """使用密码登录
-    
-    Args:
-        username: 用户名
-        password: 密码
-        remember_password: 是否记住密码
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 格式的请求指标"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/debug/profile', methods=['POST'])
+@handle_errors
+def debug_profile():
+    """在指定时间窗口内采样分析所有线程
     
-    Returns:
-        bool: 是否登录成功
+    需要在配置中开启 Debug.enable_profiler, 且只允许本机访问。
+    请求参数: seconds(采样时长), interval(采样间隔), memory(是否记录内存分配)
     """
-    logger.info(f"尝试密码登录: {username}")
+    if not get_config().get('Debug', 'enable_profiler') or request.remote_addr not in ('127.0.0.1', '::1'):
+        raise SteamError(ErrorCode.PERMISSION_DENIED, "性能分析未启用")
     
-    # 结束现有Steam进程
-    steam_manager.kill_steam_processes()
-    
-    # 启动Steam并登录
-    steam_manager.launch_steam(
-        username=username,
-        password=password,
-        remember_password=remember_password
+    data = request.get_json(silent=True) or {}
+    result = profiler.profile(
+        duration=float(data.get('seconds', 5)),
+        interval=float(data.get('interval', 0.005)),
+        trace_memory=bool(data.get('memory', True))
     )
-    
-    # 检查登录状态
-    return check_login_status(username)
+    if result is None:
+        raise SteamError(ErrorCode.INVALID_PARAMETER, "已有性能分析任务正在运行")
+    return jsonify({"status": "success", "profile": result})
+
+@api.route('/fleet', methods=['GET'])
+@handle_errors
+def get_fleet_view():
+    """集群视图: 各节点状态以及每个账号所在/最近登录的节点"""
+    fleet = get_fleet()
+    if request.args.get('refresh'):
+        fleet.refresh()
+    return jsonify({"status": "success", **fleet.view()})
+
+@api.route('/fleet/nodes', methods=['POST'])
+@handle_errors
+def add_fleet_node():
+    """登记集群节点"""
+    data = request.get_json(silent=True) or {}
+    node = get_fleet().add_node(data.get('name', ''), data.get('url', ''))
+    return jsonify({"status": "success", "node": node.to_dict()})
 
-def update_login_time(account):
-    """更新账号登录时间"""
-    account['last_login'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    account_manager.save_accounts()
+@api.route('/fleet/nodes/<name>', methods=['DELETE'])
+@handle_errors
+def remove_fleet_node(name):
+    """移除集群节点"""
+    get_fleet().remove_node(name)
+    return jsonify({"status": "success"})
+
+@api.route('/fleet/login', methods=['POST'])
+@handle_errors
+def fleet_login():
+    """在账号所在的节点上切换账号, 可用 node 指定节点"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('username'):
+        raise SteamError(ErrorCode.INVALID_PARAMETER, "账号不能为空")
+    result = get_fleet().switch(data['username'], data.get('node'))
+    return jsonify({"status": "success", **result})
 
 @api.route('/api/save_accounts', methods=['POST'])
 def save_accounts():
     """保存账号列表"""
     try:
         accounts = request.json
-        account_manager.accounts = accounts
-        account_manager.save_accounts()
+        account_manager.replace_accounts(accounts)
         return jsonify({"status": "success"})
     except Exception as e:
         print(f"保存账号列表失败: {str(e)}")
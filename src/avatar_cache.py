@@ -0,0 +1,129 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+
+try:
+    from PIL import Image
+except ImportError:  # 未安装 Pillow 时直接返回原图
+    Image = None
+
+logger = setup_logger('avatar_cache')
+
+
+class AvatarCache:
+    """头像缩略图缓存
+
+    从 Steam 本地的 config/avatarcache/<steamid64>.png 生成缩略图,
+    内存中按总字节数做 LRU 淘汰, 源文件修改时间变化时自动失效。
+    """
+
+    def __init__(self, steam_manager):
+        self.steam_manager = steam_manager
+        self.config = get_config()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+    @property
+    def avatar_dir(self):
+        return os.path.join(os.path.dirname(self.steam_manager.steam_path), 'config', 'avatarcache')
+
+    @property
+    def max_bytes(self):
+        return self.config.get('Avatar', 'cache_kb') * 1024
+
+    def get(self, steam_id):
+        """获取头像缩略图
+
+        Args:
+            steam_id: SteamID64
+
+        Returns:
+            tuple: (图片数据, ETag), 头像不存在时返回 None
+        """
+        if not steam_id.isdigit():
+            return None
+        source = os.path.join(self.avatar_dir, f'{steam_id}.png')
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+
+        size = self.config.get('Avatar', 'thumb_size')
+        etag = hashlib.md5(f'{steam_id}-{stat.st_mtime_ns}-{stat.st_size}-{size}'.encode()).hexdigest()
+        with self._lock:
+            entry = self._entries.get(steam_id)
+            if entry and entry[1] == etag:
+                self._entries.move_to_end(steam_id)
+                return entry
+
+        data = self._load_from_disk_store(steam_id, etag)
+        if data is None:
+            data = self._make_thumbnail(source, size)
+            self._save_to_disk_store(steam_id, etag, data)
+
+        entry = (data, etag)
+        with self._lock:
+            old = self._entries.pop(steam_id, None)
+            if old:
+                self._total_bytes -= len(old[0])
+            self._entries[steam_id] = entry
+            self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+        return entry
+
+    def _make_thumbnail(self, source, size):
+        """生成缩略图, 未安装 Pillow 时返回原图"""
+        with open(source, 'rb') as f:
+            data = f.read()
+        if Image is None:
+            return data
+        try:
+            with Image.open(BytesIO(data)) as image:
+                image.thumbnail((size, size))
+                output = BytesIO()
+                image.save(output, format='PNG', optimize=True)
+                return output.getvalue()
+        except Exception as e:
+            logger.warning(f"生成头像缩略图失败: {source} {str(e)}")
+            return data
+
+    def _disk_store_path(self, steam_id, etag):
+        thumb_dir = self.config.get('Avatar', 'thumb_dir')
+        if not thumb_dir:
+            return None
+        return os.path.join(thumb_dir, f'{steam_id}-{etag}.png')
+
+    def _load_from_disk_store(self, steam_id, etag):
+        path = self._disk_store_path(steam_id, etag)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _save_to_disk_store(self, steam_id, etag, data):
+        """保存缩略图到磁盘, 同时清理该账号的旧缩略图"""
+        path = self._disk_store_path(steam_id, etag)
+        if not path:
+            return
+        try:
+            thumb_dir = os.path.dirname(path)
+            os.makedirs(thumb_dir, exist_ok=True)
+            for name in os.listdir(thumb_dir):
+                if name.startswith(f'{steam_id}-'):
+                    os.remove(os.path.join(thumb_dir, name))
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"保存头像缩略图失败: {str(e)}")
@@ -0,0 +1,229 @@
+"""通过 Steam Web API 批量刷新封禁状态和昵称
+
+GetPlayerBans 和 GetPlayerSummaries 每次最多查询 100 个 SteamID, 5000 个账号只需要约 100 个请求。
+使用 aiohttp 连接池并发请求(并发数由 BanCheck.max_concurrency 限制), 每个账号的结果按
+BanCheck.cache_ttl 缓存; 收到 429 时所有请求按 Retry-After 或指数退避一起暂停后重试。
+BanCheck.base_url 可以指向本地模拟服务进行测试。
+"""
+import time
+import asyncio
+import threading
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+from src.utils.error_codes import ErrorCode
+from src.utils.exceptions import SteamError
+
+try:
+    import aiohttp
+except ImportError:  # 只有封禁检测需要 aiohttp
+    aiohttp = None
+
+logger = setup_logger('ban_checker')
+
+# 单次请求最多包含的 SteamID 数量(Steam Web API 的限制)
+BATCH_SIZE = 100
+
+BANS_PATH = '/ISteamUser/GetPlayerBans/v1/'
+SUMMARIES_PATH = '/ISteamUser/GetPlayerSummaries/v2/'
+
+# 由封禁检测写入的状态; API 显示已没有封禁时恢复为正常, 手动设置的冷却时间不受影响
+BAN_STATUSES = ('VAC封禁', '游戏封禁', '社区封禁', '交易封禁')
+NORMAL_STATUS = '正常'
+
+
+def ban_status(ban):
+    """GetPlayerBans 中单个玩家的结果转换为账号状态, 没有封禁时返回 None"""
+    if ban.get('VACBanned'):
+        return 'VAC封禁'
+    if ban.get('NumberOfGameBans'):
+        return '游戏封禁'
+    if ban.get('CommunityBanned'):
+        return '社区封禁'
+    if ban.get('EconomyBan', 'none') != 'none':
+        return '交易封禁'
+    return None
+
+
+def _retry_after(headers):
+    try:
+        return max(0.0, float(headers.get('Retry-After', '')))
+    except ValueError:
+        return None
+
+
+class _ApiClient:
+    """一次刷新使用的连接池和限流状态"""
+
+    def __init__(self, session, config, api_key):
+        self.session = session
+        self.api_key = api_key
+        self.base_url = config.get('BanCheck', 'base_url').rstrip('/')
+        self.max_retries = config.get('BanCheck', 'max_retries')
+        self.backoff_initial = config.get('BanCheck', 'backoff_initial')
+        self.backoff_max = config.get('BanCheck', 'backoff_max')
+        self.semaphore = asyncio.Semaphore(config.get('BanCheck', 'max_concurrency'))
+        # 收到 429 后在此时间(loop.time())之前不发送任何请求
+        self.resume_at = 0.0
+        self.requests = 0
+
+    async def get(self, path, steam_ids):
+        """请求一批 SteamID, 多次重试仍失败时返回 None"""
+        loop = asyncio.get_running_loop()
+        params = {'key': self.api_key, 'steamids': ','.join(steam_ids)}
+        error = None
+        for attempt in range(self.max_retries + 1):
+            backoff = min(self.backoff_initial * 2 ** attempt, self.backoff_max)
+            async with self.semaphore:
+                pause = self.resume_at - loop.time()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                self.requests += 1
+                try:
+                    async with self.session.get(self.base_url + path, params=params) as response:
+                        if response.status == 200:
+                            return await response.json(content_type=None)
+                        error = f'HTTP {response.status}'
+                        if response.status == 429:
+                            pause = _retry_after(response.headers)
+                            if pause is None:
+                                pause = backoff
+                            self.resume_at = max(self.resume_at, loop.time() + pause)
+                            logger.warning(f"Steam Web API 限流, {pause:.1f} 秒后重试")
+                            continue
+                        if response.status < 500:
+                            # 密钥无效等错误重试也不会成功
+                            break
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    error = str(e) or type(e).__name__
+            if attempt < self.max_retries:
+                await asyncio.sleep(backoff)
+        logger.warning(f"Steam Web API 请求失败: {path} {len(steam_ids)} 个账号, {error}")
+        return None
+
+
+class BanChecker:
+    """定时批量刷新账号的封禁状态和昵称"""
+
+    def __init__(self, account_manager):
+        self.account_manager = account_manager
+        self.config = get_config()
+        self._lock = threading.Lock()
+        # SteamID -> (获取时间 time.monotonic(), {'ban': ..., 'persona_name': ...})
+        self._cache = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _api_key(self):
+        if aiohttp is None:
+            raise SteamError(ErrorCode.STEAM_API_UNAVAILABLE, "封禁检测需要安装 aiohttp")
+        api_key = self.config.get('BanCheck', 'api_key')
+        if not api_key:
+            raise SteamError(ErrorCode.STEAM_API_UNAVAILABLE, "未配置 Steam Web API 密钥(BanCheck.api_key)")
+        return api_key
+
+    def refresh(self, force=False):
+        """刷新有 SteamID 的账号, 缓存未过期的账号不重新请求
+
+        Args:
+            force: 忽略缓存全部重新请求
+
+        Returns:
+            dict: accounts 账号数, fetched 本次请求的账号数, requests 请求次数,
+                  failed 未取得封禁信息的账号数, updated 状态或昵称发生变化的账号数
+        """
+        api_key = self._api_key()
+        with self._lock:
+            accounts = [a for a in self.account_manager.accounts if a.get('steam_id')]
+            ttl = self.config.get('BanCheck', 'cache_ttl')
+            now = time.monotonic()
+            stale = sorted({
+                a['steam_id'] for a in accounts
+                if force or a['steam_id'] not in self._cache or now - self._cache[a['steam_id']][0] >= ttl
+            })
+            stats = {'accounts': len(accounts), 'fetched': len(stale), 'requests': 0, 'failed': 0}
+            fresh = {}
+            if stale:
+                fresh, stats['requests'] = asyncio.run(self._fetch_all(stale, api_key))
+                now = time.monotonic()
+                for steam_id in stale:
+                    result = fresh.get(steam_id, {})
+                    if 'ban' in result:
+                        self._cache[steam_id] = (now, result)
+                    else:
+                        stats['failed'] += 1
+
+            updates = {}
+            for account in accounts:
+                cached = self._cache.get(account['steam_id'])
+                result = fresh.get(account['steam_id']) or (cached[1] if cached else None)
+                fields = self._fields(account, result) if result else None
+                if fields:
+                    updates[account['username']] = fields
+            stats['updated'] = len(self.account_manager.update_many(updates))
+        logger.info(
+            f"封禁状态刷新完成: {stats['fetched']}/{stats['accounts']} 个账号, "
+            f"{stats['requests']} 个请求, 失败 {stats['failed']}, 更新 {stats['updated']}"
+        )
+        return stats
+
+    @staticmethod
+    def _fields(account, result):
+        fields = {}
+        if result.get('persona_name'):
+            fields['persona_name'] = result['persona_name']
+        if 'ban' in result:
+            status = ban_status(result['ban'])
+            if status:
+                fields['status'] = status
+            elif account.get('status') in BAN_STATUSES:
+                fields['status'] = NORMAL_STATUS
+        return fields
+
+    async def _fetch_all(self, steam_ids, api_key):
+        """并发请求所有批次, 返回 ({SteamID: 结果}, 请求次数)"""
+        results = {}
+        timeout = aiohttp.ClientTimeout(total=self.config.get('BanCheck', 'request_timeout'))
+        connector = aiohttp.TCPConnector(limit=self.config.get('BanCheck', 'max_concurrency'))
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            client = _ApiClient(session, self.config, api_key)
+
+            async def fetch_bans(batch):
+                data = await client.get(BANS_PATH, batch)
+                for player in (data or {}).get('players', []):
+                    results.setdefault(str(player.get('SteamId')), {})['ban'] = player
+
+            async def fetch_summaries(batch):
+                data = await client.get(SUMMARIES_PATH, batch)
+                for player in (data or {}).get('response', {}).get('players', []):
+                    results.setdefault(str(player.get('steamid')), {})['persona_name'] = player.get('personaname')
+
+            batches = [steam_ids[i:i + BATCH_SIZE] for i in range(0, len(steam_ids), BATCH_SIZE)]
+            await asyncio.gather(*(
+                job for batch in batches for job in (fetch_bans(batch), fetch_summaries(batch))
+            ))
+        return results, client.requests
+
+    # ---- 后台刷新 ----
+
+    def start(self):
+        """BanCheck.enabled 开启时启动后台刷新线程, 间隔为 BanCheck.interval"""
+        if not self.config.get('BanCheck', 'enabled'):
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ban-checker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"刷新封禁状态失败: {str(e)}")
+            interval = self.config.get('BanCheck', 'interval')
+            if interval <= 0 or self._stop.wait(interval):
+                break
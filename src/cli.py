@@ -0,0 +1,238 @@
+"""命令行入口
+
+不启动 Flask 和 WebView, 直接调用 AccountManager / SteamManager,
+适合计划任务等脚本场景。所有输出均为 JSON, 失败时返回非零退出码。
+
+用法::
+
+    python -m src list [--refresh]
+    python -m src switch <user>
+    python -m src ban <user> <days>
+    python -m src import <file>
+    python -m src bench [--rounds N]
+    python -m src fleet add <name> <url> | remove <name> | status | switch <user> [--node NAME]
+"""
+import sys
+import json
+import time
+import argparse
+
+_START = time.perf_counter()
+
+
+def _output(data, code=0):
+    json.dump(data, sys.stdout, ensure_ascii=False)
+    sys.stdout.write('\n')
+    return code
+
+
+def _public(account):
+    """去掉密码等敏感字段"""
+    from src.account_manager import public_view
+    return public_view(account)
+
+
+def _account_manager(with_steam=False):
+    from src.account_manager import AccountManager
+    if not with_steam:
+        return AccountManager()
+    from src.steam_manager import SteamManager
+    return AccountManager(steam_manager=SteamManager())
+
+
+def cmd_list(args):
+    manager = _account_manager(with_steam=args.refresh)
+    unbanned = manager.check_ban_status()
+    if args.refresh:
+        manager.check_vdf_accounts()
+    return _output({
+        "status": "success",
+        "accounts": [_public(a) for a in manager.accounts],
+        "unbanned": unbanned
+    })
+
+
+def _forward_switch(args):
+    """界面实例正在运行时由它的切换协调器执行, 避免两边同时结束和启动 Steam"""
+    from src.utils.config import get_config
+    from src.utils.error_codes import ErrorCode
+    from src.utils.exceptions import SteamError
+    from src.utils.ipc import forward_command
+    response = forward_command(
+        'switch', timeout=get_config().get('Timeouts', 'login_deadline') + 30,
+        username=args.user, password=args.password, wait=True
+    )
+    if response is None:
+        raise SteamError(ErrorCode.STEAM_LOGIN_FAILED, "程序已在运行, 但无法连接它的命令通道")
+    if response.get('status') != 'success':
+        try:
+            code = ErrorCode(response.get('code'))
+        except ValueError:
+            code = ErrorCode.STEAM_LOGIN_FAILED
+        raise SteamError(code, response.get('message'))
+    return _output({"status": "success", "account": response['result']})
+
+
+def cmd_switch(args):
+    from src.utils.ipc import acquire_instance_lock
+    # 占用单实例端口: 能占用说明没有运行中的实例; 切换期间启动的界面实例会发现端口已被占用, 不会同时切换
+    instance_lock = acquire_instance_lock()
+    if instance_lock is None:
+        return _forward_switch(args)
+    try:
+        from src.switch_coordinator import SwitchCoordinator
+        from src.session_store import SessionStore
+        manager = _account_manager(with_steam=True)
+        manager.check_vdf_accounts()
+        coordinator = SwitchCoordinator(
+            manager.steam_manager, manager, session_store=SessionStore(manager.steam_manager)
+        )
+        account = coordinator.switch(args.user, args.password)
+        return _output({"status": "success", "account": _public(account)})
+    finally:
+        instance_lock.close()
+
+
+def cmd_ban(args):
+    manager = _account_manager()
+    account = manager.set_ban_days(args.user, args.days)
+    if not account:
+        from src.utils.error_codes import ErrorCode
+        from src.utils.exceptions import AccountError
+        raise AccountError(ErrorCode.ACCOUNT_NOT_FOUND, f"未找到账号: {args.user}")
+    return _output({"status": "success", "account": _public(account)})
+
+
+def _read_import_file(path):
+    """读取导入文件: JSON 列表, 或每行 ``账号:密码`` / ``账号----密码`` 的文本"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return [(item['username'], item['password']) for item in json.loads(text)]
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        for sep in ('----', ':', '\t', ','):
+            if sep in line:
+                username, password = line.split(sep, 1)
+                entries.append((username.strip(), password.strip()))
+                break
+    return entries
+
+
+def cmd_import(args):
+    manager = _account_manager()
+    added, updated = [], []
+    for username, password in _read_import_file(args.file):
+        if manager.get_account(username):
+            manager.update_fields(username, password=password)
+            updated.append(username)
+        else:
+            manager.add_account(username, password)
+            added.append(username)
+    return _output({"status": "success", "added": added, "updated": updated})
+
+
+def cmd_bench(args):
+    timings = {"startup_ms": (time.perf_counter() - _START) * 1000}
+
+    start = time.perf_counter()
+    from src.account_manager import AccountManager
+    timings["import_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    manager = AccountManager()
+    timings["first_load_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        manager.load_accounts(force=True)
+    timings["load_ms"] = (time.perf_counter() - start) * 1000 / args.rounds
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        manager.check_ban_status()
+    timings["check_ban_ms"] = (time.perf_counter() - start) * 1000 / args.rounds
+
+    timings["web_stack_loaded"] = 'flask' in sys.modules
+    return _output({
+        "status": "success",
+        "accounts": len(manager.accounts),
+        "rounds": args.rounds,
+        "timings": timings
+    })
+
+
+def cmd_fleet(args):
+    from src.fleet import FleetController
+    controller = FleetController()
+    if args.action == 'add':
+        node = controller.add_node(args.name, args.url)
+        return _output({"status": "success", "node": node.to_dict()})
+    if args.action == 'remove':
+        controller.remove_node(args.name)
+        return _output({"status": "success"})
+
+    try:
+        controller.refresh()
+        if args.action == 'switch':
+            return _output({"status": "success", **controller.switch(args.user, args.node)})
+        return _output({"status": "success", **controller.view()})
+    finally:
+        controller.stop()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src', description='Steam 账号切换命令行工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('list', help='列出账号')
+    p.add_argument('--refresh', action='store_true', help='同步 loginusers.vdf 中的快速切换信息')
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('switch', help='切换到指定账号')
+    p.add_argument('user')
+    p.add_argument('--password', help='覆盖账号中保存的密码')
+    p.set_defaults(func=cmd_switch)
+
+    p = sub.add_parser('ban', help='设置封禁天数')
+    p.add_argument('user')
+    p.add_argument('days', type=int)
+    p.set_defaults(func=cmd_ban)
+
+    p = sub.add_parser('import', help='从文件导入账号')
+    p.add_argument('file')
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('bench', help='测量启动和账号加载耗时')
+    p.add_argument('--rounds', type=int, default=20)
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser('fleet', help='集群控制: 管理节点、查看各机器账号、远程切换')
+    fleet = p.add_subparsers(dest='action', required=True)
+    fp = fleet.add_parser('add', help='登记节点')
+    fp.add_argument('name')
+    fp.add_argument('url', help='节点地址, 例如 http://192.168.1.20:5000')
+    fp = fleet.add_parser('remove', help='移除节点')
+    fp.add_argument('name')
+    fleet.add_parser('status', help='查看节点状态和账号分布')
+    fp = fleet.add_parser('switch', help='在账号所在的节点上切换')
+    fp.add_argument('user')
+    fp.add_argument('--node', help='指定节点')
+    p.set_defaults(func=cmd_fleet)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        code = getattr(getattr(e, 'code', None), 'value', 1000)
+        return _output({
+            "status": "error",
+            "code": code,
+            "message": getattr(e, 'message', str(e))
+        }, code=1)
@@ -0,0 +1,204 @@
+import os
+import json
+import base64
+import hashlib
+import secrets
+import threading
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.exceptions import InvalidTag
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+from src.utils.error_codes import ErrorCode
+from src.utils.exceptions import AccountError
+
+try:
+    import win32crypt
+except ImportError:  # 非 Windows 环境没有 DPAPI
+    win32crypt = None
+
+logger = setup_logger('credential_vault')
+
+# 设置后使用该口令派生密钥, 否则使用本机生成的随机密钥
+PASSPHRASE_ENV = 'STEAM_SWITCHER_VAULT_KEY'
+
+# 共享账号文件的凭证库参数, 与 accounts.json 放在同一目录
+SHARED_META_NAME = 'accounts.vault.json'
+
+# scrypt 参数: 约 32MB 内存, 每个会话只计算一次
+KDF_PARAMS = {'n': 2 ** 15, 'r': 8, 'p': 1}
+NONCE_SIZE = 12
+_CHECK_AAD = b'__vault_check__'
+
+
+class CredentialVault:
+    """账号密码凭证库
+
+    每个会话用 scrypt 派生一次密钥, 每条记录独立使用 AES-GCM 加密,
+    并以小写用户名作为附加认证数据, 只在需要时解密单条记录。
+    """
+
+    def __init__(self, meta_path=os.path.join('config', 'vault.json'),
+                 secret_path=os.path.join('config', 'vault.key'), require_passphrase=False,
+                 use_passphrase=True):
+        """
+        Args:
+            require_passphrase: 为 True 时只能通过口令派生密钥, 用于多台机器共用的凭证库
+            use_passphrase: 为 False 时忽略口令环境变量, 只使用本机密钥
+        """
+        self.meta_path = meta_path
+        self.secret_path = secret_path
+        self.require_passphrase = require_passphrase
+        self.use_passphrase = use_passphrase
+        self._lock = threading.Lock()
+        self._aead = None
+
+    def _load_secret(self):
+        """读取本机密钥, 不存在时生成; Windows 下用 DPAPI 保护"""
+        passphrase = os.environ.get(PASSPHRASE_ENV) if self.use_passphrase else None
+        if passphrase:
+            return passphrase.encode('utf-8')
+        if self.require_passphrase:
+            raise AccountError(
+                ErrorCode.VAULT_LOCKED,
+                f"共享账号文件需要在每台机器上通过环境变量 {PASSPHRASE_ENV} 设置相同的口令"
+            )
+
+        if os.path.exists(self.secret_path):
+            with open(self.secret_path, 'rb') as f:
+                data = f.read()
+            if win32crypt:
+                return win32crypt.CryptUnprotectData(data, None, None, None, 0)[1]
+            return data
+
+        secret = secrets.token_bytes(32)
+        data = secret
+        if win32crypt:
+            data = win32crypt.CryptProtectData(secret, 'Steam Account Switcher', None, None, None, 0)
+        else:
+            logger.warning("当前环境不支持 DPAPI, 本机密钥以明文保存")
+        os.makedirs(os.path.dirname(self.secret_path) or '.', exist_ok=True)
+        with open(self.secret_path, 'wb') as f:
+            f.write(data)
+        return secret
+
+    def _unlock(self):
+        """派生会话密钥, 只在首次使用时计算"""
+        if self._aead:
+            return self._aead
+        with self._lock:
+            if self._aead:
+                return self._aead
+
+            meta = self._read_meta()
+            if meta is None:
+                salt = secrets.token_bytes(16)
+                aead = self._derive(salt, KDF_PARAMS)
+                created = {
+                    'salt': base64.b64encode(salt).decode(),
+                    'kdf': KDF_PARAMS,
+                    'check': self._seal(aead, b'ok', _CHECK_AAD)
+                }
+                if self._create_meta(created):
+                    logger.info("已创建凭证库")
+                    self._aead = aead
+                    return aead
+                # 共享目录中其他机器刚刚创建了凭证库, 改用它的参数
+                meta = self._read_meta()
+
+            aead = self._derive(base64.b64decode(meta['salt']), meta['kdf'])
+            try:
+                self._open(aead, meta['check'], _CHECK_AAD)
+            except InvalidTag as e:
+                raise AccountError(
+                    ErrorCode.VAULT_LOCKED,
+                    "凭证库密钥不匹配, 请检查口令或 vault.key"
+                ).with_cause(e)
+            self._aead = aead
+            return aead
+
+    def _derive(self, salt, params):
+        key = hashlib.scrypt(
+            self._load_secret(), salt=salt, dklen=32,
+            maxmem=128 * params['n'] * params['r'] * 2, **params
+        )
+        return AESGCM(key)
+
+    def _read_meta(self):
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _create_meta(self, meta):
+        """以独占方式创建参数文件, 文件已存在时返回 False
+
+        先写完临时文件再用硬链接发布, 共享目录中的其他机器不会读到只写了一半的文件;
+        硬链接和 Windows 下的 rename 在目标已存在时都会失败, 不会覆盖其他机器刚创建的参数。
+        """
+        os.makedirs(os.path.dirname(self.meta_path) or '.', exist_ok=True)
+        tmp_path = f'{self.meta_path}.{secrets.token_hex(8)}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        try:
+            try:
+                os.link(tmp_path, self.meta_path)
+            except FileExistsError:
+                return False
+            except (AttributeError, OSError):
+                # 不支持硬链接的文件系统
+                try:
+                    os.rename(tmp_path, self.meta_path)
+                except FileExistsError:
+                    return False
+            return True
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _seal(aead, plaintext, aad):
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        return base64.b64encode(nonce + aead.encrypt(nonce, plaintext, aad)).decode()
+
+    @staticmethod
+    def _open(aead, token, aad):
+        data = base64.b64decode(token)
+        return aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], aad)
+
+    def seal(self, data, aad):
+        """加密任意二进制数据, 返回 nonce + 密文"""
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        return nonce + self._unlock().encrypt(nonce, data, aad)
+
+    def unseal(self, data, aad):
+        """解密 seal 的结果, 密钥或附加认证数据不匹配时抛出 VAULT_LOCKED"""
+        try:
+            return self._unlock().decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], aad)
+        except InvalidTag as e:
+            raise AccountError(ErrorCode.VAULT_LOCKED, "无法解密凭证库中的数据").with_cause(e)
+
+    def encrypt(self, username, password):
+        """加密单个密码"""
+        return self._seal(self._unlock(), password.encode('utf-8'), username.lower().encode('utf-8'))
+
+    def decrypt(self, username, token):
+        """解密单个密码"""
+        try:
+            return self._open(self._unlock(), token, username.lower().encode('utf-8')).decode('utf-8')
+        except (InvalidTag, ValueError) as e:
+            raise AccountError(
+                ErrorCode.VAULT_LOCKED,
+                f"无法解密账号 {username} 的密码"
+            ).with_cause(e)
+
+
+def vault_for(accounts_file):
+    """账号文件使用的凭证库
+
+    General.shared_accounts 开启时凭证库参数与账号文件放在同一目录, 并且必须使用口令,
+    各台机器用相同的口令派生出相同的密钥; 否则使用本机的凭证库。
+    """
+    if not get_config().get('General', 'shared_accounts'):
+        return CredentialVault()
+    directory = os.path.dirname(os.path.abspath(accounts_file))
+    return CredentialVault(meta_path=os.path.join(directory, SHARED_META_NAME), require_passphrase=True)
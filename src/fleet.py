@@ -0,0 +1,337 @@
+"""多机集群控制
+
+登记运行本程序的多台机器(节点), 用 asyncio + aiohttp 连接池并发轮询各节点的
+/api/accounts(带 since 增量同步), 合并为"账号 -> 机器"视图,
+并把切换命令转发到账号所在的节点。
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+from src.utils.error_codes import ErrorCode
+from src.utils.exceptions import SteamError
+
+try:
+    import aiohttp
+except ImportError:  # 只有集群控制端需要 aiohttp
+    aiohttp = None
+
+logger = setup_logger('fleet')
+
+# 延迟 EWMA 平滑系数
+LATENCY_ALPHA = 0.3
+# 连续失败多少次后标记为离线
+DOWN_AFTER = 3
+
+
+class FleetNode:
+    """集群节点及其最近一次同步的账号状态"""
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url.rstrip('/')
+        self.status = 'unknown'
+        self.latency_ms = None
+        self.failures = 0
+        self.last_seen = None
+        self.last_error = None
+        self.revision = None
+        self.accounts = {}
+
+    def mark_ok(self, latency_ms):
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += LATENCY_ALPHA * (latency_ms - self.latency_ms)
+        self.status = 'up'
+        self.failures = 0
+        self.last_seen = time.time()
+        self.last_error = None
+
+    def mark_failed(self, error):
+        self.failures += 1
+        self.last_error = error
+        if self.failures >= DOWN_AFTER or self.status == 'unknown':
+            self.status = 'down'
+
+    def apply(self, data):
+        """合并 /api/accounts 的全量或增量结果
+
+        accounts 只整体替换不原地修改, Flask 线程可以在轮询线程合并的同时遍历旧的字典。
+        """
+        if data.get('full', True):
+            accounts = {a['username'].lower(): a for a in data.get('accounts', [])}
+        else:
+            accounts = dict(self.accounts)
+            for account in data.get('upserts', []):
+                accounts[account['username'].lower()] = account
+            for username in data.get('deletes', []):
+                accounts.pop(username.lower(), None)
+        self.accounts = accounts
+        self.revision = data.get('revision')
+
+    def upsert(self, account):
+        """切换成功后更新单个账号, 同样整体替换 accounts"""
+        accounts = dict(self.accounts)
+        accounts[account['username'].lower()] = account
+        self.accounts = accounts
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'url': self.url,
+            'status': self.status,
+            'latency_ms': round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            'failures': self.failures,
+            'last_seen': self.last_seen,
+            'last_error': self.last_error,
+            'accounts': len(self.accounts),
+        }
+
+
+class FleetController:
+    """集群控制端
+
+    事件循环运行在独立线程中, 定时并发轮询所有节点;
+    同步方法通过 run_coroutine_threadsafe 调用, 可直接在 Flask 线程或命令行中使用。
+    """
+
+    def __init__(self, nodes_file=None):
+        self.config = get_config()
+        self.nodes_file = nodes_file or self.config.get('Fleet', 'nodes_file')
+        self.nodes = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._stop = None
+        self._load_nodes()
+
+    # ---- 节点登记 ----
+
+    def _load_nodes(self):
+        try:
+            with open(self.nodes_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = []
+        except (OSError, ValueError) as e:
+            logger.error(f"读取集群节点列表失败: {str(e)}")
+            entries = []
+        self.nodes = {e['name']: FleetNode(e['name'], e['url']) for e in entries}
+
+    def _save_nodes(self):
+        entries = [{'name': n.name, 'url': n.url} for n in self.nodes.values()]
+        directory = os.path.dirname(self.nodes_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.nodes_file}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.nodes_file)
+
+    def add_node(self, name, url):
+        """登记节点, 同名节点更新地址"""
+        if not name or not url.startswith(('http://', 'https://')):
+            raise SteamError(ErrorCode.INVALID_PARAMETER, "节点名称不能为空, 地址需以 http:// 或 https:// 开头")
+        node = FleetNode(name, url)
+        with self._lock:
+            self.nodes = {**self.nodes, name: node}
+            self._save_nodes()
+        logger.info(f"登记集群节点: {name} {url}")
+        return node
+
+    def remove_node(self, name):
+        with self._lock:
+            if name not in self.nodes:
+                raise SteamError(ErrorCode.FLEET_NODE_NOT_FOUND, f"集群节点不存在: {name}")
+            self.nodes = {n: node for n, node in self.nodes.items() if n != name}
+            self._save_nodes()
+        logger.info(f"移除集群节点: {name}")
+
+    # ---- 事件循环 ----
+
+    def start(self, poll=True):
+        """启动事件循环线程, poll 为 True 时定时轮询所有节点"""
+        if aiohttp is None:
+            raise SteamError(ErrorCode.FLEET_UNSUPPORTED)
+        if self._thread and self._thread.is_alive():
+            return
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._stop = asyncio.Event()
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='fleet-loop', daemon=True)
+        self._thread.start()
+        started.wait()
+        if poll:
+            asyncio.run_coroutine_threadsafe(self._poll_forever(), self._loop)
+
+    def stop(self):
+        if not self._loop:
+            return
+        self._call(self._shutdown(), timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+    async def _shutdown(self):
+        self._stop.set()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _call(self, coro, timeout):
+        if not self._loop:
+            self.start(poll=False)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def _get_session(self):
+        if self._session is None:
+            headers = {}
+            token = self.config.get('Fleet', 'token')
+            if token:
+                headers['X-Fleet-Token'] = token
+            # 每个节点保持少量长连接, 轮询时复用, 避免每次重新握手
+            connector = aiohttp.TCPConnector(
+                limit=self.config.get('Fleet', 'max_connections'),
+                limit_per_host=4,
+                keepalive_timeout=max(30, self.config.get('Fleet', 'poll_interval') * 3)
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=headers)
+        return self._session
+
+    async def _request(self, node, method, path, timeout, **kwargs):
+        """请求节点 API, 同时更新节点的健康状态和延迟"""
+        start = time.perf_counter()
+        try:
+            async with self._get_session().request(
+                method, node.url + path,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                **kwargs
+            ) as response:
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            node.mark_failed(str(e) or type(e).__name__)
+            raise SteamError(
+                ErrorCode.FLEET_NODE_UNAVAILABLE,
+                f"集群节点 {node.name} 请求失败: {str(e) or type(e).__name__}"
+            ).with_cause(e)
+        node.mark_ok((time.perf_counter() - start) * 1000)
+        return response.status, data
+
+    async def _poll_node(self, node):
+        params = {'since': str(node.revision)} if node.revision is not None else None
+        _, data = await self._request(
+            node, 'GET', '/api/accounts', self.config.get('Fleet', 'node_timeout'), params=params
+        )
+        if data.get('status') != 'success':
+            node.mark_failed(data.get('message'))
+            return
+        node.apply(data)
+
+    async def poll_all(self):
+        """并发轮询所有节点, 单个节点失败不影响其他节点"""
+        nodes = list(self.nodes.values())
+        results = await asyncio.gather(*(self._poll_node(n) for n in nodes), return_exceptions=True)
+        for node, result in zip(nodes, results):
+            if isinstance(result, Exception):
+                logger.debug(f"轮询集群节点失败: {node.name} {str(result)}")
+
+    async def _poll_forever(self):
+        while not self._stop.is_set():
+            await self.poll_all()
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.config.get('Fleet', 'poll_interval'))
+            except asyncio.TimeoutError:
+                pass
+
+    # ---- 对外接口 ----
+
+    def refresh(self):
+        """立即轮询一次所有节点"""
+        self._call(self.poll_all(), timeout=self.config.get('Fleet', 'node_timeout') + 5)
+
+    def view(self):
+        """合并视图: 节点状态列表, 以及每个账号所在的节点和最近登录的节点"""
+        merged = {}
+        nodes = list(self.nodes.values())
+        for node in nodes:
+            # 取一次引用, 轮询线程之后替换的新字典不影响本次遍历
+            accounts = node.accounts
+            for key, account in accounts.items():
+                entry = merged.setdefault(key, {
+                    'username': account['username'],
+                    'persona_name': account.get('persona_name'),
+                    'status': account.get('status'),
+                    'nodes': [],
+                    'logged_in_on': [],
+                })
+                entry['nodes'].append(node.name)
+                if account.get('most_recent'):
+                    entry['logged_in_on'].append(node.name)
+        return {
+            'nodes': [n.to_dict() for n in nodes],
+            'accounts': sorted(merged.values(), key=lambda a: a['username'].lower()),
+        }
+
+    def pick_node(self, username, node_name=None):
+        """选择执行切换的节点: 指定节点, 否则为拥有该账号的在线节点中延迟最低的"""
+        if node_name:
+            node = self.nodes.get(node_name)
+            if not node:
+                raise SteamError(ErrorCode.FLEET_NODE_NOT_FOUND, f"集群节点不存在: {node_name}")
+            return node
+        candidates = [
+            n for n in self.nodes.values()
+            if username.lower() in n.accounts and n.status != 'down'
+        ]
+        if not candidates:
+            raise SteamError(ErrorCode.FLEET_NODE_UNAVAILABLE, f"没有可用的节点包含账号: {username}")
+        return min(candidates, key=lambda n: n.latency_ms if n.latency_ms is not None else float('inf'))
+
+    def switch(self, username, node_name=None):
+        """把切换命令转发给节点并等待结果"""
+        node = self.pick_node(username, node_name)
+        timeout = self.config.get('Fleet', 'switch_timeout')
+        logger.info(f"转发切换请求: {username} -> {node.name}")
+        status, data = self._call(self._request(
+            node, 'POST', '/api/login', timeout,
+            json={'username': username},
+            headers={'Idempotency-Key': uuid.uuid4().hex}
+        ), timeout=timeout + 5)
+        if data.get('status') != 'success':
+            try:
+                code = ErrorCode(data.get('code'))
+            except ValueError:
+                code = ErrorCode.STEAM_LOGIN_FAILED
+            raise SteamError(code, data.get('message'), details={'node': node.name, 'http_status': status})
+        account = data.get('account')
+        if account:
+            node.upsert(account)
+        return {'node': node.name, 'account': account}
+
+
+_fleet = None
+_fleet_lock = threading.Lock()
+
+
+def get_fleet():
+    """获取全局集群控制端, 首次调用时启动后台轮询"""
+    global _fleet
+    with _fleet_lock:
+        if _fleet is None:
+            controller = FleetController()
+            controller.start()
+            _fleet = controller
+        return _fleet
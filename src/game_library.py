@@ -0,0 +1,203 @@
+"""按账号索引本地游戏记录
+
+Steam 在 userdata/<accountid>/config/localconfig.vdf 中记录每个账号玩过的游戏
+(游戏时长、最后运行时间)。后台定时扫描 loginusers.vdf 中所有账号的该文件,
+只重新解析大小或修改时间变化的文件; 需要解析的文件较多时使用线程池并行读取。
+结果保存到 config/game_library.json, 内存中另建 appid -> 账号 的倒排索引。
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+from src.utils.vdf_scanner import scan_localconfig_apps
+
+logger = setup_logger('game_library')
+
+# steamid64 与 userdata 目录名(accountid)之差
+STEAM_ID64_BASE = 76561197960265728
+# 需要解析的文件不超过该数量时直接在当前线程解析
+INLINE_LIMIT = 8
+# 解析主要是读文件和 bytes.find, 不使用进程池: Windows 下子进程会重新导入 main.py 及其启动流程
+DEFAULT_WORKERS = 8
+INDEX_VERSION = 1
+
+
+def _parse_localconfig(path):
+    """线程池任务: 解析失败时返回 None"""
+    try:
+        return [list(app) for app in scan_localconfig_apps(path)]
+    except Exception:
+        return None
+
+
+class GameLibrary:
+    """账号游戏库索引
+
+    _state 为 (entries, by_app) 元组, 扫描完成后整体替换, 查询不需要加锁:
+    entries: 小写账号名 -> {'username', 'steam_id', 'size', 'mtime_ns', 'apps': [[appid, 时长, 最后运行]]}
+    by_app: appid -> [(时长, 最后运行, 小写账号名)], 按时长降序
+    """
+
+    def __init__(self, steam_manager, index_path=os.path.join('config', 'game_library.json')):
+        self.steam_manager = steam_manager
+        self.config = get_config()
+        self.index_path = index_path
+        self._scan_lock = threading.Lock()
+        self._state = ({}, {})
+        self._thread = None
+        self._stop = threading.Event()
+        self._load_index()
+
+    # ---- 索引持久化 ----
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取游戏库索引失败, 将重新扫描: {str(e)}")
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        self._publish(data.get('entries', {}))
+
+    def _save_index(self, entries):
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': entries}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def _publish(self, entries):
+        by_app = {}
+        for key, entry in entries.items():
+            for appid, playtime, last_played in entry['apps']:
+                by_app.setdefault(appid, []).append((playtime, last_played, key))
+        for holders in by_app.values():
+            holders.sort(reverse=True)
+        self._state = (entries, by_app)
+
+    # ---- 扫描 ----
+
+    def localconfig_path(self, steam_id):
+        """账号的 localconfig.vdf 路径"""
+        account_id = int(steam_id) - STEAM_ID64_BASE
+        return os.path.join(
+            os.path.dirname(self.steam_manager.steam_path),
+            'userdata', str(account_id), 'config', 'localconfig.vdf'
+        )
+
+    def _parse_all(self, paths):
+        if len(paths) <= INLINE_LIMIT:
+            return [_parse_localconfig(path) for path in paths]
+        workers = self.config.get('Library', 'workers') or DEFAULT_WORKERS
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='game-library') as pool:
+            return list(pool.map(_parse_localconfig, paths, chunksize=4))
+
+    def refresh(self):
+        """增量扫描所有账号的 localconfig.vdf
+
+        Returns:
+            dict: 账号数、重新解析的文件数、移除的账号数和耗时
+        """
+        with self._scan_lock:
+            start = time.perf_counter()
+            entries, _ = self._state
+            wanted = {}
+            for steam_id, user in self.steam_manager.read_loginusers_vdf().items():
+                username = user.get('AccountName')
+                if not username:
+                    continue
+                try:
+                    path = self.localconfig_path(steam_id)
+                    st = os.stat(path)
+                except (ValueError, OSError):
+                    continue
+                wanted[username.lower()] = (username, steam_id, path, st.st_size, st.st_mtime_ns)
+
+            stale = [
+                key for key, (_, _, _, size, mtime_ns) in wanted.items()
+                if key not in entries
+                or entries[key]['size'] != size or entries[key]['mtime_ns'] != mtime_ns
+            ]
+            removed = [key for key in entries if key not in wanted]
+            stats = {'accounts': len(wanted), 'parsed': len(stale), 'removed': len(removed)}
+            if stale or removed:
+                results = self._parse_all([wanted[key][2] for key in stale])
+                updated = {key: entry for key, entry in entries.items() if key in wanted}
+                for key, apps in zip(stale, results):
+                    if apps is None:
+                        logger.warning(f"解析 localconfig.vdf 失败: {wanted[key][2]}")
+                        continue
+                    username, steam_id, _, size, mtime_ns = wanted[key]
+                    updated[key] = {
+                        'username': username,
+                        'steam_id': steam_id,
+                        'size': size,
+                        'mtime_ns': mtime_ns,
+                        'apps': apps,
+                    }
+                self._publish(updated)
+                try:
+                    self._save_index(updated)
+                except OSError as e:
+                    logger.error(f"保存游戏库索引失败: {str(e)}")
+
+            stats['seconds'] = round(time.perf_counter() - start, 3)
+            if stale or removed:
+                logger.info(f"游戏库索引已更新: {stats}")
+            return stats
+
+    def start(self):
+        """启动后台扫描线程, Library.scan_interval 为 0 时只在启动时扫描一次"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='game-library', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"扫描游戏库失败: {str(e)}")
+            interval = self.config.get('Library', 'scan_interval')
+            if interval <= 0 or self._stop.wait(interval):
+                break
+
+    # ---- 查询 ----
+
+    def accounts_with_app(self, appid):
+        """拥有游戏记录的账号, 按游戏时长降序"""
+        entries, by_app = self._state
+        return [
+            {
+                'username': entries[key]['username'],
+                'steam_id': entries[key]['steam_id'],
+                'playtime_minutes': playtime,
+                'last_played': last_played,
+            }
+            for playtime, last_played, key in by_app.get(appid, ())
+        ]
+
+    def apps_for(self, username):
+        """账号的游戏记录, 按游戏时长降序; 账号未被索引时返回 None"""
+        entries, _ = self._state
+        entry = entries.get(username.lower())
+        if entry is None:
+            return None
+        return [
+            {'appid': appid, 'playtime_minutes': playtime, 'last_played': last_played}
+            for appid, playtime, last_played in entry['apps']
+        ]
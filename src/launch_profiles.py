@@ -0,0 +1,142 @@
+import os
+import json
+import shlex
+import threading
+from itertools import count
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+
+logger = setup_logger('launch_profiles')
+
+# 内置启动配置
+BUILTIN_PROFILES = {
+    'default': '',
+    'minimal': '-silent -no-browser',
+}
+
+# launch_steam 中有专门处理的参数
+_NAMED_FLAGS = {
+    'silent': 'silent',
+    'no-browser': 'no_browser',
+    'tcp_port': 'tcp_port',
+}
+
+
+def parse_launch_flags(text):
+    """把 Steam 启动参数字符串转换为 launch_steam 的关键字参数
+
+    例如 ``-silent -tcp_port 27030`` -> ``{'silent': True, 'tcp_port': '27030'}``
+    """
+    kwargs = {}
+    tokens = shlex.split(text or '', posix=False)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+        if not token.startswith('-'):
+            logger.warning(f"忽略无效的启动参数: {token}")
+            continue
+        name = token.lstrip('-')
+        value = True
+        if i < len(tokens) and not tokens[i].startswith('-'):
+            value = tokens[i]
+            i += 1
+        kwargs[_NAMED_FLAGS.get(name, name)] = value
+    return kwargs
+
+
+class LaunchProfiles:
+    """Steam 启动配置
+
+    账号的 launch_profile 字段优先, 否则使用全局 Steam.launch_profile;
+    开启 A/B 测试时轮流使用 launch_ab_profiles 中的配置,
+    并记录每个配置的登录耗时和 Steam 进程内存。
+    """
+
+    def __init__(self, stats_path=os.path.join('config', 'launch_stats.json')):
+        self.config = get_config()
+        self.stats_path = stats_path
+        self._lock = threading.Lock()
+        self._ab_counter = count()
+        self._stats = None
+
+    def profiles(self):
+        """全部可用的启动配置: {名称: 启动参数}"""
+        profiles = dict(BUILTIN_PROFILES)
+        profiles.update(self.config.items('LaunchProfiles'))
+        return profiles
+
+    def resolve(self, account=None):
+        """选择本次切换使用的启动配置
+
+        Returns:
+            tuple: (配置名称, launch_steam 关键字参数)
+        """
+        profiles = self.profiles()
+        if self.config.get('Steam', 'launch_ab_test'):
+            candidates = [
+                name.strip() for name in self.config.get('Steam', 'launch_ab_profiles').split(',')
+                if name.strip() in profiles
+            ]
+            if candidates:
+                name = candidates[next(self._ab_counter) % len(candidates)]
+                return name, parse_launch_flags(profiles[name])
+
+        name = (account or {}).get('launch_profile') or self.config.get('Steam', 'launch_profile')
+        if name not in profiles:
+            logger.warning(f"启动配置不存在: {name}, 使用 default")
+            name = 'default'
+        return name, parse_launch_flags(profiles[name])
+
+    def _load_stats(self):
+        if self._stats is None:
+            try:
+                with open(self.stats_path, 'r', encoding='utf-8') as f:
+                    self._stats = json.load(f)
+            except (OSError, ValueError):
+                self._stats = {}
+        return self._stats
+
+    def record(self, name, method, seconds, memory, success):
+        """记录一次切换结果
+
+        Args:
+            name: 启动配置名称
+            method: quick_switch / password
+            seconds: 从结束旧进程到登录成功(或超时)的耗时
+            memory: 登录后 Steam 进程的内存占用(字节), 未知时为 None
+            success: 是否登录成功
+        """
+        with self._lock:
+            stats = self._load_stats()
+            entry = stats.setdefault(f'{name}/{method}', {
+                'runs': 0, 'successes': 0, 'login_seconds': 0.0,
+                'memory_samples': 0, 'memory_bytes': 0
+            })
+            entry['runs'] += 1
+            if success:
+                entry['successes'] += 1
+                entry['login_seconds'] += seconds
+                if memory:
+                    entry['memory_samples'] += 1
+                    entry['memory_bytes'] += memory
+            tmp_path = f'{self.stats_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+
+    def summary(self):
+        """按配置汇总平均登录耗时和内存占用"""
+        with self._lock:
+            stats = self._load_stats()
+            result = {}
+            for key, entry in stats.items():
+                successes = entry['successes']
+                result[key] = {
+                    'runs': entry['runs'],
+                    'successes': successes,
+                    'avg_login_seconds': round(entry['login_seconds'] / successes, 2) if successes else None,
+                    'avg_memory_mb': round(entry['memory_bytes'] / entry['memory_samples'] / 2 ** 20, 1)
+                    if entry['memory_samples'] else None,
+                }
+            return result
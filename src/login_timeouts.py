@@ -0,0 +1,79 @@
+import os
+import json
+import threading
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+from src.utils.p2_quantile import P2Quantile
+
+logger = setup_logger('login_timeouts')
+
+# 估计的分位数
+QUANTILE = 0.99
+# 样本数达到该值后才使用估计值, 之前使用全部账号的估计或默认超时
+MIN_SAMPLES = 5
+# 全部账号共用的估计
+GLOBAL_KEY = '*'
+
+
+class LoginTimeouts:
+    """按账号学习登录耗时, 估计等待登录结果的超时
+
+    每个账号和登录方式(quick_switch / password)分别用 P² 算法估计耗时的 p99,
+    超时取 p99 乘以 Timeouts.margin, 并限制在 min_timeout 和 max_timeout 之间。
+    账号样本不足时使用全部账号的估计, 仍然不足时使用配置中的默认超时。
+    """
+
+    def __init__(self, stats_path=os.path.join('config', 'login_timeouts.json')):
+        self.config = get_config()
+        self.stats_path = stats_path
+        self._lock = threading.Lock()
+        self._estimators = None
+
+    def _load(self):
+        if self._estimators is None:
+            try:
+                with open(self.stats_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._estimators = {key: P2Quantile.from_dict(value) for key, value in data.items()}
+            except FileNotFoundError:
+                self._estimators = {}
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"读取登录耗时统计失败: {str(e)}")
+                self._estimators = {}
+        return self._estimators
+
+    def _save(self):
+        tmp_path = f'{self.stats_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({key: e.to_dict() for key, e in self._estimators.items()}, f)
+        os.replace(tmp_path, self.stats_path)
+
+    def record(self, username, method, seconds):
+        """记录一次成功登录的等待耗时"""
+        with self._lock:
+            estimators = self._load()
+            for key in (f'{username.lower()}/{method}', f'{GLOBAL_KEY}/{method}'):
+                estimator = estimators.get(key)
+                if estimator is None:
+                    estimator = estimators[key] = P2Quantile(QUANTILE)
+                estimator.add(seconds)
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"保存登录耗时统计失败: {str(e)}")
+
+    def timeout(self, username, method):
+        """等待登录结果的超时(秒)"""
+        with self._lock:
+            estimators = self._load()
+            for key in (f'{username.lower()}/{method}', f'{GLOBAL_KEY}/{method}'):
+                estimator = estimators.get(key)
+                if estimator is not None and estimator.count >= MIN_SAMPLES:
+                    estimate = estimator.value() * self.config.get('Timeouts', 'margin')
+                    break
+            else:
+                return self.config.get('Timeouts', f'{method}_default')
+        return min(
+            max(estimate, self.config.get('Timeouts', 'min_timeout')),
+            self.config.get('Timeouts', 'max_timeout')
+        )
@@ -0,0 +1,338 @@
+"""账号登录会话快照
+
+登录成功后保存账号的 Steam 会话文件: loginusers.vdf 中的用户条目、config.vdf 中的
+Accounts / ConnectCache 条目, 以及 userdata/<accountid>/config 下的 vdf 文件。
+内容按明文的 SHA-256 寻址, 压缩后用本机凭证库密钥加密保存, 相同内容只存一份;
+每个账号一个清单记录各部分的哈希。快速切换前把目标账号的会话写回 Steam 目录,
+不依赖 Steam 自己保留所有账号的令牌。
+
+目录结构:
+    <store_dir>/blobs/<哈希前两位>/<哈希>
+    <store_dir>/manifests/<小写账号名>.json
+    <store_dir>/vault.json                      凭证库参数
+"""
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from collections import Counter
+import vdf
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+from src.utils.vdf_scanner import connect_cache_key
+
+logger = setup_logger('session_store')
+
+STEAM_ID64_BASE = 76561197960265728
+
+# config.vdf 中账号相关节点所在的路径
+STEAM_SECTION_PATH = ('InstallConfigStore', 'Software', 'Valve', 'Steam')
+
+# 加密数据的文件头
+SEALED_MAGIC = b'SSV1'
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _find_key(mapping, name):
+    """按不区分大小写的方式查找键, Steam 不同版本写入的大小写不完全一致"""
+    if name in mapping:
+        return name
+    lowered = name.lower()
+    for key in mapping:
+        if key.lower() == lowered:
+            return key
+    return None
+
+
+def _steam_section(config, create=False):
+    """config.vdf 中包含 Accounts 和 ConnectCache 的节点"""
+    node = config
+    for name in STEAM_SECTION_PATH:
+        key = _find_key(node, name)
+        if key is None:
+            if not create:
+                return None
+            key = name
+            node[key] = {}
+        node = node[key]
+    return node
+
+
+def _atomic_write(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SessionStore:
+    """按内容去重的账号会话快照库"""
+
+    def __init__(self, steam_manager, store_dir=None):
+        self.steam_manager = steam_manager
+        self.config = get_config()
+        self.store_dir = store_dir or self.config.get('Sessions', 'store_dir')
+        self.blob_dir = os.path.join(self.store_dir, 'blobs')
+        self.manifest_dir = os.path.join(self.store_dir, 'manifests')
+        self._lock = threading.Lock()
+        self._manifests = {}
+        self._refs = Counter()
+        self._vault = None
+        self._load_manifests()
+
+    @property
+    def enabled(self):
+        return self.config.get('Sessions', 'enabled')
+
+    @property
+    def vault(self):
+        """加密会话数据的凭证库, 首次读写数据时才导入 cryptography
+
+        快照只在本机使用, 始终使用本机密钥(vault.key), 不受口令环境变量和共享账号文件影响。
+        """
+        if self._vault is None:
+            from src.credential_vault import CredentialVault
+            self._vault = CredentialVault(meta_path=os.path.join(self.store_dir, 'vault.json'), use_passphrase=False)
+        return self._vault
+
+    # ---- 存储 ----
+
+    def _load_manifests(self):
+        try:
+            names = os.listdir(self.manifest_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.manifest_dir, name), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取会话清单失败: {name} {str(e)}")
+                continue
+            self._manifests[manifest['username'].lower()] = manifest
+            self._refs.update(manifest['parts'].values())
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _put_blob(self, data):
+        digest = _digest(data)
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, self._seal(digest, data))
+        return digest
+
+    def _seal(self, digest, data):
+        """压缩并加密, 以哈希作为附加认证数据, 数据文件不能被替换成其他哈希的内容"""
+        return SEALED_MAGIC + self.vault.seal(zlib.compress(data), digest.encode('ascii'))
+
+    def _get_blob(self, digest):
+        path = self._blob_path(digest)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if not raw.startswith(SEALED_MAGIC):
+            raise ValueError(f"会话数据格式无效: {digest}")
+        data = zlib.decompress(self.vault.unseal(raw[len(SEALED_MAGIC):], digest.encode('ascii')))
+        if _digest(data) != digest:
+            raise ValueError(f"会话数据已损坏: {digest}")
+        return data
+
+    def _release_blobs(self, digests):
+        """减少引用计数, 删除不再被任何清单引用的数据"""
+        for digest in digests:
+            self._refs[digest] -= 1
+            if self._refs[digest] <= 0:
+                del self._refs[digest]
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    # ---- 快照 ----
+
+    def _userdata_dir(self, steam_id):
+        account_id = int(steam_id) - STEAM_ID64_BASE
+        return os.path.join(os.path.dirname(self.steam_manager.steam_path), 'userdata', str(account_id), 'config')
+
+    def _find_user(self, username):
+        users = self.steam_manager.read_loginusers_vdf(force_refresh=True)
+        for steam_id, user in users.items():
+            if user.get('AccountName', '').lower() == username.lower():
+                return steam_id, user
+        return None, None
+
+    def _collect(self, username):
+        """读取账号当前的会话文件, 返回 {部分名称: 内容}"""
+        steam_id, user = self._find_user(username)
+        if steam_id is None:
+            return None, {}
+        parts = {'loginusers': vdf.dumps({steam_id: user}).encode('utf-8')}
+
+        with open(self.steam_manager.config_vdf_path, 'r', encoding='utf-8') as f:
+            section = _steam_section(vdf.load(f)) or {}
+        accounts = section.get(_find_key(section, 'Accounts'), {})
+        account_key = _find_key(accounts, username)
+        if account_key is not None:
+            parts['accounts'] = vdf.dumps({account_key: accounts[account_key]}).encode('utf-8')
+        tokens = self._connect_cache_tokens(section, username)
+        if tokens:
+            parts['connect_cache'] = vdf.dumps(tokens).encode('utf-8')
+
+        userdata_dir = self._userdata_dir(steam_id)
+        try:
+            names = os.listdir(userdata_dir)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            path = os.path.join(userdata_dir, name)
+            if name.endswith('.vdf') and os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    parts[f'userdata/{name}'] = f.read()
+        return steam_id, parts
+
+    @staticmethod
+    def _connect_cache_tokens(section, username):
+        """config.vdf 中该账号的 ConnectCache 条目"""
+        cache = section.get(_find_key(section, 'ConnectCache'), {})
+        return {
+            key: cache[key]
+            for key in (connect_cache_key(username), connect_cache_key(username.lower()))
+            if key in cache
+        }
+
+    def capture(self, username):
+        """保存账号当前的会话, 在登录成功后调用
+
+        Returns:
+            bool: 是否保存了会话(loginusers.vdf 中没有该账号时返回 False)
+        """
+        steam_id, parts = self._collect(username)
+        if steam_id is None:
+            return False
+        with self._lock:
+            digests = {name: self._put_blob(data) for name, data in parts.items()}
+            key = username.lower()
+            old = self._manifests.get(key)
+            if old and old['steam_id'] == steam_id and old['parts'] == digests:
+                return True
+            manifest = {
+                'username': username,
+                'steam_id': steam_id,
+                'captured_at': time.time(),
+                'parts': digests,
+            }
+            os.makedirs(self.manifest_dir, exist_ok=True)
+            _atomic_write(
+                os.path.join(self.manifest_dir, f'{key}.json'),
+                json.dumps(manifest, indent=2).encode('utf-8')
+            )
+            self._manifests[key] = manifest
+            self._refs.update(digests.values())
+            if old:
+                self._release_blobs(old['parts'].values())
+        logger.info(f"已保存登录会话: {username}, {len(digests)} 项")
+        return True
+
+    def has_session(self, username):
+        """是否保存了包含登录令牌的会话"""
+        manifest = self._manifests.get(username.lower())
+        return bool(manifest and 'connect_cache' in manifest['parts'])
+
+    def restore(self, username):
+        """把账号的会话写回 Steam 目录, 必须在 Steam 进程结束后调用
+
+        先把所有文件的新内容写入临时文件, 全部成功后再逐个原子替换, 读取或合并失败时不修改任何文件。
+        Steam 当前保存的令牌与快照不同时说明之后在本程序之外登录过, 快照中的令牌已经过期,
+        此时不覆盖 Steam 的文件, 改为用当前的会话更新快照。
+
+        Returns:
+            bool: 是否恢复了会话
+        """
+        with self._lock:
+            manifest = self._manifests.get(username.lower())
+            if not manifest:
+                return False
+            parts = {name: self._get_blob(digest) for name, digest in manifest['parts'].items()}
+        steam_id = manifest['steam_id']
+        writes = []
+
+        # loginusers.vdf: 替换该账号的条目并设为最近登录
+        with open(self.steam_manager.loginusers_vdf_path, 'r', encoding='utf-8') as f:
+            loginusers = vdf.load(f)
+        users = loginusers.setdefault('users', {})
+        users.update(vdf.loads(parts['loginusers'].decode('utf-8')))
+        for user_id, user in users.items():
+            user['MostRecent'] = '1' if user_id == steam_id else '0'
+        writes.append((self.steam_manager.loginusers_vdf_path, vdf.dumps(loginusers, pretty=True).encode('utf-8')))
+
+        # config.vdf: 替换 Accounts 和 ConnectCache 中该账号的条目
+        if 'accounts' in parts or 'connect_cache' in parts:
+            with open(self.steam_manager.config_vdf_path, 'r', encoding='utf-8') as f:
+                config = vdf.load(f)
+            section = _steam_section(config, create=True)
+            current = self._connect_cache_tokens(section, username)
+            if current and 'connect_cache' in parts and current != vdf.loads(parts['connect_cache'].decode('utf-8')):
+                logger.info(f"Steam 中的登录令牌比快照新, 不恢复会话: {username}")
+                self.capture(username)
+                return False
+            for part, name in (('accounts', 'Accounts'), ('connect_cache', 'ConnectCache')):
+                if part in parts:
+                    key = _find_key(section, name) or name
+                    section.setdefault(key, {}).update(vdf.loads(parts[part].decode('utf-8')))
+            writes.append((self.steam_manager.config_vdf_path, vdf.dumps(config, pretty=True).encode('utf-8')))
+
+        userdata_dir = self._userdata_dir(steam_id)
+        for name, data in parts.items():
+            if name.startswith('userdata/'):
+                path = os.path.join(userdata_dir, name[len('userdata/'):])
+                if not self._same_content(path, data):
+                    writes.append((path, data))
+
+        staged = []
+        try:
+            for path, data in writes:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.{os.getpid()}.swap'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                staged.append((tmp_path, path))
+        except OSError:
+            for tmp_path, _ in staged:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            raise
+        for tmp_path, path in staged:
+            os.replace(tmp_path, path)
+        logger.info(f"已恢复登录会话: {username}")
+        return True
+
+    @staticmethod
+    def _same_content(path, data):
+        try:
+            if os.path.getsize(path) != len(data):
+                return False
+            with open(path, 'rb') as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def stats(self):
+        """快照数量和占用空间"""
+        with self._lock:
+            size = 0
+            for digest in self._refs:
+                try:
+                    size += os.path.getsize(self._blob_path(digest))
+                except OSError:
+                    pass
+            return {'accounts': len(self._manifests), 'blobs': len(self._refs), 'bytes': size}
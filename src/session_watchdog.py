@@ -0,0 +1,262 @@
+"""登录后的会话监控
+
+切换成功后继续监控该账号的会话:
+- 一个线程通过 psutil 阻塞等待 Steam 进程退出(Steam 自我更新转交给新进程时改为等待新进程);
+- 一个线程通过目录变化通知等待 Steam config 目录被写入, 只在 loginusers.vdf 的修改时间
+  变化时重新读取 MostRecent, 判断账号是否已登出或被切换。
+两个线程在事件之间都处于阻塞状态, 不做定时轮询。会话结束时记录事件并通知订阅者,
+可选按退避间隔自动重新切换到该账号。
+"""
+import os
+import time
+import itertools
+import threading
+from collections import deque
+import psutil
+import win32con
+import win32event
+import win32file
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+
+logger = setup_logger('session_watchdog')
+
+# 会话结束原因
+STEAM_EXITED = 'steam_exited'
+LOGGED_OUT = 'logged_out'
+ACCOUNT_CHANGED = 'account_changed'
+
+# 自动重新切换只处理意外结束, 用户在 Steam 中主动切换到其他账号时不处理
+RESWITCH_REASONS = (STEAM_EXITED, LOGGED_OUT)
+
+# 保留的事件数量
+EVENT_HISTORY = 100
+
+
+class SessionWatchdog:
+    """监控当前登录的 Steam 会话"""
+
+    def __init__(self, steam_manager):
+        self.steam_manager = steam_manager
+        self.config = get_config()
+        self.coordinator = None
+        self._lock = threading.Lock()
+        # 每次开始或停止监控时递增, 旧的等待线程醒来后据此丢弃过期的结果
+        self._generation = 0
+        self._session = None
+        self._loginusers_mtime = None
+        self._events = deque(maxlen=EVENT_HISTORY)
+        self._seq = itertools.count(1)
+        self._subscribers = []
+        self._failures = 0
+        self._retry_timer = None
+        self._stop_handle = None
+        self._file_thread = None
+
+    def attach(self, coordinator):
+        """绑定切换协调器, 自动重新切换时使用"""
+        self.coordinator = coordinator
+
+    @property
+    def enabled(self):
+        return self.config.get('Watchdog', 'enabled')
+
+    def subscribe(self, callback):
+        """订阅会话事件, 回调参数为事件字典"""
+        self._subscribers.append(callback)
+
+    # ---- 监控 ----
+
+    def watch(self, username):
+        """开始监控刚登录成功的账号, 由切换协调器在登录成功后调用"""
+        if not self.enabled:
+            return
+        pid = self.steam_manager.supervisor.pid or self.steam_manager.active_steam_pid()
+        if not pid:
+            logger.warning(f"未找到Steam进程, 无法监控会话: {username}")
+            return
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._session = {
+                'username': username,
+                'pid': pid,
+                'started_at': time.time(),
+                'generation': generation,
+            }
+        self._loginusers_mtime = self._stat_loginusers()
+        threading.Thread(
+            target=self._wait_process, args=(generation, pid),
+            name=f'session-watchdog-{pid}', daemon=True
+        ).start()
+        self._ensure_file_watcher()
+        logger.info(f"开始监控会话: {username}, pid={pid}")
+
+    def unwatch(self):
+        """停止监控当前会话, 切换开始前调用, 切换过程中结束 Steam 不视为会话结束"""
+        with self._lock:
+            self._generation += 1
+            self._session = None
+
+    @property
+    def session(self):
+        """当前监控的会话, 没有时为 None"""
+        session = self._session
+        if session is None:
+            return None
+        return {key: value for key, value in session.items() if key != 'generation'}
+
+    def events(self, since=0):
+        """序号大于 since 的事件"""
+        return [event for event in list(self._events) if event['seq'] > since]
+
+    def _wait_process(self, generation, pid):
+        while True:
+            try:
+                psutil.Process(pid).wait()
+            except psutil.NoSuchProcess:
+                pass
+            except Exception as e:
+                logger.error(f"等待Steam进程失败: pid={pid}, {str(e)}")
+                return
+            if generation != self._generation:
+                return
+            # Steam 自我更新后由新进程接管, 继续等待新进程
+            new_pid = self.steam_manager.active_steam_pid()
+            if new_pid and new_pid != pid:
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    self._session['pid'] = new_pid
+                logger.info(f"Steam进程已转交: {pid} -> {new_pid}")
+                pid = new_pid
+                continue
+            self._end(generation, STEAM_EXITED, pid=pid)
+            return
+
+    def _stat_loginusers(self):
+        try:
+            return os.stat(self.steam_manager.loginusers_vdf_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _ensure_file_watcher(self):
+        if self._file_thread and self._file_thread.is_alive():
+            return
+        self._stop_handle = win32event.CreateEvent(None, True, False, None)
+        self._file_thread = threading.Thread(target=self._watch_files, name='session-file-watcher', daemon=True)
+        self._file_thread.start()
+
+    def _watch_files(self):
+        directory = str(self.steam_manager.loginusers_vdf_path.parent)
+        try:
+            change = win32file.FindFirstChangeNotification(
+                directory, False, win32con.FILE_NOTIFY_CHANGE_LAST_WRITE
+            )
+        except Exception as e:
+            logger.warning(f"无法监控Steam配置目录: {directory} {str(e)}")
+            return
+        try:
+            while True:
+                result = win32event.WaitForMultipleObjects(
+                    [change, self._stop_handle], False, win32event.INFINITE
+                )
+                if result != win32event.WAIT_OBJECT_0:
+                    return
+                self._check_loginusers()
+                win32file.FindNextChangeNotification(change)
+        finally:
+            win32file.FindCloseChangeNotification(change)
+
+    def _check_loginusers(self):
+        """config 目录有写入时调用, loginusers.vdf 没有变化时不读取"""
+        session = self._session
+        if session is None:
+            return
+        mtime = self._stat_loginusers()
+        if mtime is None or mtime == self._loginusers_mtime:
+            return
+        self._loginusers_mtime = mtime
+        try:
+            users = self.steam_manager.read_loginusers_vdf(force_refresh=True)
+        except Exception as e:
+            logger.warning(f"读取登录用户失败: {str(e)}")
+            return
+        current = next(
+            (user.get('AccountName') for user in users.values() if user.get('MostRecent') == '1'),
+            None
+        )
+        if current is None:
+            self._end(session['generation'], LOGGED_OUT)
+        elif current.lower() != session['username'].lower():
+            self._end(session['generation'], ACCOUNT_CHANGED, current=current)
+
+    # ---- 事件 ----
+
+    def _emit(self, event_type, username, **details):
+        event = {'seq': next(self._seq), 'type': event_type, 'username': username, 'time': time.time(), **details}
+        self._events.append(event)
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"会话事件回调失败: {str(e)}", exc_info=True)
+        return event
+
+    def _end(self, generation, reason, **details):
+        with self._lock:
+            if generation != self._generation or self._session is None:
+                return
+            session, self._session = self._session, None
+            self._generation += 1
+            generation = self._generation
+        duration = time.time() - session['started_at']
+        logger.warning(f"会话已结束: {session['username']}, 原因={reason}, 持续={duration:.0f}秒")
+        self._emit('session_ended', session['username'], reason=reason, duration=duration, **details)
+        if reason in RESWITCH_REASONS and self.config.get('Watchdog', 'auto_reswitch'):
+            # 会话保持足够久说明上次重新切换已经恢复正常, 重新计算退避
+            if duration >= self.config.get('Watchdog', 'stable_seconds'):
+                self._failures = 0
+            self._schedule_reswitch(session['username'], generation)
+
+    # ---- 自动重新切换 ----
+
+    def _schedule_reswitch(self, username, generation):
+        max_retries = self.config.get('Watchdog', 'max_retries')
+        if self._failures >= max_retries:
+            logger.error(f"自动重新切换已连续失败 {self._failures} 次, 停止重试: {username}")
+            self._emit('reswitch_abandoned', username, attempts=self._failures)
+            # 之后手动登录的会话重新计算重试次数
+            self._failures = 0
+            return
+        delay = min(
+            self.config.get('Watchdog', 'backoff_initial') * 2 ** self._failures,
+            self.config.get('Watchdog', 'backoff_max')
+        )
+        self._failures += 1
+        logger.info(f"{delay:.0f} 秒后自动重新切换到 {username} (第 {self._failures} 次)")
+        self._emit('reswitch_scheduled', username, delay=delay, attempt=self._failures)
+        timer = threading.Timer(delay, self._reswitch, args=(username, generation))
+        timer.daemon = True
+        self._retry_timer = timer
+        timer.start()
+
+    def _reswitch(self, username, generation):
+        # 等待期间已经切换到其他账号或重新开始监控时放弃
+        if generation != self._generation or self.coordinator is None:
+            return
+        try:
+            self.coordinator.switch(username)
+        except Exception as e:
+            logger.error(f"自动重新切换失败: {username} {str(e)}")
+            self._emit('reswitch_failed', username, error=str(e))
+            if self._session is None:
+                self._schedule_reswitch(username, self._generation)
+
+    def stop(self):
+        """停止监控线程和待执行的重新切换"""
+        self.unwatch()
+        if self._retry_timer:
+            self._retry_timer.cancel()
+        if self._stop_handle:
+            win32event.SetEvent(self._stop_handle)
@@ -3,12 +3,18 @@ from pathlib import Path
 import psutil
 import winreg
 import time
+import threading
 import subprocess
 import vdf
 from functools import cached_property
 from src.utils.logger import setup_logger
 from src.utils.error_codes import ErrorCode
 from src.utils.exceptions import SteamError
+from src.utils.signature_scanner import parse_signatures, find_field_offset
+from src.utils.offset_cache import OffsetCache
+from src.utils.vdf_scanner import ConfigVdfScanner
+from src.steam_process import SteamSupervisor
+import re
 import win32api
 import win32process
 import win32security
@@ -16,30 +22,60 @@ import win32con
 import ctypes
 from ctypes import wintypes, create_string_buffer, c_void_p, c_size_t
 import pymem
-import configparser
+from src.utils.config import get_config
 from datetime import datetime
 
 logger = setup_logger('steam_manager')
 
+# Steam 相关进程
+STEAM_PROCESSES = ['steam.exe', 'steamwebhelper.exe', 'steamservice.exe', 'steamloginui.exe']
+
+# Steam 账号名只允许字母、数字和下划线
+ACCOUNT_NAME_PATTERN = re.compile(r'[A-Za-z0-9_]{3,64}')
+
+# monitor_steam_memory 从用户名字段之前多少字节开始读取
+FIELD_LEAD = 20
+
+
+def _memory_field(content):
+    """monitor_steam_memory 读取窗口中用户名字段本身: 从字段偏移开始到第一个 NUL 为止的字符串"""
+    return content[FIELD_LEAD:].split('\x00', 1)[0]
+
 class SteamManager:
     """Steam 管理类,处理所有 Steam 相关操作"""
     
     def __init__(self):
         self.steam_reg_path = r"Software\Valve\Steam"
-        self.default_steam_path = Path(r"C:\Program Files (x86)\Steam")
         self._steam_path = None
-        self._vdf_cache = {}
-        self._last_vdf_check = 0
-        self.config = self._load_config()
+        # (读取时间, 用户数据) 作为整体替换, 读取方不会看到不一致的组合
+        self._vdf_state = (0, {})
+        self._vdf_lock = threading.Lock()
+        self._config_vdf_scanner = ConfigVdfScanner()
+        self.supervisor = SteamSupervisor()
+        self.config = get_config()
+        self.config.subscribe(self._on_config_changed)
         self.memory_offset = self._get_memory_offset()
+        self.memory_signatures = self._get_memory_signatures()
+        self.offset_cache = OffsetCache(os.path.join('config', 'offset_cache.json'))
+        self._offset_identity = None
+        self._offset_pid = None
+    
+    def _on_config_changed(self, changed):
+        """配置热加载: Steam 路径或内存定位配置变化时重置相关缓存"""
+        if ('Steam', 'path') in changed:
+            self._steam_path = None
+            for name in ('loginusers_vdf_path', 'config_vdf_path', 'steamui_dll_path'):
+                self.__dict__.pop(name, None)
+        if ('Steam', 'memory_addr') in changed or ('Steam', 'memory_pattern') in changed:
+            self.memory_offset = self._get_memory_offset()
+            self.memory_signatures = self._get_memory_signatures()
+            self._offset_identity = None
+            self._offset_pid = None
     
-    def _load_config(self):
-        """加载配置文件"""
-        config = configparser.ConfigParser()
-        config.read('config/config.ini', encoding='utf-8')
-        if not config.has_section('Steam'):
-            config.add_section('Steam')
-        return config
+    @property
+    def default_steam_path(self):
+        """Steam 默认安装目录"""
+        return Path(self.config.get('Steam', 'default_path'))
     
     @property
     def steam_path(self):
@@ -51,8 +87,8 @@ class SteamManager:
     def _get_steam_path(self):
         """从多个位置尝试获取 Steam 路径"""
         # 1. 从配置文件获取
-        if self.config.has_option('Steam', 'steam_path'):
-            path = Path(self.config.get('Steam', 'steam_path'))
+        if self.config.get('Steam', 'path'):
+            path = Path(self.config.get('Steam', 'path'))
             if path.exists():
                 return str(path)
         
@@ -85,31 +121,60 @@ class SteamManager:
             "未找到Steam客户端,请检查安装"
         )
     
+    @cached_property
+    def steamui_dll_path(self):
+        """获取 steamui.dll 文件路径"""
+        return Path(self.steam_path).parent / 'steamui.dll'
+    
     @cached_property
     def loginusers_vdf_path(self):
         """获取 loginusers.vdf 文件路径"""
         return Path(self.steam_path).parent / 'config' / 'loginusers.vdf'
     
+    @cached_property
+    def config_vdf_path(self):
+        """获取 config.vdf 文件路径"""
+        return Path(self.steam_path).parent / 'config' / 'config.vdf'
+    
+    def read_config_vdf_sessions(self):
+        """扫描 config.vdf 中保存的账号会话(按文件状态缓存)
+        
+        Returns:
+            ConfigVdfSessions: 会话信息, 文件不存在或解析失败时返回 None
+        """
+        try:
+            return self._config_vdf_scanner.scan(str(self.config_vdf_path))
+        except Exception as e:
+            logger.warning(f"扫描config.vdf失败: {str(e)}")
+            return None
+    
     def read_loginusers_vdf(self, force_refresh=False):
-        """读取Steam登录用户配置(带缓存)"""
-        current_time = time.time()
+        """读取Steam登录用户配置(带缓存)
         
-        # 使用缓存
-        if not force_refresh and current_time - self._last_vdf_check < 2:
-            return self._vdf_cache
+        缓存有效时不加锁直接返回; 过期后只有一个线程重新解析, 其他线程等待其结果。
+        """
+        last_check, users = self._vdf_state
+        if not force_refresh and time.time() - last_check < 2:
+            return users
             
         try:
-            if not self.loginusers_vdf_path.exists():
-                raise SteamError(
-                    ErrorCode.STEAM_CONFIG_ERROR,
-                    f"未找到登录配置文件: {self.loginusers_vdf_path}"
-                )
+            with self._vdf_lock:
+                last_check, users = self._vdf_state
+                if not force_refresh and time.time() - last_check < 2:
+                    return users
                 
-            with open(self.loginusers_vdf_path, 'r', encoding='utf-8') as f:
-                data = vdf.load(f)
-                self._vdf_cache = data.get('users', {})
-                self._last_vdf_check = current_time
-                return self._vdf_cache
+                if not self.loginusers_vdf_path.exists():
+                    raise SteamError(
+                        ErrorCode.STEAM_CONFIG_ERROR,
+                        f"未找到登录配置文件: {self.loginusers_vdf_path}"
+                    )
+                    
+                current_time = time.time()
+                with open(self.loginusers_vdf_path, 'r', encoding='utf-8') as f:
+                    data = vdf.load(f)
+                users = data.get('users', {})
+                self._vdf_state = (current_time, users)
+                return users
                 
         except Exception as e:
             raise SteamError(
@@ -117,17 +182,39 @@ class SteamManager:
                 f"读取登录配置失败: {str(e)}"
             )
     
-    def launch_steam(self, username=None, password=None, **kwargs):
-        """启动Steam客户端
+    def active_steam_pid(self):
+        """Steam 在注册表 ActiveProcess 中登记的进程 PID, 未运行时返回 None"""
+        try:
+            key = winreg.OpenKey(
+                winreg.HKEY_CURRENT_USER,
+                self.steam_reg_path + r"\ActiveProcess",
+                0,
+                winreg.KEY_READ
+            )
+            try:
+                pid, _ = winreg.QueryValueEx(key, "pid")
+            finally:
+                winreg.CloseKey(key)
+        except OSError:
+            return None
+        return pid if pid and psutil.pid_exists(pid) else None
+
+    def launch_steam(self, username=None, password=None, cancel_event=None, ready_timeout=None, **kwargs):
+        """启动Steam客户端并等待其就绪
         
         Args:
             username: 可选,指定登录用户名
             password: 可选,指定登录密码
+            cancel_event: 可选, 被设置时不再等待就绪
+            ready_timeout: 可选, 等待就绪的最长时间, 不超过 Steam.ready_timeout
             **kwargs: 其他命令行参数
                 remember_password (bool): 是否记住密码
                 silent (bool): 是否静默启动
                 no_browser (bool): 是否禁用内置浏览器
                 tcp_port (int): 指定TCP端口
+        
+        Returns:
+            SteamProcess: 由 supervisor 跟踪的 Steam 进程
         """
         cmd = [self.steam_path]
         
@@ -154,23 +241,29 @@ class SteamManager:
                     cmd.extend([f'-{key}', str(value)])
         
         try:
+            # 启动前已登记的 PID 属于上一个 Steam 进程, 不能作为本次的就绪信号
+            stale_pid = self.active_steam_pid()
             process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.DEVNULL,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 creationflags=subprocess.CREATE_NO_WINDOW | subprocess.DETACHED_PROCESS
             )
             
-            time.sleep(0.5)
-            if process.poll() is not None:
-                stdout, stderr = process.communicate()
-                raise SteamError(
-                    ErrorCode.STEAM_LAUNCH_FAILED,
-                    f"Steam启动失败: {stderr.decode()}"
-                )
+            def ready_probe():
+                pid = self.active_steam_pid()
+                return pid if pid and (pid != stale_pid or pid == process.pid) else None
             
-            return process
+            steam_process = self.supervisor.attach(process, ready_probe)
+            limit = self.config.get('Steam', 'ready_timeout')
+            ready_timeout = limit if ready_timeout is None else min(ready_timeout, limit)
+            if not steam_process.wait_ready(ready_timeout, cancel_event):
+                logger.warning(f"Steam 未在 {ready_timeout} 秒内就绪, 继续检查登录状态")
+            return steam_process
             
+        except SteamError:
+            raise
         except Exception as e:
             raise SteamError(
                 ErrorCode.STEAM_LAUNCH_FAILED,
@@ -180,7 +273,7 @@ class SteamManager:
     def _get_memory_offset(self):
         """从配置文件读取内存偏移量"""
         try:
-            memory_addr = self.config.get('Steam', 'memory_addr', fallback='steamui.dll+CC0E31')
+            memory_addr = self.config.get('Steam', 'memory_addr')
             
             # 解析格式 "steamui.dll+CC0E31"
             if '+' in memory_addr:
@@ -195,22 +288,90 @@ class SteamManager:
             logger.error(f"读取内存偏移量配置失败: {str(e)}")
             return 0xCC0E31  # 使用默认值
 
+    def _get_memory_signatures(self):
+        """从配置文件读取用于定位用户名字段的特征码"""
+        try:
+            return parse_signatures(self.config.get('Steam', 'memory_pattern'))
+        except ValueError as e:
+            logger.error(f"特征码配置格式不正确: {str(e)}")
+            return []
+
+    def _resolve_memory_offset(self, pm, dll):
+        """定位用户名字段偏移
+
+        先按 steamui.dll 构建标识查询偏移缓存, 未命中时在模块镜像中扫描特征码。
+        整个模块镜像只做一次批量读取, 扫描失败时保留 memory_addr 配置的偏移。
+        无法取得构建标识时不使用缓存, 每个 Steam 进程仍然扫描一次。
+        """
+        self._offset_pid = pm.process_id
+        identity = self.offset_cache.identity(str(self.steamui_dll_path))
+        if identity is not None and identity == self._offset_identity:
+            return
+        self._offset_identity = identity
+        
+        cached = self.offset_cache.get(identity) if identity is not None else None
+        if cached is not None:
+            logger.debug(f"使用缓存的内存偏移: {hex(cached)}")
+            self.memory_offset = cached
+            return
+        
+        self.memory_offset = self._get_memory_offset()
+        try:
+            start_time = time.time()
+            image = pm.read_bytes(dll.lpBaseOfDll, dll.SizeOfImage)
+            offset = find_field_offset(image, self.memory_signatures)
+            if offset is None:
+                logger.warning(f"特征码未能唯一匹配, 使用配置偏移: {hex(self.memory_offset)}")
+                return
+            logger.info(
+                f"特征码定位成功: offset={hex(offset)}, "
+                f"镜像大小={dll.SizeOfImage}, 耗时={(time.time() - start_time) * 1000:.1f}ms"
+            )
+            self.memory_offset = offset
+            if identity is not None:
+                self.offset_cache.put(identity, offset)
+        except Exception as e:
+            logger.error(f"扫描 steamui.dll 特征码失败: {str(e)}")
+
+    def invalidate_memory_offset(self):
+        """内存内容不再像账号名时, 丢弃缓存偏移并在下次读取时重新扫描"""
+        if self._offset_identity:
+            logger.warning(f"内存偏移可能已失效, 重新验证: {hex(self.memory_offset)}")
+            self.offset_cache.invalidate(self._offset_identity)
+        self._offset_identity = None
+        self._offset_pid = None
+
     def kill_steam_processes(self):
         """结束所有Steam相关进程"""
-        steam_processes = ['steam.exe', 'steamwebhelper.exe', 'steamservice.exe', 'steamloginui.exe']
         killed = []
         
         for proc in psutil.process_iter(['name', 'pid']):
             try:
-                if proc.info['name'].lower() in steam_processes:
+                if proc.info['name'].lower() in STEAM_PROCESSES:
                     proc.kill()
-                    killed.append(proc.info['name'])
+                    killed.append(proc)
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
                 
         if killed:
-            logger.info(f"已结束Steam进程: {', '.join(killed)}")
-            time.sleep(1)  # 等待进程完全结束
+            logger.info(f"已结束Steam进程: {', '.join(p.info['name'] for p in killed)}")
+            # 等待进程完全结束, 最长等待 kill_timeout 秒
+            _, alive = psutil.wait_procs(killed, timeout=self.config.get('Steam', 'kill_timeout'))
+            if alive:
+                logger.warning(f"部分Steam进程未在超时内结束: {[p.pid for p in alive]}")
+        # 回收本程序启动的 Steam 进程的输出管道和监管线程
+        self.supervisor.release()
+    
+    def get_steam_memory(self):
+        """统计所有Steam相关进程的常驻内存(字节)"""
+        total = 0
+        for proc in psutil.process_iter(['name', 'memory_info']):
+            try:
+                if proc.info['name'] and proc.info['name'].lower() in STEAM_PROCESSES:
+                    total += proc.info['memory_info'].rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied, AttributeError):
+                continue
+        return total
     
     def check_steam_config(self):
         """检查Steam配置文件状态"""
@@ -269,11 +430,14 @@ class SteamManager:
                 logger.warning("未找到 steamui.dll 模块，可能会影响登录检测")
                 return None
                 
+            if self.memory_signatures and pm.process_id != self._offset_pid:
+                self._resolve_memory_offset(pm, dll)
+                
             base_address = dll.lpBaseOfDll
             target_address = base_address + self.memory_offset
             logger.debug(f"内存地址: base={hex(base_address)}, offset={hex(self.memory_offset)}, target={hex(target_address)}")
             
-            memory_bytes = pm.read_bytes(target_address - 20, 61)
+            memory_bytes = pm.read_bytes(target_address - FIELD_LEAD, 61)
             logger.debug(f"读取内存数据: 长度={len(memory_bytes)} 字节")
             
             string_value = memory_bytes.decode('ascii', errors='replace')
@@ -285,15 +449,35 @@ class SteamManager:
             logger.error(f"读取内存失败: {str(e)}", exc_info=True)
             return None
 
-    def check_login_success(self, username, max_wait=10):
-        """通过监控内存来判断登录状态"""
+    @staticmethod
+    def _wait_interval(interval, cancel_event=None):
+        """等待检查间隔, 取消时提前返回"""
+        if cancel_event:
+            cancel_event.wait(interval)
+        else:
+            time.sleep(interval)
+
+    def check_login_success(self, username, max_wait=10, cancel_event=None):
+        """通过监控内存来判断登录状态
+        
+        Args:
+            username: 要检查的用户名
+            max_wait: 最长等待时间(秒)
+            cancel_event: 可选, 被设置时立即停止等待并返回 False
+        """
         logger.info(f"开始检查登录状态: 用户={username}, 超时={max_wait}秒")
         start_time = time.time()
         check_interval = 0.5
         last_content = None
         attempt_count = 0
+        # 从已加载的 steamui.dll 读到用户名字段非空的次数; 只有读到过内容且都不是账号名时才说明偏移失效
+        populated_reads = 0
+        plausible_seen = False
 
         while time.time() - start_time < max_wait:
+            if cancel_event and cancel_event.is_set():
+                logger.info(f"登录检查已取消: 用户={username}")
+                return False
             try:
                 attempt_count += 1
                 logger.debug(f"第 {attempt_count} 次检查登录状态")
@@ -301,9 +485,15 @@ class SteamManager:
                 content = self.monitor_steam_memory()
                 if content is None:
                     logger.warning("无法读取内存内容，等待重试...")
-                    time.sleep(check_interval)
+                    self._wait_interval(check_interval, cancel_event)
                     continue
 
+                field = _memory_field(content)
+                if field:
+                    populated_reads += 1
+                    if not plausible_seen and ACCOUNT_NAME_PATTERN.fullmatch(field):
+                        plausible_seen = True
+
                 # 如果内容发生变化，记录日志
                 if content != last_content:
                     logger.debug(f"内存内容已更新: {content}")
@@ -314,11 +504,13 @@ class SteamManager:
                     return True
 
                 logger.debug(f"未检测到登录成功，继续等待...")
-                time.sleep(check_interval)
+                self._wait_interval(check_interval, cancel_event)
                 
             except Exception as e:
                 logger.error(f"检查登录状态出错: {str(e)}", exc_info=True)
-                time.sleep(check_interval)
+                self._wait_interval(check_interval, cancel_event)
 
+        if populated_reads and not plausible_seen:
+            self.invalidate_memory_offset()
         logger.warning(f"登录超时: 用户={username}, 已等待={max_wait}秒")
         return False 
\ No newline at end of file
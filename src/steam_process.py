@@ -0,0 +1,196 @@
+"""Steam 子进程监管
+
+启动后由后台线程持续读取 Steam 的输出并写入大小受限的滚动日志, 避免管道写满后 Steam 阻塞;
+另一个线程等待进程退出并记录退出码。启动方通过 wait_ready 等待就绪信号
+(Steam 在注册表 ActiveProcess\\pid 中登记自身进程), 不再固定等待。
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from src.utils.logger import setup_logger
+from src.utils.config import get_config
+from src.utils.error_codes import ErrorCode
+from src.utils.exceptions import SteamError
+
+logger = setup_logger('steam_process')
+
+# 就绪检查间隔(秒)
+PROBE_INTERVAL = 0.05
+# 启动失败时错误信息中附带的输出行数
+TAIL_LINES = 20
+# 释放资源时等待读取线程结束的时间(秒)
+JOIN_TIMEOUT = 2.0
+
+_output_logger = None
+_output_lock = threading.Lock()
+
+
+def _get_output_logger():
+    """Steam 输出日志: logs/steam_output.log, 按 Steam.output_log_kb 滚动"""
+    global _output_logger
+    with _output_lock:
+        if _output_logger is None:
+            config = get_config()
+            log_dir = config.get('General', 'log_dir')
+            os.makedirs(log_dir, exist_ok=True)
+            handler = RotatingFileHandler(
+                os.path.join(log_dir, 'steam_output.log'),
+                maxBytes=config.get('Steam', 'output_log_kb') * 1024,
+                backupCount=2,
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+            output_logger = logging.getLogger('steam_output')
+            output_logger.handlers.clear()
+            output_logger.addHandler(handler)
+            output_logger.setLevel(logging.INFO)
+            output_logger.propagate = False
+            _output_logger = output_logger
+        return _output_logger
+
+
+class SteamProcess:
+    """一次启动的 Steam 进程
+
+    pid 初始为启动的进程, Steam 自我更新或转交给新进程后更新为 ActiveProcess 中登记的进程。
+    """
+
+    def __init__(self, popen, ready_probe=None):
+        """
+        Args:
+            popen: subprocess.Popen 对象, stdout 为管道(stderr 合并到 stdout)
+            ready_probe: 返回 Steam 已登记的进程 PID, 尚未就绪时返回 None
+        """
+        self.popen = popen
+        self.pid = popen.pid
+        self.started_at = time.monotonic()
+        self.ready_at = None
+        self.returncode = None
+        self.ready = threading.Event()
+        self.exited = threading.Event()
+        self._ready_probe = ready_probe
+        self._tail = deque(maxlen=TAIL_LINES)
+        self._released = False
+        self._drain_thread = None
+        if popen.stdout is not None:
+            self._drain_thread = threading.Thread(
+                target=self._drain, name=f'steam-output-{popen.pid}', daemon=True
+            )
+            self._drain_thread.start()
+        self._reaper = threading.Thread(target=self._reap, name=f'steam-reaper-{popen.pid}', daemon=True)
+        self._reaper.start()
+
+    def _drain(self):
+        output = _get_output_logger()
+        try:
+            for line in iter(self.popen.stdout.readline, b''):
+                text = line.decode('utf-8', errors='replace').rstrip()
+                if text:
+                    self._tail.append(text)
+                    output.info(f"[{self.popen.pid}] {text}")
+        except (OSError, ValueError):
+            # 管道已被 release 关闭
+            pass
+
+    def _reap(self):
+        self.returncode = self.popen.wait()
+        self.exited.set()
+        logger.debug(f"Steam 进程已退出: pid={self.popen.pid}, 退出码={self.returncode}")
+        self._close_output(JOIN_TIMEOUT)
+
+    def _close_output(self, timeout):
+        """等待读取线程结束后关闭管道
+
+        Steam 的子进程可能继承输出管道, 读取线程在超时内没有结束时直接关闭管道。
+        """
+        if self._drain_thread:
+            self._drain_thread.join(timeout)
+            try:
+                self.popen.stdout.close()
+            except OSError:
+                pass
+
+    @property
+    def output_tail(self):
+        """最近的输出内容"""
+        return '\n'.join(self._tail)
+
+    def wait_ready(self, timeout, cancel_event=None):
+        """等待 Steam 就绪
+
+        启动的进程以非零退出码提前退出时视为启动失败; 退出码为 0 说明已转交给
+        其他 Steam 进程, 继续等待就绪信号。
+
+        Returns:
+            bool: 是否在超时前就绪(取消或超时返回 False)
+
+        Raises:
+            SteamError: STEAM_LAUNCH_FAILED
+        """
+        deadline = self.started_at + timeout
+        while True:
+            pid = self._ready_probe() if self._ready_probe else None
+            if pid:
+                self.pid = pid
+                self.ready_at = time.monotonic()
+                self.ready.set()
+                logger.info(f"Steam 已就绪: pid={pid}, 耗时={self.ready_at - self.started_at:.2f}秒")
+                return True
+            if self.exited.is_set() and self.returncode != 0:
+                # 读取剩余的输出, 错误信息中带上最后几行
+                if self._drain_thread:
+                    self._drain_thread.join(0.5)
+                raise SteamError(
+                    ErrorCode.STEAM_LAUNCH_FAILED,
+                    f"Steam启动失败(退出码 {self.returncode}): {self.output_tail}"
+                )
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancel_event and cancel_event.is_set()):
+                return False
+            # 进程退出时立即醒来, 否则按检查间隔探测就绪信号
+            self.exited.wait(min(PROBE_INTERVAL, remaining))
+
+    def release(self, timeout=JOIN_TIMEOUT):
+        """进程被结束后回收线程和管道, 可以重复调用; 进程自行退出时由等待线程回收"""
+        if self._released:
+            return
+        self._released = True
+        self.exited.wait(timeout)
+        self._close_output(timeout)
+        if not self.exited.is_set():
+            logger.warning(f"Steam 进程未在 {timeout} 秒内退出: pid={self.popen.pid}")
+
+
+class SteamSupervisor:
+    """跟踪由本程序启动的 Steam 进程, 新进程启动前释放上一个进程的资源"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = None
+
+    def attach(self, popen, ready_probe=None):
+        """接管新启动的进程"""
+        process = SteamProcess(popen, ready_probe)
+        with self._lock:
+            previous, self.current = self.current, process
+        if previous:
+            previous.release(timeout=0)
+        return process
+
+    def release(self, timeout=JOIN_TIMEOUT):
+        """Steam 进程被结束后调用, 等待进程退出并回收资源"""
+        with self._lock:
+            process, self.current = self.current, None
+        if process:
+            process.release(timeout)
+
+    @property
+    def pid(self):
+        """当前 Steam 进程的 PID, 进程已退出时为 None"""
+        process = self.current
+        if process is None or (process.exited.is_set() and not process.ready.is_set()):
+            return None
+        return process.pid
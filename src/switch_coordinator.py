@@ -0,0 +1,342 @@
+import time
+import threading
+from collections import OrderedDict
+from src.utils.logger import setup_logger
+from src.utils.error_codes import ErrorCode
+from src.utils.exceptions import SteamError, AccountError
+from src.launch_profiles import LaunchProfiles
+from src.login_timeouts import LoginTimeouts
+from src.utils.config import get_config
+
+logger = setup_logger('switch_coordinator')
+
+# 已完成操作按幂等键保留的时间(秒), 期间重复请求直接返回原结果
+RECENT_TTL = 10
+
+# 截止时间到达后等待工作线程收尾的时间(秒), 超过后直接向调用方返回超时
+DEADLINE_GRACE = 5
+
+
+class SwitchOperation:
+    """一次账号切换操作"""
+
+    def __init__(self, username, password, remember_password, key, deadline):
+        self.username = username
+        self.password = password
+        self.remember_password = remember_password
+        self.key = key
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.launch_profile = 'default'
+        self.launch_kwargs = {}
+        # 整个切换流程(包括快速切换失败后的密码登录)的截止时间, time.monotonic()
+        self.deadline = deadline
+
+    def cancel(self):
+        """取消操作, 正在等待登录结果时会尽快退出"""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def remaining(self):
+        """距离截止时间的秒数"""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise SteamError(
+                ErrorCode.SWITCH_SUPERSEDED,
+                f"切换到 {self.username} 的请求已被新的请求取代"
+            )
+        if not self.remaining():
+            raise SteamError(ErrorCode.SWITCH_TIMEOUT, f"切换到 {self.username} 超时")
+
+    def wait(self):
+        """等待操作完成并返回结果, 最长等待到截止时间后 DEADLINE_GRACE 秒"""
+        if not self.done.wait(self.remaining() + DEADLINE_GRACE):
+            self.cancel()
+            raise SteamError(ErrorCode.SWITCH_TIMEOUT, f"切换到 {self.username} 超时")
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class SwitchCoordinator:
+    """账号切换协调器
+
+    独占 Steam 进程的启停: 同一时间只执行一个切换;
+    同一账号的重复请求合并到正在执行或等待中的操作;
+    其他账号的新请求会取消正在执行的切换并替换等待中的请求。
+    """
+
+    def __init__(self, steam_manager, account_manager, launch_profiles=None, session_store=None,
+                 login_timeouts=None, watchdog=None):
+        self.steam_manager = steam_manager
+        self.account_manager = account_manager
+        self.launch_profiles = launch_profiles or LaunchProfiles()
+        self.session_store = session_store
+        self.login_timeouts = login_timeouts or LoginTimeouts()
+        self.watchdog = watchdog
+        if watchdog:
+            watchdog.attach(self)
+        self.config = get_config()
+        self._cond = threading.Condition()
+        self._running = None
+        self._pending = None
+        self._recent = OrderedDict()
+        self._worker = None
+
+    def submit(self, username, password=None, remember_password=True, idempotency_key=None):
+        """提交切换请求
+
+        Args:
+            username: 要切换的账号
+            password: 密码, 为 None 时在密码登录前从凭证库解密
+            remember_password: 是否记住密码
+            idempotency_key: 幂等键, 幂等键和账号都相同的已完成请求在短时间内直接复用结果;
+                没有幂等键时只合并仍在执行或等待中的同账号请求, 完成后再次请求会重新切换
+
+        Returns:
+            SwitchOperation: 新建或被合并到的操作
+        """
+        # 同一个幂等键换了账号不是重试, 不能返回其他账号的结果
+        key = (idempotency_key, username.lower()) if idempotency_key is not None else None
+        with self._cond:
+            self._expire_recent()
+            if key is not None and key in self._recent:
+                logger.info(f"重复的切换请求, 复用已完成的结果: {username}")
+                return self._recent[key]
+
+            for op in (self._running, self._pending):
+                if op and not op.cancelled and op.username.lower() == username.lower():
+                    logger.info(f"合并重复的切换请求: {username}")
+                    return op
+
+            deadline = time.monotonic() + self.config.get('Timeouts', 'login_deadline')
+            op = SwitchOperation(username, password, remember_password, key, deadline)
+            if self._running and not self._running.cancelled:
+                logger.info(f"新的切换请求 {username} 取代正在进行的 {self._running.username}")
+                self._running.cancel()
+            if self._pending:
+                logger.info(f"新的切换请求 {username} 取代等待中的 {self._pending.username}")
+                self._finish(self._pending, error=SteamError(
+                    ErrorCode.SWITCH_SUPERSEDED,
+                    f"切换到 {self._pending.username} 的请求已被新的请求取代"
+                ))
+            self._pending = op
+            self._ensure_worker()
+            self._cond.notify()
+        return op
+
+    def switch(self, username, password=None, remember_password=True, idempotency_key=None):
+        """提交切换请求并等待结果"""
+        return self.submit(username, password, remember_password, idempotency_key).wait()
+
+    @property
+    def current(self):
+        """正在执行的切换操作"""
+        return self._running
+
+    def _expire_recent(self):
+        now = time.time()
+        while self._recent:
+            key, op = next(iter(self._recent.items()))
+            if now - op.finished_at < RECENT_TTL:
+                break
+            self._recent.pop(key)
+
+    def _ensure_worker(self):
+        if self._worker and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._run, name='switch-worker', daemon=True)
+        self._worker.start()
+
+    def _finish(self, op, result=None, error=None):
+        op.result = result
+        op.error = error
+        op.finished_at = time.time()
+        op.done.set()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                op = self._running = self._pending
+                self._pending = None
+
+            result, error = None, None
+            try:
+                result = self._execute(op)
+            except Exception as e:
+                error = e
+            finally:
+                # 解密后的密码不随操作结果保留
+                op.password = None
+
+            with self._cond:
+                self._running = None
+                # 先记录结果再放入 _recent, 并发的重试不会看到没有 finished_at 的操作
+                self._finish(op, result, error)
+                if error is None and op.key is not None:
+                    self._recent[op.key] = op
+
+    def _execute(self, op):
+        """执行切换: 优先快速切换, 失败后使用密码登录"""
+        account = self.account_manager.get_account(op.username)
+        if not account:
+            raise AccountError(
+                ErrorCode.ACCOUNT_NOT_FOUND,
+                f"账号 {op.username} 不存在"
+            )
+
+        # 切换过程中结束 Steam 不是会话意外结束
+        if self.watchdog:
+            self.watchdog.unwatch()
+
+        op.launch_profile, op.launch_kwargs = self.launch_profiles.resolve(account)
+        logger.info(f"使用启动配置: {op.launch_profile} {op.launch_kwargs}")
+
+        # 尝试快速切换, Steam 和会话快照中都没有保存会话的账号直接使用密码登录
+        if account.get('can_quick_switch') or self._has_snapshot(op.username):
+            if self._timed_attempt(op, 'quick_switch', self.quick_switch_login):
+                return self._login_succeeded(op)
+        elif account.get('session_cached') is False:
+            logger.info(f"账号 {op.username} 没有保存的登录会话, 跳过快速切换")
+
+        op.check_cancelled()
+        if op.password is None:
+            op.password = self.account_manager.get_password(op.username)
+        if op.password and self._timed_attempt(op, 'password', self.password_login):
+            return self._login_succeeded(op)
+
+        op.check_cancelled()
+        raise AccountError(
+            ErrorCode.INVALID_CREDENTIALS,
+            "登录失败，请检查密码或网络连接"
+        )
+
+    def _has_snapshot(self, username):
+        return bool(self.session_store and self.session_store.enabled and self.session_store.has_session(username))
+
+    def _login_succeeded(self, op):
+        """登录成功: 保存会话快照, 开始监控会话并更新登录时间"""
+        if self.session_store and self.session_store.enabled:
+            try:
+                self.session_store.capture(op.username)
+            except Exception as e:
+                logger.warning(f"保存登录会话失败: {str(e)}")
+        if self.watchdog:
+            try:
+                self.watchdog.watch(op.username)
+            except Exception as e:
+                logger.warning(f"启动会话监控失败: {str(e)}")
+        return self.account_manager.update_login_time(op.username)
+
+    def _restore_snapshot(self, username):
+        """把保存的会话写回 Steam 目录, 失败时仍使用 Steam 现有的会话尝试快速切换"""
+        if not self._has_snapshot(username):
+            return
+        try:
+            self.session_store.restore(username)
+        except Exception as e:
+            logger.warning(f"恢复登录会话失败: {str(e)}")
+
+    def _timed_attempt(self, op, method, attempt):
+        """执行一次登录尝试, 按启动配置记录登录耗时和内存占用"""
+        start_time = time.time()
+        success = attempt(op)
+        elapsed = time.time() - start_time
+        memory = None
+        if success:
+            try:
+                memory = self.steam_manager.get_steam_memory()
+            except Exception as e:
+                logger.debug(f"统计Steam内存失败: {str(e)}")
+        try:
+            self.launch_profiles.record(op.launch_profile, method, elapsed, memory, success)
+        except Exception as e:
+            logger.warning(f"记录启动配置统计失败: {str(e)}")
+        return success
+
+    def check_login_status(self, op, method):
+        """等待登录结果
+
+        等待时间为按历史耗时估计的超时, 且不超过整个切换的剩余时间;
+        登录成功时记录本次耗时用于之后的估计。
+        """
+        max_wait = min(self.login_timeouts.timeout(op.username, method), op.remaining())
+        start_time = time.monotonic()
+        try:
+            success = self.steam_manager.check_login_success(
+                op.username, max_wait, cancel_event=op.cancel_event
+            )
+        except Exception as e:
+            logger.error(f"检查登录状态失败: {str(e)}")
+            return False
+        if success:
+            try:
+                self.login_timeouts.record(op.username, method, time.monotonic() - start_time)
+            except Exception as e:
+                logger.warning(f"记录登录耗时失败: {str(e)}")
+        return success
+
+    def quick_switch_login(self, op):
+        """快速切换登录
+
+        Returns:
+            bool: 是否登录成功
+        """
+        logger.info(f"尝试快速切换: {op.username}")
+
+        # 检查配置
+        self.steam_manager.check_steam_config()
+
+        # 设置自动登录用户
+        self.steam_manager.set_auto_login_user(op.username)
+
+        # 结束Steam进程
+        op.check_cancelled()
+        self.steam_manager.kill_steam_processes()
+
+        # Steam 退出后写回保存的会话
+        self._restore_snapshot(op.username)
+
+        # 启动Steam
+        op.check_cancelled()
+        self.steam_manager.launch_steam(
+            cancel_event=op.cancel_event, ready_timeout=op.remaining(), **op.launch_kwargs
+        )
+
+        # 检查登录状态
+        return self.check_login_status(op, 'quick_switch')
+
+    def password_login(self, op):
+        """使用密码登录
+
+        Returns:
+            bool: 是否登录成功
+        """
+        logger.info(f"尝试密码登录: {op.username}")
+
+        # 结束现有Steam进程
+        self.steam_manager.kill_steam_processes()
+
+        # 启动Steam并登录
+        op.check_cancelled()
+        self.steam_manager.launch_steam(
+            username=op.username,
+            password=op.password,
+            remember_password=op.remember_password,
+            cancel_event=op.cancel_event,
+            ready_timeout=op.remaining(),
+            **op.launch_kwargs
+        )
+
+        # 检查登录状态
+        return self.check_login_status(op, 'password')
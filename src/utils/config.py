@@ -0,0 +1,279 @@
+"""统一配置服务
+
+集中读取 config/config.ini, 按类型定义解析配置项并缓存在内存中。
+文件变化时自动重新加载并通知订阅者, 写入时保留注释并原子替换文件。
+"""
+import os
+import re
+import time
+import logging
+import threading
+import configparser
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CONFIG_PATH = os.path.join('config', 'config.ini')
+
+# 配置项定义: (节, 键) -> (类型, 默认值)
+SCHEMA: Dict[Tuple[str, str], Tuple[type, Any]] = {
+    ('General', 'enable_quick_switch'): (bool, True),
+    ('General', 'enable_webview_debug'): (bool, False),
+    ('General', 'request_timeout'): (int, 10),
+    ('General', 'max_retries'): (int, 3),
+    ('General', 'log_level'): (str, 'INFO'),
+    ('General', 'log_dir'): (str, 'logs'),
+    ('General', 'accounts_file'): (str, 'accounts.json'),
+    ('General', 'shared_accounts'): (bool, False),
+    ('Steam', 'path'): (str, ''),
+    ('Steam', 'memory_addr'): (str, 'steamui.dll+CC0E31'),
+    ('Steam', 'memory_pattern'): (str, ''),
+    ('Steam', 'kill_timeout'): (int, 5),
+    ('Steam', 'default_path'): (str, r'C:\Program Files (x86)\Steam'),
+    ('Steam', 'launch_profile'): (str, 'default'),
+    ('Steam', 'launch_ab_test'): (bool, False),
+    ('Steam', 'launch_ab_profiles'): (str, 'default,minimal'),
+    ('Steam', 'ready_timeout'): (int, 10),
+    ('Steam', 'output_log_kb'): (int, 1024),
+    ('Avatar', 'thumb_size'): (int, 32),
+    ('Avatar', 'cache_kb'): (int, 4096),
+    ('Avatar', 'thumb_dir'): (str, ''),
+    ('Debug', 'enable_profiler'): (bool, False),
+    ('Fleet', 'listen_host'): (str, '127.0.0.1'),
+    ('Fleet', 'token'): (str, ''),
+    ('Fleet', 'nodes_file'): (str, os.path.join('config', 'fleet.json')),
+    ('Fleet', 'poll_interval'): (int, 5),
+    ('Fleet', 'node_timeout'): (int, 10),
+    ('Fleet', 'switch_timeout'): (int, 120),
+    ('Fleet', 'max_connections'): (int, 64),
+    ('Library', 'scan_interval'): (int, 600),
+    ('Library', 'workers'): (int, 0),
+    ('Timeouts', 'login_deadline'): (int, 90),
+    ('Timeouts', 'quick_switch_default'): (float, 20.0),
+    ('Timeouts', 'password_default'): (float, 30.0),
+    ('Timeouts', 'margin'): (float, 1.5),
+    ('Timeouts', 'min_timeout'): (float, 5.0),
+    ('Timeouts', 'max_timeout'): (float, 60.0),
+    ('Watchdog', 'enabled'): (bool, True),
+    ('Watchdog', 'auto_reswitch'): (bool, False),
+    ('Watchdog', 'backoff_initial'): (float, 5.0),
+    ('Watchdog', 'backoff_max'): (float, 300.0),
+    ('Watchdog', 'max_retries'): (int, 5),
+    ('Watchdog', 'stable_seconds'): (int, 120),
+    ('BanCheck', 'enabled'): (bool, False),
+    ('BanCheck', 'api_key'): (str, ''),
+    ('BanCheck', 'base_url'): (str, 'https://api.steampowered.com'),
+    ('BanCheck', 'interval'): (int, 3600),
+    ('BanCheck', 'cache_ttl'): (int, 21600),
+    ('BanCheck', 'max_concurrency'): (int, 4),
+    ('BanCheck', 'request_timeout'): (int, 15),
+    ('BanCheck', 'max_retries'): (int, 4),
+    ('BanCheck', 'backoff_initial'): (float, 1.0),
+    ('BanCheck', 'backoff_max'): (float, 60.0),
+    ('Sessions', 'enabled'): (bool, True),
+    ('Sessions', 'store_dir'): (str, os.path.join('config', 'sessions')),
+}
+
+# 两次检查文件状态的最小间隔(秒)
+STAT_INTERVAL = 1.0
+
+_TRUE_VALUES = ('1', 'yes', 'true', 'on')
+_FALSE_VALUES = ('0', 'no', 'false', 'off')
+
+logger = logging.getLogger('config')
+
+
+def _convert(value: str, value_type: type, default: Any) -> Any:
+    value = value.strip()
+    if value_type is bool:
+        if value.lower() in _TRUE_VALUES:
+            return True
+        if value.lower() in _FALSE_VALUES:
+            return False
+        raise ValueError(f"无效的布尔值: {value}")
+    if value_type is int:
+        return int(value, 0)
+    if value_type is float:
+        return float(value)
+    return value
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+
+class ConfigService:
+    """带缓存和热加载的配置服务"""
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._values: Dict[Tuple[str, str], Any] = {}
+        self._raw = configparser.ConfigParser(interpolation=None)
+        self._file_stat = None
+        self._last_check = 0.0
+        self._subscribers = []
+        self._watcher = None
+        self._stop_event = threading.Event()
+        self._reload()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def _reload(self) -> Dict[Tuple[str, str], Any]:
+        """重新解析配置文件, 返回发生变化的配置项"""
+        raw = configparser.ConfigParser(interpolation=None)
+        try:
+            raw.read(self.path, encoding='utf-8-sig')
+        except configparser.Error as e:
+            logger.error(f"解析配置文件失败: {str(e)}")
+            return {}
+
+        values = {}
+        for (section, key), (value_type, default) in SCHEMA.items():
+            text = raw.get(section, key, fallback=None)
+            if text is None or (not text.strip() and value_type is not str):
+                values[(section, key)] = default
+                continue
+            try:
+                values[(section, key)] = _convert(text, value_type, default)
+            except ValueError:
+                logger.warning(f"配置项 [{section}] {key} 的值无效: {text}, 使用默认值 {default}")
+                values[(section, key)] = default
+
+        changed = {k: v for k, v in values.items() if k not in self._values or self._values[k] != v}
+        self._raw = raw
+        self._values = values
+        self._file_stat = self._stat()
+        return changed
+
+    def check_reload(self, force: bool = False) -> bool:
+        """检查配置文件是否变化, 变化时重新加载并通知订阅者"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < STAT_INTERVAL:
+                return False
+            self._last_check = now
+            if self._stat() == self._file_stat:
+                return False
+            changed = self._reload()
+        if changed:
+            logger.info(f"配置已重新加载: {', '.join(f'{s}.{k}' for s, k in changed)}")
+            self._notify(changed)
+        return bool(changed)
+
+    def get(self, section: str, key: str, fallback: Any = None) -> Any:
+        """获取配置值, 已定义的配置项按类型返回"""
+        self.check_reload()
+        if (section, key) in self._values:
+            return self._values[(section, key)]
+        return self._raw.get(section, key, fallback=fallback)
+
+    def items(self, section: str) -> Dict[str, str]:
+        """获取某个节下的全部原始配置项"""
+        self.check_reload()
+        if not self._raw.has_section(section):
+            return {}
+        return dict(self._raw.items(section))
+
+    def subscribe(self, callback: Callable[[Dict[Tuple[str, str], Any]], None]):
+        """订阅配置变化, 回调参数为 {(节, 键): 新值}"""
+        self._subscribers.append(callback)
+
+    def _notify(self, changed):
+        for callback in list(self._subscribers):
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"配置变化回调失败: {str(e)}", exc_info=True)
+
+    def set(self, section: str, key: str, value: Any):
+        """写入单个配置项"""
+        self.update({(section, key): value})
+
+    def update(self, items: Dict[Tuple[str, str], Any]):
+        """写入多个配置项
+
+        按行修改配置文件以保留注释, 先写临时文件再原子替换。
+        """
+        with self._lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8-sig') as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                lines = []
+
+            # configparser 的选项名不区分大小写, 按小写匹配, 改写已有行时保留文件中原来的写法
+            pending = {(sec, key.lower()): (key, _format(v)) for (sec, key), v in items.items()}
+            section = None
+            section_end = {}
+            for i, line in enumerate(lines):
+                header = re.match(r'^\s*\[(.+?)\]\s*$', line)
+                if header:
+                    section = header.group(1)
+                    section_end[section] = i + 1
+                    continue
+                match = re.match(r'^(\s*)([^#;=\s][^=]*?)\s*=', line)
+                if section is not None:
+                    if line.strip():
+                        section_end[section] = i + 1
+                    if match and (section, match.group(2).lower()) in pending:
+                        _, value = pending.pop((section, match.group(2).lower()))
+                        lines[i] = f"{match.group(1)}{match.group(2)} = {value}"
+
+            # 追加原文件中没有的配置项, 从后往前插入避免行号偏移
+            missing = {}
+            for (sec, _), (key, value) in pending.items():
+                missing.setdefault(sec, []).append(f"{key} = {value}")
+            for sec, new_lines in sorted(missing.items(),
+                                         key=lambda item: section_end.get(item[0], len(lines)),
+                                         reverse=True):
+                if sec in section_end:
+                    pos = section_end[sec]
+                    lines[pos:pos] = new_lines
+                else:
+                    lines.extend(([''] if lines else []) + [f"[{sec}]"] + new_lines)
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, self.path)
+            changed = self._reload()
+        if changed:
+            self._notify(changed)
+
+    def start_watching(self, interval: float = 2.0):
+        """启动后台线程定期检查配置文件变化"""
+        if self._watcher and self._watcher.is_alive():
+            return
+
+        def watch():
+            while not self._stop_event.wait(interval):
+                self.check_reload(force=True)
+
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=watch, name='config-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """停止后台检查线程"""
+        self._stop_event.set()
+
+
+_config: Optional[ConfigService] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> ConfigService:
+    """获取全局配置服务"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = ConfigService()
+    return _config
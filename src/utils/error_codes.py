@@ -16,18 +16,28 @@ class ErrorCode(Enum):
     STEAM_LOGIN_FAILED = 1103
     STEAM_CONFIG_ERROR = 1104
     STEAM_MEMORY_ERROR = 1105
+    SWITCH_SUPERSEDED = 1106
+    SWITCH_TIMEOUT = 1107
+    STEAM_API_UNAVAILABLE = 1108
     
     # 账户相关错误 (1200-1299)
     ACCOUNT_NOT_FOUND = 1200
     ACCOUNT_ALREADY_EXISTS = 1201
     ACCOUNT_DATA_ERROR = 1202
     INVALID_CREDENTIALS = 1203
+    VAULT_LOCKED = 1204
+    ACCOUNT_CONFLICT = 1205
     
     # 配置相关错误 (1300-1399)
     CONFIG_NOT_FOUND = 1300
     CONFIG_PARSE_ERROR = 1301
     CONFIG_WRITE_ERROR = 1302
     
+    # 集群相关错误 (1400-1499)
+    FLEET_NODE_NOT_FOUND = 1400
+    FLEET_NODE_UNAVAILABLE = 1401
+    FLEET_UNSUPPORTED = 1402
+    
     @property
     def message(self) -> str:
         """获取错误码对应的默认错误消息"""
@@ -45,6 +55,8 @@ class ErrorCode(Enum):
             return "账户错误"
         elif 1300 <= code < 1400:
             return "配置错误"
+        elif 1400 <= code < 1500:
+            return "集群错误"
         return "未知类别"
 
 # 错误码对应的默认错误消息
@@ -60,13 +72,22 @@ ERROR_MESSAGES = {
     ErrorCode.STEAM_LOGIN_FAILED: "Steam登录失败",
     ErrorCode.STEAM_CONFIG_ERROR: "Steam配置错误",
     ErrorCode.STEAM_MEMORY_ERROR: "Steam内存读取错误",
+    ErrorCode.SWITCH_SUPERSEDED: "切换请求已被新的请求取代",
+    ErrorCode.SWITCH_TIMEOUT: "切换超时",
+    ErrorCode.STEAM_API_UNAVAILABLE: "Steam Web API 不可用",
     
     ErrorCode.ACCOUNT_NOT_FOUND: "账户不存在",
     ErrorCode.ACCOUNT_ALREADY_EXISTS: "账户已存在",
     ErrorCode.ACCOUNT_DATA_ERROR: "账户数据错误",
     ErrorCode.INVALID_CREDENTIALS: "无效的登录凭证",
+    ErrorCode.VAULT_LOCKED: "凭证库解密失败",
+    ErrorCode.ACCOUNT_CONFLICT: "账号已被其他操作修改",
     
     ErrorCode.CONFIG_NOT_FOUND: "配置文件不存在",
     ErrorCode.CONFIG_PARSE_ERROR: "配置文件解析错误",
     ErrorCode.CONFIG_WRITE_ERROR: "配置文件写入错误",
+    
+    ErrorCode.FLEET_NODE_NOT_FOUND: "集群节点不存在",
+    ErrorCode.FLEET_NODE_UNAVAILABLE: "集群节点不可用",
+    ErrorCode.FLEET_UNSUPPORTED: "集群功能需要安装 aiohttp",
 } 
\ No newline at end of file
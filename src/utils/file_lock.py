@@ -0,0 +1,188 @@
+"""跨进程/跨机器文件锁
+
+网络共享上的 fcntl / msvcrt 字节锁并不可靠, 这里使用 O_EXCL 创建锁文件:
+创建成功即持有锁, 删除锁文件即释放。
+
+锁文件中写入持有者标识、心跳序号和持有者的时间, 持有期间由一个共用的后台线程定期更新心跳。
+等待方只在本机单调时钟下观察到锁文件内容连续 stale 秒没有变化时才认为持有者已退出,
+不比较不同机器的时钟, 也不依赖共享服务器的修改时间。
+"""
+import os
+import time
+import uuid
+import socket
+import threading
+
+
+# 心跳间隔(秒), stale 应为它的数倍
+HEARTBEAT_INTERVAL = 1.0
+
+
+class LockTimeout(Exception):
+    """在超时时间内没有获取到锁"""
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+# 当前进程持有的锁, 由同一个心跳线程更新; 修改集合和写入心跳都在 _heartbeat_lock 内进行,
+# 释放锁时移出集合后不会再有心跳写入, 不需要等待线程
+_held_locks = set()
+_heartbeat_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+def _run_heartbeat():
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        with _heartbeat_lock:
+            for lock in list(_held_locks):
+                lock._beat_once()
+
+
+def _register(lock):
+    global _heartbeat_thread
+    with _heartbeat_lock:
+        _held_locks.add(lock)
+        if _heartbeat_thread is None or not _heartbeat_thread.is_alive():
+            _heartbeat_thread = threading.Thread(target=_run_heartbeat, name='file-lock-heartbeat', daemon=True)
+            _heartbeat_thread.start()
+
+
+def _unregister(lock):
+    with _heartbeat_lock:
+        _held_locks.discard(lock)
+
+
+class FileLock:
+    """基于锁文件的互斥锁, 只应在很短的临界区内持有
+
+    stale 应小于 timeout, 否则等待方在一次 acquire 内无法接管已退出进程留下的锁。
+    """
+
+    def __init__(self, path, timeout=10.0, stale=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.stale = stale
+        self.owner = f"{socket.gethostname()} {os.getpid()} {uuid.uuid4().hex}"
+        self._held = False
+        self._beat = 0
+        # 等待时观察到的锁文件内容及其开始保持不变的时间(time.monotonic())
+        self._observed = None
+
+    def _content(self):
+        return f"{self.owner} {self._beat} {time.time():.3f}".encode('utf-8')
+
+    def _try_create(self):
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        try:
+            os.write(fd, self._content())
+        finally:
+            os.close(fd)
+        return True
+
+    def _break_stale(self):
+        """接管没有心跳的锁文件
+
+        先改名再确认: 多个进程同时接管时只有一个能改名成功; 改名后内容与观察到的不一致,
+        说明改走的是其他进程刚刚创建或刚刚更新心跳的锁, 放回原处。
+        """
+        content = _read(self.path)
+        now = time.monotonic()
+        if content is None:
+            self._observed = None
+            return
+        if self._observed is None or self._observed[0] != content:
+            self._observed = (content, now)
+            return
+        if now - self._observed[1] < self.stale:
+            return
+        stale_path = f"{self.path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(self.path, stale_path)
+        except OSError:
+            return
+        if _read(stale_path) == content:
+            os.remove(stale_path)
+        else:
+            self._put_back(stale_path)
+        self._observed = None
+
+    def _put_back(self, stale_path):
+        """恢复误改名的锁文件, 不覆盖期间新建的锁文件"""
+        try:
+            os.link(stale_path, self.path)
+        except FileExistsError:
+            pass
+        except (AttributeError, OSError):
+            # 不支持硬链接的文件系统; Windows 下目标已存在时 rename 失败, 同样不会覆盖
+            try:
+                os.rename(stale_path, self.path)
+                return
+            except OSError:
+                pass
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+    def _owns(self, content):
+        return content is not None and content.startswith(self.owner.encode('utf-8'))
+
+    def _beat_once(self):
+        """更新心跳, 锁文件已被删除或被其他进程接管时不写入"""
+        if not self._owns(_read(self.path)):
+            return
+        self._beat += 1
+        try:
+            # 不使用 O_CREAT, 锁文件刚被删除时不会重新创建
+            fd = os.open(self.path, os.O_WRONLY | os.O_TRUNC)
+        except OSError:
+            return
+        try:
+            os.write(fd, self._content())
+        finally:
+            os.close(fd)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        delay = 0.001
+        self._observed = None
+        while not self._try_create():
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"获取文件锁超时: {self.path}")
+            self._break_stale()
+            # 指数退避, 竞争激烈时避免频繁访问网络共享
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        self._held = True
+        _register(self)
+
+    def release(self):
+        if not self._held:
+            return
+        self._held = False
+        _unregister(self)
+        content = _read(self.path)
+        if content is not None and not self._owns(content):
+            # 锁已被其他进程接管, 不能删除别人的锁文件
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,167 @@
+"""本地单实例 IPC
+
+单实例锁使用的本地端口同时作为命令通道: 第二个实例把命令转发给
+正在运行的实例后立即退出。消息格式为 4 字节大端长度前缀 + UTF-8 JSON。
+
+本机任何进程都能连接该端口, 因此运行中的实例启动时生成随机令牌写入只有当前用户能读取的文件
+(Windows 下用 DPAPI 保护, 其他系统下权限为 0600), 不带正确令牌的请求一律拒绝。
+"""
+import os
+import hmac
+import json
+import socket
+import secrets
+import struct
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import win32crypt
+except ImportError:  # 非 Windows 环境没有 DPAPI
+    win32crypt = None
+
+IPC_HOST = 'localhost'
+IPC_PORT = 12345
+# 单条消息最大长度
+MAX_MESSAGE_SIZE = 1024 * 1024
+# 命令令牌文件
+TOKEN_PATH = os.path.join('config', 'ipc.token')
+
+_HEADER = struct.Struct('!I')
+
+logger = logging.getLogger('ipc')
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]):
+    """发送一条带长度前缀的消息"""
+    payload = json.dumps(message, ensure_ascii=False).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Dict[str, Any]:
+    """接收一条带长度前缀的消息"""
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"消息过大: {size}")
+    return json.loads(_recv_exact(sock, size).decode('utf-8'))
+
+
+def acquire_instance_lock() -> Optional[socket.socket]:
+    """绑定单实例端口, 已有实例运行时返回 None; 返回的 socket 在实例退出前需要保持打开"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind((IPC_HOST, IPC_PORT))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def create_token(path: str = TOKEN_PATH) -> str:
+    """生成本次运行的命令令牌并写入只有当前用户能读取的文件"""
+    token = secrets.token_hex(32)
+    data = token.encode('ascii')
+    if win32crypt:
+        data = win32crypt.CryptProtectData(data, 'Steam Account Switcher IPC', None, None, None, 0)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return token
+
+
+def read_token(path: str = TOKEN_PATH) -> Optional[str]:
+    """读取运行中实例的命令令牌, 文件不存在或无法解密时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if win32crypt:
+            data = win32crypt.CryptUnprotectData(data, None, None, None, 0)[1]
+        return data.decode('ascii')
+    except Exception as e:
+        logger.warning(f"读取IPC令牌失败: {str(e)}")
+        return None
+
+
+def forward_command(command: str, timeout: float = 2.0, **args) -> Optional[Dict[str, Any]]:
+    """把命令转发给正在运行的实例
+
+    Returns:
+        dict: 运行中实例的回复, 无法连接时返回 None
+    """
+    token = read_token()
+    if token is None:
+        return None
+    try:
+        with socket.create_connection((IPC_HOST, IPC_PORT), timeout=timeout) as sock:
+            send_message(sock, {'command': command, 'args': args, 'token': token})
+            return recv_message(sock)
+    except (OSError, ValueError) as e:
+        logger.warning(f"转发命令失败: {command} {str(e)}")
+        return None
+
+
+class IpcServer:
+    """在单实例锁 socket 上接收其他实例转发的命令"""
+
+    def __init__(self, sock: socket.socket, handlers: Dict[str, Callable[..., Any]], token: str):
+        self.sock = sock
+        self.handlers = handlers
+        self.token = token
+        self._thread = None
+
+    def start(self):
+        self.sock.listen(4)
+        self._thread = threading.Thread(target=self._serve, name='ipc-server', daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            # 等待切换完成的请求可能持续较久, 每个连接单独处理, 不阻塞其他命令
+            threading.Thread(target=self._handle, args=(conn,), name='ipc-request', daemon=True).start()
+
+    def _handle(self, conn: socket.socket):
+        with conn:
+            try:
+                conn.settimeout(2.0)
+                request = recv_message(conn)
+                send_message(conn, self._dispatch(request))
+            except (OSError, ValueError) as e:
+                logger.warning(f"处理IPC请求失败: {str(e)}")
+
+    def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        token = request.get('token')
+        if not isinstance(token, str) or not hmac.compare_digest(token.encode('utf-8'), self.token.encode('ascii')):
+            logger.warning("拒绝IPC请求: 令牌无效")
+            return {'status': 'error', 'message': "令牌无效"}
+        command = request.get('command')
+        handler = self.handlers.get(command)
+        if not handler:
+            return {'status': 'error', 'message': f"未知命令: {command}"}
+        try:
+            result = handler(**(request.get('args') or {}))
+            return {'status': 'success', 'result': result}
+        except Exception as e:
+            return {
+                'status': 'error',
+                'code': getattr(getattr(e, 'code', None), 'value', None),
+                'message': getattr(e, 'message', None) or str(e),
+            }
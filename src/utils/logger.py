@@ -1,9 +1,12 @@
 import os
 import logging
-import configparser
 from datetime import datetime
 from logging.handlers import TimedRotatingFileHandler
 import colorlog
+from src.utils.config import get_config
+
+# 已创建的日志记录器, 配置中的日志级别变化时同步更新
+_managed_loggers = {}
 
 class ColoredFormatter(colorlog.ColoredFormatter):
     """自定义的彩色日志格式化器"""
@@ -24,17 +27,27 @@ class ColoredFormatter(colorlog.ColoredFormatter):
             style='%'
         )
 
-def get_log_level(config_path='config/config.ini'):
-    """从配置文件获取日志级别"""
+def get_log_level():
+    """从配置服务获取日志级别"""
     try:
-        config = configparser.ConfigParser()
-        config.read(config_path, encoding='utf-8')
-        level = config.get('General', 'log_level', fallback='INFO').upper()
+        level = get_config().get('General', 'log_level').upper()
         return getattr(logging, level, logging.INFO)
     except Exception as e:
         print(f"读取日志级别配置失败: {str(e)}, 使用默认级别 INFO")
         return logging.INFO
 
+def _on_config_changed(changed):
+    """日志级别配置变化时更新所有日志记录器"""
+    if ('General', 'log_level') not in changed:
+        return
+    log_level = get_log_level()
+    for logger in _managed_loggers.values():
+        logger.setLevel(log_level)
+        for handler in logger.handlers:
+            handler.setLevel(log_level)
+
+get_config().subscribe(_on_config_changed)
+
 def setup_logger(name, log_dir='logs'):
     """设置日志记录器
     
@@ -85,6 +98,7 @@ def setup_logger(name, log_dir='logs'):
     console_handler.setLevel(log_level)
     logger.addHandler(console_handler)
     
+    _managed_loggers[name] = logger
     return logger
 
 # 创建一个用于测试的函数
@@ -0,0 +1,109 @@
+"""请求指标统计
+
+按路由规则记录请求延迟直方图、处理中的请求数和状态码计数,
+以 Prometheus 文本格式输出。
+"""
+import time
+import threading
+from collections import defaultdict
+from flask import g, request
+
+# 延迟直方图桶(秒), 覆盖普通接口到 30 秒的登录等待
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """请求指标收集器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(_Histogram)
+        self._in_flight = defaultdict(int)
+        self._statuses = defaultdict(int)
+
+    @staticmethod
+    def _endpoint():
+        # 使用路由规则而不是实际路径, 避免用户名等参数造成标签爆炸
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_endpoint = self._endpoint()
+        with self._lock:
+            self._in_flight[g._metrics_endpoint] += 1
+
+    def _after_request(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        endpoint = g.pop('_metrics_endpoint')
+        status = g.pop('_metrics_status', 500)
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+            self._histograms[(endpoint, request.method)].observe(duration)
+            self._statuses[(endpoint, request.method, status)] += 1
+
+    def install(self, blueprint):
+        """通过蓝图注册应用级钩子, 统计注册了该蓝图的应用的所有请求"""
+        blueprint.before_app_request(self._before_request)
+        blueprint.after_app_request(self._after_request)
+        blueprint.teardown_app_request(self._teardown_request)
+
+    def render(self):
+        """输出 Prometheus 文本格式"""
+        lines = [
+            '# HELP http_request_duration_seconds 请求处理耗时',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            for (endpoint, method), hist in sorted(self._histograms.items()):
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist.counts):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {hist.sum:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {hist.count}')
+
+            lines.append('# HELP http_requests_in_flight 正在处理的请求数')
+            lines.append('# TYPE http_requests_in_flight gauge')
+            for endpoint, value in sorted(self._in_flight.items()):
+                lines.append(f'http_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {value}')
+
+            lines.append('# HELP http_requests_total 按状态码统计的请求数')
+            lines.append('# TYPE http_requests_total counter')
+            for (endpoint, method, status), value in sorted(self._statuses.items()):
+                lines.append(
+                    f'http_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {value}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+metrics = RequestMetrics()
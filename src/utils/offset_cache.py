@@ -0,0 +1,87 @@
+"""steamui.dll 内存偏移缓存
+
+按 steamui.dll 的构建标识(文件大小 + 修改时间 + PE 头区域哈希)持久化
+特征码扫描得到的偏移, Steam 更新后只有第一次登录需要重新扫描。
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# PE 头区域大小, 链接时间戳和校验和都在这个范围内
+PE_HEADER_SIZE = 4096
+# 最多保留的构建数量
+MAX_ENTRIES = 8
+
+
+class OffsetCache:
+    """按模块构建标识缓存内存偏移"""
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+        self._identity_memo: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def identity(self, module_path: str) -> Optional[str]:
+        """计算模块构建标识
+
+        同一进程内文件大小和修改时间未变化时直接复用上次的哈希,
+        因此缓存命中最多只需要一次 stat 和一次头部哈希。
+        """
+        try:
+            stat = os.stat(module_path)
+        except OSError:
+            return None
+        key = (stat.st_size, stat.st_mtime_ns)
+        memo = self._identity_memo.get(module_path)
+        if memo and memo[0] == key:
+            return memo[1]
+        with open(module_path, 'rb') as f:
+            digest = hashlib.sha1(f.read(PE_HEADER_SIZE)).hexdigest()
+        identity = f"{stat.st_size}-{stat.st_mtime_ns}-{digest}"
+        self._identity_memo[module_path] = (key, identity)
+        return identity
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        tmp_path = f"{self.cache_path}.tmp"
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def get(self, identity: str) -> Optional[int]:
+        """获取缓存的偏移, 未命中返回 None"""
+        with self._lock:
+            entry = self._load().get(identity)
+            return entry['offset'] if entry else None
+
+    def put(self, identity: str, offset: int):
+        """写入偏移, 超出容量时淘汰最早的构建"""
+        with self._lock:
+            entries = self._load()
+            entries.pop(identity, None)
+            entries[identity] = {
+                'offset': offset,
+                'updated': datetime.now().isoformat(timespec='seconds')
+            }
+            while len(entries) > MAX_ENTRIES:
+                entries.pop(next(iter(entries)))
+            self._save()
+
+    def invalidate(self, identity: str):
+        """删除失效的偏移"""
+        with self._lock:
+            if self._load().pop(identity, None) is not None:
+                self._save()
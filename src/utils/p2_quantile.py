@@ -0,0 +1,81 @@
+"""P² 流式分位数估计
+
+Jain & Chlamtac 的 P² 算法: 只保存 5 个标记点, 每个观测值 O(1) 更新,
+不需要保留历史样本即可估计任意分位数, 状态可以序列化后持久保存。
+"""
+
+
+class P2Quantile:
+    """单个分位数的流式估计"""
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError(f"分位数必须在 0 和 1 之间: {p}")
+        self.p = p
+        self.count = 0
+        # 标记点高度、实际位置和期望位置
+        self._q = []
+        self._n = [0, 1, 2, 3, 4]
+        self._np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._dn = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        q = self._q
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self._n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        for i in (1, 2, 3):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        """当前估计值, 没有样本时返回 None"""
+        if not self.count:
+            return None
+        if self.count <= 5:
+            return self._q[min(int(self.p * self.count), self.count - 1)]
+        return self._q[2]
+
+    def to_dict(self):
+        return {'p': self.p, 'count': self.count, 'q': self._q, 'n': self._n, 'np': self._np}
+
+    @classmethod
+    def from_dict(cls, data):
+        estimator = cls(data['p'])
+        estimator.count = data['count']
+        estimator._q = list(data['q'])
+        estimator._n = list(data['n'])
+        estimator._np = list(data['np'])
+        return estimator
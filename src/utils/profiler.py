@@ -0,0 +1,94 @@
+"""按需性能分析
+
+在指定时间窗口内对所有线程做栈采样, 可同时用 tracemalloc
+对比窗口前后的内存分配, 用于在现场定位慢接口。
+"""
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+
+# 同一时间只允许一个分析任务
+_profile_lock = threading.Lock()
+
+# 采样时间窗口上限(秒)
+MAX_DURATION = 60
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+def profile(duration=5.0, interval=0.005, trace_memory=True, top=30):
+    """采样分析
+
+    Args:
+        duration: 采样时长(秒)
+        interval: 采样间隔(秒)
+        trace_memory: 是否记录内存分配变化
+        top: 返回的条目数
+
+    Returns:
+        dict: 热点函数、热点调用栈和内存分配变化; 已有分析任务在运行时返回 None
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        duration = min(max(duration, 0.1), MAX_DURATION)
+        started_tracing = False
+        before = None
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                started_tracing = True
+            before = tracemalloc.take_snapshot()
+
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        functions = Counter()
+        stacks = Counter()
+        samples = 0
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                functions[stack[0]] += 1
+                thread_name = names.get(thread_id, str(thread_id))
+                stacks[(thread_name,) + tuple(reversed(stack))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        result = {
+            'duration': duration,
+            'samples': samples,
+            'top_functions': [
+                {'function': name, 'samples': count} for name, count in functions.most_common(top)
+            ],
+            'top_stacks': [
+                {'thread': stack[0], 'stack': ';'.join(stack[1:]), 'samples': count}
+                for stack, count in stacks.most_common(top)
+            ],
+        }
+
+        if trace_memory:
+            after = tracemalloc.take_snapshot()
+            result['memory'] = [
+                {'location': str(stat.traceback[0]), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+                for stat in after.compare_to(before, 'lineno')[:top]
+            ]
+            result['memory_traced'] = tracemalloc.get_traced_memory()[0]
+            if started_tracing:
+                tracemalloc.stop()
+        return result
+    finally:
+        _profile_lock.release()
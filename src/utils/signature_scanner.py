@@ -0,0 +1,91 @@
+"""特征码(AOB)扫描工具
+
+在模块镜像的字节数据中按带通配符的特征码查找位置。
+本模块不依赖任何 Windows 组件, 可以直接对导出的模块镜像文件进行扫描。
+
+特征码格式: 十六进制字节以空格分隔, ``??`` 或 ``?`` 表示任意字节,
+可在末尾追加 ``@偏移`` 表示目标字段相对特征码起始位置的偏移, 例如::
+
+    53 74 65 61 6D ?? ?? 00 @ +0x14
+"""
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+class Signature:
+    """已解析的特征码"""
+
+    def __init__(self, text: str):
+        self.text = text.strip()
+        body, _, offset = self.text.partition('@')
+        self.offset = int(offset.strip().replace(' ', ''), 0) if offset.strip() else 0
+        self.pattern: List[Optional[int]] = []
+        for token in body.split():
+            if token in ('?', '??'):
+                self.pattern.append(None)
+            else:
+                self.pattern.append(int(token, 16))
+        if not self.pattern or all(b is None for b in self.pattern):
+            raise ValueError(f"特征码至少需要一个固定字节: {text}")
+
+        # 将固定字节按连续片段拆分, 最长的片段作为 bytes.find 的锚点
+        self.segments: List[Tuple[int, bytes]] = []
+        start = None
+        for i, value in enumerate(self.pattern + [None]):
+            if value is not None and start is None:
+                start = i
+            elif value is None and start is not None:
+                self.segments.append((start, bytes(self.pattern[start:i])))
+                start = None
+        self.anchor_pos, self.anchor = max(self.segments, key=lambda s: len(s[1]))
+        self.others = [s for s in self.segments if s[0] != self.anchor_pos]
+
+    def __len__(self) -> int:
+        return len(self.pattern)
+
+    def __repr__(self) -> str:
+        return f"Signature({self.text!r})"
+
+    def finditer(self, data: bytes) -> Iterator[int]:
+        """依次返回特征码在数据中的所有匹配起始位置"""
+        view = memoryview(data)
+        size = len(self)
+        limit = len(data) - size
+        pos = data.find(self.anchor)
+        while pos != -1:
+            start = pos - self.anchor_pos
+            if 0 <= start <= limit and all(
+                view[start + off:start + off + len(seg)] == seg
+                for off, seg in self.others
+            ):
+                yield start
+            pos = data.find(self.anchor, pos + 1)
+
+    def find(self, data: bytes) -> int:
+        """返回第一个匹配的起始位置, 未找到返回 -1"""
+        return next(self.finditer(data), -1)
+
+
+def parse_signatures(text: str) -> List[Signature]:
+    """解析配置中的特征码列表, 多个特征码以 ``|`` 分隔"""
+    return [Signature(item) for item in text.split('|') if item.strip()]
+
+
+def find_field_offset(data: bytes, signatures: Sequence[Signature]) -> Optional[int]:
+    """按顺序尝试特征码, 返回目标字段相对数据起始位置的偏移
+
+    只接受唯一匹配, 多处匹配说明特征码不够精确, 继续尝试下一个。
+    """
+    for signature in signatures:
+        matches = signature.finditer(data)
+        first = next(matches, -1)
+        if first == -1 or next(matches, -1) != -1:
+            continue
+        return first + signature.offset
+    return None
+
+
+def scan_module_dump(path: str, patterns: str) -> Optional[int]:
+    """扫描导出到磁盘的模块镜像, 便于离线验证特征码"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return find_field_offset(data, parse_signatures(patterns))
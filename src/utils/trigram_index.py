@@ -0,0 +1,191 @@
+"""三元组(trigram)倒排索引
+
+字段转小写后在开头补两个 \\x00 再切分为三字符片段, 因此 1~2 个字符的查询按前缀匹配;
+3 个字符以上的查询取各片段倒排集合的交集作为候选, 再确认子串匹配并排序,
+没有子串匹配时按共同片段数做模糊匹配以容忍拼写错误。查询代价只与候选数量有关,
+不需要遍历全部文档。
+"""
+import gc
+import heapq
+import threading
+from collections import Counter
+from itertools import islice
+
+_PAD = '\x00\x00'
+
+# 匹配类型, 数值越小排序越靠前
+EXACT, PREFIX, SUBSTRING, FUZZY = range(4)
+
+# 模糊匹配时忽略出现在过多文档中的片段: 区分度低, 统计代价却最高
+COMMON_LIMIT = 2000
+
+# 查询过于宽泛(如单个字母)时最多只对这么多候选排序, 完全匹配的文档总会包含在内
+MAX_CANDIDATES = 5000
+
+
+def _normalize(value):
+    return str(value or '').casefold()
+
+
+def _field_grams(value):
+    padded = _PAD + value
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _query_grams(query):
+    if len(query) < 3:
+        return {(_PAD + query)[-3:]}
+    return {query[i:i + 3] for i in range(len(query) - 2)}
+
+
+def _rank(values, query):
+    """最佳匹配: (匹配类型, 字段序号), 不包含查询串时返回 None"""
+    best = None
+    for position, value in enumerate(values):
+        if value == query:
+            rank = (EXACT, position)
+        elif value.startswith(query):
+            rank = (PREFIX, position)
+        elif query in value:
+            rank = (SUBSTRING, position)
+        else:
+            continue
+        if best is None or rank < best:
+            best = rank
+    return best
+
+
+class TrigramIndex:
+    """可增量维护的文档索引, 文档由若干字段组成, 字段顺序即排序权重"""
+
+    def __init__(self, documents=()):
+        """
+        Args:
+            documents: 初始文档 [(文档键, 字段值列表)], 批量建立时不逐个比较差异
+        """
+        self._lock = threading.Lock()
+        self._postings = {}
+        # 字段值 -> 文档键集合, 用于不经过候选截断直接找到完全匹配
+        self._exact = {}
+        # 文档键 -> 小写字段值, 片段集合可由字段值重新计算
+        self._docs = {}
+        # 批量建立时会创建大量集合, 暂停循环垃圾回收避免反复扫描
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for key, fields in documents:
+                values, grams = self._analyze(fields)
+                for gram in grams:
+                    postings = self._postings.get(gram)
+                    if postings is None:
+                        postings = self._postings[gram] = set()
+                    postings.add(key)
+                self._add_exact(key, values)
+                self._docs[key] = values
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _grams(values):
+        grams = set()
+        for value in values:
+            if value:
+                grams |= _field_grams(value)
+        return grams
+
+    @classmethod
+    def _analyze(cls, fields):
+        values = tuple(_normalize(v) for v in fields)
+        return values, cls._grams(values)
+
+    def update(self, key, fields):
+        """添加或更新文档, 只修改变化的片段"""
+        values, grams = self._analyze(fields)
+        with self._lock:
+            old = self._docs.get(key)
+            if old is not None:
+                if old == values:
+                    return
+                old_grams = self._grams(old)
+                for gram in old_grams - grams:
+                    self._discard(self._postings, gram, key)
+                for value in old:
+                    self._discard(self._exact, value, key)
+                grams -= old_grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key)
+            self._add_exact(key, values)
+            self._docs[key] = values
+
+    def remove(self, key):
+        with self._lock:
+            old = self._docs.pop(key, None)
+            if old is not None:
+                for gram in self._grams(old):
+                    self._discard(self._postings, gram, key)
+                for value in old:
+                    self._discard(self._exact, value, key)
+
+    def _add_exact(self, key, values):
+        for value in values:
+            if value:
+                self._exact.setdefault(value, set()).add(key)
+
+    @staticmethod
+    def _discard(mapping, name, key):
+        keys = mapping.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del mapping[name]
+
+    def search(self, query, limit=20):
+        """搜索文档
+
+        匹配的文档超过 MAX_CANDIDATES 时只对其中一部分排序, 此时应提示输入更多字符。
+
+        Returns:
+            list: [(文档键, 匹配类型)], 依次按匹配类型、字段序号和文档键排序
+        """
+        query = _normalize(query).strip()
+        if not query or limit <= 0:
+            return []
+        grams = _query_grams(query)
+        with self._lock:
+            postings = sorted((self._postings.get(g, ()) for g in grams), key=len)
+            smallest, rest = postings[0], postings[1:]
+            if len(smallest) <= MAX_CANDIDATES:
+                candidates = set(smallest).intersection(*rest)
+            else:
+                candidates = set(islice(
+                    (key for key in smallest if all(key in keys for keys in rest)),
+                    MAX_CANDIDATES
+                ))
+            candidates.update(self._exact.get(query, ()))
+
+        # 文档值是不可变元组, 排序不需要持有锁
+        docs = self._docs
+        results = []
+        for key in candidates:
+            values = docs.get(key)
+            rank = values and _rank(values, query)
+            if rank:
+                results.append((rank, key))
+        if not results and len(grams) >= 2:
+            results = self._fuzzy(grams)
+        return [(key, rank[0]) for rank, key in heapq.nsmallest(limit, results)]
+
+    def _fuzzy(self, grams):
+        """按共同片段数匹配, 至少需要一半的查询片段"""
+        counts = Counter()
+        with self._lock:
+            for gram in grams:
+                keys = self._postings.get(gram, ())
+                if len(keys) <= COMMON_LIMIT:
+                    counts.update(keys)
+        need = max(2, (len(grams) + 1) // 2)
+        return [((FUZZY, -count), key) for key, count in counts.items() if count >= need]
@@ -0,0 +1,149 @@
+"""config.vdf / localconfig.vdf 流式扫描工具
+
+Steam 的 config/config.vdf 可能有数 MB, 完整 vdf.load 代价较高。
+这里通过内存映射只定位并解析 ``Accounts`` 和 ``ConnectCache`` 两个节点,
+用于判断某个账号是否仍保存着可用的登录会话;
+userdata 下的 localconfig.vdf 同样只解析 ``apps`` 节点。
+"""
+import mmap
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+_TOKEN = re.compile(rb'"((?:[^"\\]|\\.)*)"|(\{)|(\})|//[^\n]*|\s+')
+_WHITESPACE = re.compile(rb'\s*')
+
+
+def connect_cache_key(username: str) -> str:
+    """计算账号在 ConnectCache 中的键: 账号名 CRC32 的十六进制加后缀 1"""
+    return f"{zlib.crc32(username.encode('utf-8')):08x}1"
+
+
+def _parse_block(data, pos: int) -> Dict[str, object]:
+    """从 ``{`` 之后开始解析一个节点, 直到匹配的 ``}``"""
+    root: Dict[str, object] = {}
+    stack = [root]
+    key = None
+    length = len(data)
+    while pos < length:
+        match = _TOKEN.match(data, pos)
+        if not match:
+            raise ValueError(f"config.vdf 格式错误, 位置: {pos}")
+        pos = match.end()
+        text, open_brace, close_brace = match.groups()
+        if text is not None:
+            value = text.decode('utf-8', errors='replace')
+            if key is None:
+                key = value
+            else:
+                stack[-1][key] = value
+                key = None
+        elif open_brace:
+            child: Dict[str, object] = {}
+            stack[-1][key] = child
+            stack.append(child)
+            key = None
+        elif close_brace:
+            stack.pop()
+            if not stack:
+                return root
+    raise ValueError("config.vdf 节点未闭合")
+
+
+def _find_block(data, name: bytes) -> Optional[Dict[str, object]]:
+    """查找作为节点键出现的 ``"name"`` 并解析其内容"""
+    token = b'"' + name + b'"'
+    pos = data.find(token)
+    while pos != -1:
+        end = _WHITESPACE.match(data, pos + len(token)).end()
+        if data[end:end + 1] == b'{':
+            return _parse_block(data, end + 1)
+        pos = data.find(token, pos + 1)
+    return None
+
+
+class ConfigVdfSessions:
+    """config.vdf 中的账号会话信息"""
+
+    def __init__(self, accounts: Dict[str, str], connect_cache: Set[str]):
+        # 小写账号名 -> SteamID
+        self.accounts = accounts
+        self.connect_cache = connect_cache
+        self.session_names = {
+            name for name in accounts if self.has_session(name)
+        }
+
+    def has_session(self, username: str) -> bool:
+        """账号是否保存了可用于快速登录的会话"""
+        return (connect_cache_key(username) in self.connect_cache
+                or connect_cache_key(username.lower()) in self.connect_cache)
+
+
+def scan_config_vdf(path: str) -> ConfigVdfSessions:
+    """扫描 config.vdf, 只解析账号相关节点"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ConfigVdfSessions({}, set())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            accounts_block = _find_block(data, b'Accounts') or {}
+            cache_block = _find_block(data, b'ConnectCache') or {}
+
+    accounts = {}
+    for name, info in accounts_block.items():
+        if isinstance(info, dict):
+            accounts[name.lower()] = info.get('SteamID', '')
+    return ConfigVdfSessions(accounts, set(cache_block))
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def scan_localconfig_apps(path: str) -> List[Tuple[int, int, int]]:
+    """读取 userdata/<accountid>/config/localconfig.vdf 中的游戏记录
+
+    Returns:
+        list: [(appid, 游戏时长(分钟), 最后运行时间戳)], 按游戏时长降序
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            block = _find_block(data, b'apps') or _find_block(data, b'Apps') or {}
+
+    apps = []
+    for appid, info in block.items():
+        if not appid.isdigit() or not isinstance(info, dict):
+            continue
+        playtime = _to_int(info.get('Playtime'))
+        last_played = _to_int(info.get('LastPlayed'))
+        if playtime or last_played:
+            apps.append((int(appid), playtime, last_played))
+    apps.sort(key=lambda app: (-app[1], -app[2]))
+    return apps
+
+
+class ConfigVdfScanner:
+    """按文件状态缓存扫描结果, 文件未变化时直接返回上次的结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stat = None
+        self._result: Optional[ConfigVdfSessions] = None
+
+    def scan(self, path: str) -> Optional[ConfigVdfSessions]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if signature != self._stat:
+                self._result = scan_config_vdf(path)
+                self._stat = signature
+            return self._result